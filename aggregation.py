@@ -0,0 +1,209 @@
+"""
+Aggregation Engine
+Single-pass pair and BD counters behind the pairing metrics
+
+Both rep ID columns are factorized to integer codes once. Every opportunity
+falls into exactly one outcome state, so a single bincount over
+(pair_code * NUM_STATES + state) produces all pair-level outcome counters, and a
+weighted bincount over pair_code produces the deal value sums. BD-level counters
+are sums of pair-level counters, so they never touch the opportunity rows again.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+EARLY_DEATH_DAYS = 14
+STALE_DAYS = 90
+
+# Pair codes are laid out densely over the BD x SR grid only while the grid is small
+# (DENSE_PAIR_LIMIT cells, about 3 MB of state counts) and at most DENSE_ROWS_FACTOR
+# times the row count; otherwise only the observed pairs are coded
+DENSE_PAIR_LIMIT = 2**16
+DENSE_ROWS_FACTOR = 4
+
+# Mutually exclusive opportunity states
+STATE_OPEN = 0
+STATE_STALE = 1
+STATE_WON = 2
+STATE_LOST = 3
+STATE_EARLY_DEATH = 4
+STATE_OTHER = 5
+NUM_STATES = 6
+
+PAIR_KEYS = ['bd_rep_id', 'sales_rep_id']
+COUNTER_COLUMNS = [
+    'total_opps', 'total_open', 'total_closed_won', 'total_closed_lost',
+    'early_death', 'stale', 'deal_value_sum', 'deal_value_count'
+]
+METRIC_COLUMNS = [
+    'bd_rep_id', 'sales_rep_id', 'total_opps', 'total_open', 'total_closed_won',
+    'total_closed_lost', 'total_decided', 'win_rate_pct', 'early_death_rate_pct',
+    'stale_rate_pct', 'avg_deal_size', 'bd_avg_win_rate_pct', 'bd_avg_early_death_rate_pct',
+    'bd_avg_stale_rate_pct', 'bd_avg_deal_size', 'win_rate_deviation_pct',
+    'early_death_deviation_pct', 'stale_rate_deviation_pct', 'deal_size_deviation_pct'
+]
+
+
+def factorize(values):
+    """Integer codes plus sorted labels; categoricals reuse their existing codes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = np.asarray(values.cat.categories, dtype=object)
+        order = np.argsort(categories)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, rank[codes], -1), categories[order]
+    codes, labels = pd.factorize(values, sort=True)
+    return codes, np.asarray(labels, dtype=object)
+
+
+def opportunity_states(outcome, days_in_stage, early_death_days=EARLY_DEATH_DAYS, stale_days=STALE_DAYS):
+    outcome = pd.Series(outcome)
+    days_in_stage = np.asarray(days_in_stage)
+    is_open = (outcome == 'Open').to_numpy()
+    is_won = (outcome == 'Closed Won').to_numpy()
+    is_lost = (outcome == 'Closed Lost').to_numpy()
+
+    states = np.full(len(outcome), STATE_OTHER, dtype=np.int64)
+    states[is_open] = STATE_OPEN
+    states[is_open & (days_in_stage > stale_days)] = STATE_STALE
+    states[is_won] = STATE_WON
+    states[is_lost] = STATE_LOST
+    states[is_lost & (days_in_stage <= early_death_days)] = STATE_EARLY_DEATH
+    return states
+
+
+def counters_from_states(state_counts, value_sums, value_counts):
+    """Collapse (pairs x NUM_STATES) state counts into COUNTER_COLUMNS."""
+    return {
+        'total_opps': state_counts.sum(axis=1),
+        'total_open': state_counts[:, STATE_OPEN] + state_counts[:, STATE_STALE],
+        'total_closed_won': state_counts[:, STATE_WON],
+        'total_closed_lost': state_counts[:, STATE_LOST] + state_counts[:, STATE_EARLY_DEATH],
+        'early_death': state_counts[:, STATE_EARLY_DEATH],
+        'stale': state_counts[:, STATE_STALE],
+        'deal_value_sum': value_sums,
+        'deal_value_count': value_counts
+    }
+
+
+def pair_counters(opportunities, early_death_days=EARLY_DEATH_DAYS, stale_days=STALE_DAYS):
+    """Counters for every observed (bd_rep_id, sales_rep_id) pair, sorted by pair."""
+    bd_codes, bd_labels = factorize(opportunities['bd_rep_id'])
+    sr_codes, sr_labels = factorize(opportunities['sales_rep_id'])
+    states = opportunity_states(opportunities['outcome'], opportunities['days_in_current_stage'],
+                                early_death_days, stale_days)
+    deal_value = opportunities['deal_value'].to_numpy(dtype=np.float64)
+
+    # Rows without a rep ID are dropped, as groupby does
+    valid = (bd_codes >= 0) & (sr_codes >= 0)
+    if not valid.all():
+        bd_codes, sr_codes = bd_codes[valid], sr_codes[valid]
+        states, deal_value = states[valid], deal_value[valid]
+
+    keys = bd_codes.astype(np.int64) * len(sr_labels) + sr_codes
+    grid = len(bd_labels) * len(sr_labels)
+    if grid > min(DENSE_PAIR_LIMIT, DENSE_ROWS_FACTOR * len(keys)):
+        keys, pair_keys = pd.factorize(keys, sort=True)
+        pair_keys = np.asarray(pair_keys, dtype=np.int64)
+    else:
+        pair_keys = np.arange(grid)
+    num_pairs = len(pair_keys)
+
+    state_counts = np.bincount(keys * NUM_STATES + states,
+                               minlength=num_pairs * NUM_STATES).reshape(num_pairs, NUM_STATES)
+    has_value = ~np.isnan(deal_value)
+    if has_value.all():
+        value_sums = np.bincount(keys, weights=deal_value, minlength=num_pairs)
+        value_counts = state_counts.sum(axis=1)
+    else:
+        value_sums = np.bincount(keys[has_value], weights=deal_value[has_value], minlength=num_pairs)
+        value_counts = np.bincount(keys[has_value], minlength=num_pairs)
+
+    observed = state_counts.sum(axis=1) > 0
+    pair_keys = pair_keys[observed]
+    counters = counters_from_states(state_counts[observed], value_sums[observed], value_counts[observed])
+
+    index = pd.MultiIndex.from_arrays(
+        [bd_labels[pair_keys // len(sr_labels)], sr_labels[pair_keys % len(sr_labels)]],
+        names=PAIR_KEYS
+    )
+    return pd.DataFrame(counters, index=index, columns=COUNTER_COLUMNS)
+
+
+def merge_counters(partials):
+    """Combine counter frames built from disjoint sets of opportunities."""
+    partials = [p for p in partials if len(p)]
+    if not partials:
+        return pd.DataFrame(columns=COUNTER_COLUMNS,
+                            index=pd.MultiIndex.from_arrays([[], []], names=PAIR_KEYS))
+    merged = pd.concat(partials).groupby(level=PAIR_KEYS, sort=True).sum()
+    return merged[merged['total_opps'] > 0]
+
+
+def metrics_from_counters(counters, bd_counters=None):
+    """Pair metrics, BD baselines and deviations in the pair_metrics.csv layout.
+
+    bd_counters (indexed by bd_rep_id) can be passed when BD-level totals are
+    already maintained; otherwise they are summed from the pair counters.
+    """
+    counters = counters[counters['total_opps'] > 0].sort_index()
+    bd_ids = counters.index.get_level_values('bd_rep_id')
+
+    total_opps = counters['total_opps']
+    total_won = counters['total_closed_won']
+    total_lost = counters['total_closed_lost']
+    total_decided = total_won + total_lost
+
+    metrics_df = pd.DataFrame({
+        'bd_rep_id': bd_ids.astype(str),
+        'sales_rep_id': counters.index.get_level_values('sales_rep_id').astype(str),
+        'total_opps': total_opps.values,
+        'total_open': counters['total_open'].values,
+        'total_closed_won': total_won.values,
+        'total_closed_lost': total_lost.values,
+        'total_decided': total_decided.values,
+        'win_rate_pct': (total_won / total_decided * 100).fillna(0).values,
+        'early_death_rate_pct': (counters['early_death'] / total_lost * 100).fillna(0).values,
+        'stale_rate_pct': (counters['stale'] / total_opps * 100).fillna(0).values,
+        'avg_deal_size': (counters['deal_value_sum'] / counters['deal_value_count']).values
+    })
+
+    # BD-level baselines are sums of the pair counters. A BD with no decided
+    # (or no lost) deals has no baseline, which surfaces as NaN
+    bd = counters.groupby(level='bd_rep_id', sort=True).sum() if bd_counters is None else bd_counters
+    bd_decided = bd['total_closed_won'] + bd['total_closed_lost']
+    bd_avg_win_rate_pct = bd['total_closed_won'] / bd_decided * 100
+    bd_avg_early_death_rate_pct = bd['early_death'] / bd['total_closed_lost'] * 100
+    bd_avg_stale_rate_pct = bd['stale'] / bd['total_opps'] * 100
+    bd_avg_deal_size = bd['deal_value_sum'] / bd['deal_value_count']
+
+    bd_position = bd.index.get_indexer(bd_ids)
+    metrics_df['bd_avg_win_rate_pct'] = bd_avg_win_rate_pct.values[bd_position]
+    metrics_df['bd_avg_early_death_rate_pct'] = bd_avg_early_death_rate_pct.values[bd_position]
+    metrics_df['bd_avg_stale_rate_pct'] = bd_avg_stale_rate_pct.values[bd_position]
+    metrics_df['bd_avg_deal_size'] = bd_avg_deal_size.values[bd_position]
+
+    # Calculate percentage deviations from BD baseline
+    metrics_df['win_rate_deviation_pct'] = (
+        (metrics_df['win_rate_pct'] - metrics_df['bd_avg_win_rate_pct']) /
+        metrics_df['bd_avg_win_rate_pct'].replace(0, 1) * 100
+    ).fillna(0)
+
+    metrics_df['early_death_deviation_pct'] = (
+        (metrics_df['early_death_rate_pct'] - metrics_df['bd_avg_early_death_rate_pct']) /
+        metrics_df['bd_avg_early_death_rate_pct'].replace(0, 1) * 100
+    ).fillna(0)
+
+    metrics_df['stale_rate_deviation_pct'] = (
+        (metrics_df['stale_rate_pct'] - metrics_df['bd_avg_stale_rate_pct']) /
+        metrics_df['bd_avg_stale_rate_pct'].replace(0, 1) * 100
+    ).fillna(0)
+
+    metrics_df['deal_size_deviation_pct'] = (
+        (metrics_df['avg_deal_size'] - metrics_df['bd_avg_deal_size']) /
+        metrics_df['bd_avg_deal_size'] * 100
+    ).fillna(0)
+
+    return metrics_df[METRIC_COLUMNS]
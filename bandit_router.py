@@ -0,0 +1,382 @@
+"""
+Bandit Router
+Online Thompson-sampling routing over Beta posteriors per BD-Sales pair
+
+Each pair's win probability has a Beta posterior: the BD's baseline win rate,
+worth PRIOR_OPPORTUNITIES decided deals, plus the pair's own wins and losses.
+Wins and losses are kept only for pairs that have shared an opportunity, in
+pair_matrix's CSR layout by BD (about 12 bytes per pair, so 2M pairs take
+24 MB at any roster size); a sales rep a BD has never worked with is just the
+BD's prior. Recording a closed opportunity is a binary search within the BD's
+row and one increment. A pair seen for the first time waits in a small table
+and is merged into the arrays once that table reaches an eighth of their size.
+
+Routing a lead draws one posterior sample for each of its BD's observed reps
+and for EXPLORATION_REPS reps picked at random from the rest of the roster, and
+picks the highest. Reps with little history still get some leads while proven
+pairs take most of them, and a large roster of never-paired reps cannot take
+most of the leads just because it holds most of the prior draws.
+
+    python bandit_router.py init                      # seed from pair_metrics
+    python bandit_router.py route BD_001 --leads 100  # routing shares for a batch
+    python bandit_router.py record BD_001 SR_005 won
+    python bandit_router.py benchmark --bds 5000 --reps 20000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import pair_matrix
+import performance_scoring
+import storage
+
+# Configuration
+STATE_PATH = 'analysis/bandit_state.npz'
+PRIOR_OPPORTUNITIES = performance_scoring.CONFIDENCE_THRESHOLD
+EXPLORATION_REPS = 20
+SAMPLES_PER_CHUNK = 4_000_000
+
+
+def _grown(array, shape):
+    """Return array with room for at least shape (each dimension that is too small doubles)."""
+    if all(size <= current for size, current in zip(shape, array.shape)):
+        return array
+    grown = np.zeros([current if size <= current else max(size, 2 * current)
+                      for size, current in zip(shape, array.shape)], dtype=array.dtype)
+    grown[tuple(slice(0, current) for current in array.shape)] = array
+    return grown
+
+
+class ThompsonRouter:
+    """Beta(prior + wins, prior + losses) per observed (BD, SR) pair, updated in place."""
+
+    def __init__(self, prior_opportunities=PRIOR_OPPORTUNITIES, exploration_reps=EXPLORATION_REPS):
+        self.prior_opportunities = prior_opportunities
+        self.exploration_reps = exploration_reps
+
+        # Rep dictionaries
+        self.bd_labels, self.bd_codes = [], {}
+        self.sr_labels, self.sr_codes = [], {}
+
+        # Posterior counts per observed pair (CSR by BD) and the prior per BD
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.pair_srs = np.zeros(0, dtype=np.int32)
+        self.wins = np.zeros(0, dtype=np.int32)
+        self.losses = np.zeros(0, dtype=np.int32)
+        self.prior_alpha = np.zeros(0, dtype=np.float32)
+        self.prior_beta = np.zeros(0, dtype=np.float32)
+
+        # Pairs first seen since the last merge: (bd code, sr code) -> [wins, losses]
+        self.new_pairs = {}
+
+    @classmethod
+    def from_pair_metrics(cls, pair_metrics, prior_opportunities=PRIOR_OPPORTUNITIES,
+                          exploration_reps=EXPLORATION_REPS):
+        df = storage.as_frame(pair_metrics)
+        router = cls(prior_opportunities, exploration_reps)
+        bd_codes, bd_labels = aggregation.factorize(df['bd_rep_id'])
+        sr_codes, sr_labels = aggregation.factorize(df['sales_rep_id'])
+        router.bd_labels, router.sr_labels = bd_labels.tolist(), sr_labels.tolist()
+        router.bd_codes = {label: code for code, label in enumerate(router.bd_labels)}
+        router.sr_codes = {label: code for code, label in enumerate(router.sr_labels)}
+        wins = df['total_closed_won'].to_numpy()
+        losses = df['total_closed_lost'].to_numpy()
+        router._store(bd_codes, sr_codes, wins, losses)
+
+        # Prior: the BD's win rate over all its pairs, as if seen over prior_opportunities decided deals
+        bd_wins = np.bincount(bd_codes, weights=wins, minlength=len(bd_labels))
+        bd_decided = bd_wins + np.bincount(bd_codes, weights=losses, minlength=len(bd_labels))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bd_win_rate = np.where(bd_decided > 0, bd_wins / bd_decided, 0.5)
+        router.prior_alpha = np.zeros(len(bd_labels), dtype=np.float32)
+        router.prior_beta = np.zeros(len(bd_labels), dtype=np.float32)
+        router._set_prior(np.arange(len(bd_labels)), bd_win_rate)
+        return router
+
+    def _store(self, bds, srs, wins, losses):
+        # Lay the pairs out as pair_matrix does: CSR by BD, sales rep codes ascending within a BD
+        layout = pair_matrix.PairMatrix.from_codes(bds, srs, np.arange(len(bds)), self.bd_labels, self.sr_labels)
+        self.indptr, self.pair_srs = layout.indptr, layout.sr_codes
+        self.wins = np.asarray(wins, dtype=np.int32)[layout.values]
+        self.losses = np.asarray(losses, dtype=np.int32)[layout.values]
+
+    def _merge(self):
+        # Fold the pairs first seen since the last merge into the CSR arrays
+        if not self.new_pairs and len(self.indptr) == len(self.bd_labels) + 1:
+            return
+        new_pairs = np.array(list(self.new_pairs), dtype=np.int64).reshape(-1, 2)
+        new_counts = np.array(list(self.new_pairs.values()), dtype=np.int32).reshape(-1, 2)
+        stored_bds = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        self._store(np.concatenate([stored_bds, new_pairs[:, 0]]),
+                    np.concatenate([self.pair_srs, new_pairs[:, 1]]),
+                    np.concatenate([self.wins, new_counts[:, 0]]),
+                    np.concatenate([self.losses, new_counts[:, 1]]))
+        self.new_pairs = {}
+
+    def _set_prior(self, bds, win_rate):
+        self.prior_alpha[bds] = 1 + self.prior_opportunities * win_rate
+        self.prior_beta[bds] = 1 + self.prior_opportunities * (1 - win_rate)
+
+    def _code(self, label, labels, codes):
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(labels)
+            labels.append(label)
+        return code
+
+    def _pair(self, bd_rep_id, sales_rep_id):
+        num_bds = len(self.bd_labels)
+        bd = self._code(bd_rep_id, self.bd_labels, self.bd_codes)
+        sr = self._code(sales_rep_id, self.sr_labels, self.sr_codes)
+        if bd == num_bds:
+            # A new BD starts from the average BD's win rate
+            self.prior_alpha = _grown(self.prior_alpha, (len(self.bd_labels),))
+            self.prior_beta = _grown(self.prior_beta, (len(self.bd_labels),))
+            win_rates = (self.prior_alpha[:num_bds] - 1) / self.prior_opportunities
+            self._set_prior(bd, win_rates.mean() if num_bds else 0.5)
+        return bd, sr
+
+    def _slot(self, bd, sr):
+        # Position of a stored pair in the CSR arrays, or -1
+        if bd + 1 >= len(self.indptr):
+            return -1
+        start, stop = self.indptr[bd:bd + 2].tolist()
+        slot = start + int(self.pair_srs[start:stop].searchsorted(sr))
+        return slot if slot < stop and self.pair_srs[slot] == sr else -1
+
+    def _add_new(self, bd, sr, won):
+        self.new_pairs.setdefault((bd, sr), [0, 0])[0 if won else 1] += 1
+
+    def _merge_if_full(self):
+        if len(self.new_pairs) > max(len(self.pair_srs) // 8, 1024):
+            self._merge()
+
+    def record(self, bd_rep_id, sales_rep_id, won):
+        """Fold in one closed opportunity: O(log pairs of the BD), plus amortized merging for new pairs."""
+        bd, sr = self._pair(bd_rep_id, sales_rep_id)
+        slot = self._slot(bd, sr)
+        if slot < 0:
+            self._add_new(bd, sr, won)
+            self._merge_if_full()
+        elif won:
+            self.wins[slot] += 1
+        else:
+            self.losses[slot] += 1
+
+    def record_batch(self, bd_rep_ids, sales_rep_ids, won):
+        """Fold in many closed opportunities at once."""
+        pairs = [self._pair(bd, sr) for bd, sr in zip(bd_rep_ids, sales_rep_ids)]
+        if not pairs:
+            return
+        bds, srs = np.array(pairs, dtype=np.int64).T
+        won = np.asarray(won, dtype=bool)
+
+        # Stored pairs are sorted by (BD, sales rep), so one key search finds them all
+        num_srs = len(self.sr_labels)
+        stored_keys = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr)) * num_srs + self.pair_srs
+        keys = bds * num_srs + srs
+        slots = np.minimum(np.searchsorted(stored_keys, keys), max(len(stored_keys) - 1, 0))
+        stored = (stored_keys[slots] == keys) if len(stored_keys) else np.zeros(len(keys), dtype=bool)
+        np.add.at(self.wins, slots[stored & won], 1)
+        np.add.at(self.losses, slots[stored & ~won], 1)
+        for bd, sr, outcome in zip(bds[~stored].tolist(), srs[~stored].tolist(), won[~stored].tolist()):
+            self._add_new(bd, sr, outcome)
+        self._merge_if_full()
+
+    def record_opportunities(self, opportunities):
+        """Fold in the closed rows of an opportunities frame; open rows are ignored."""
+        closed = opportunities[opportunities['outcome'].isin(['Closed Won', 'Closed Lost'])]
+        self.record_batch(closed['bd_rep_id'].astype(str).tolist(), closed['sales_rep_id'].astype(str).tolist(),
+                          (closed['outcome'] == 'Closed Won').to_numpy())
+
+    def sample_codes(self, bd_codes, rng=None):
+        """Sales rep code chosen by Thompson sampling for each lead's BD code.
+
+        Each lead samples all of its BD's observed reps plus exploration_reps others drawn at
+        random from the rest of the roster. Those all share the BD's prior, so the best of their
+        draws is one max over exploration_reps prior samples, credited to a random unseen rep.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        self._merge()
+        bd_codes = np.asarray(bd_codes, dtype=np.int64)
+        chosen = np.empty(len(bd_codes), dtype=np.int64)
+        order = np.argsort(bd_codes, kind='stable')
+        bds, starts = np.unique(bd_codes[order], return_index=True)
+        for bd, leads in zip(bds.tolist(), np.split(order, starts[1:])):
+            start, stop = self.indptr[bd], self.indptr[bd + 1]
+            observed = self.pair_srs[start:stop]
+            best = np.full(len(leads), -1.0)
+            best_code = np.zeros(len(leads), dtype=np.int64)
+            if len(observed):
+                alpha = self.wins[start:stop] + self.prior_alpha[bd]
+                beta = self.losses[start:stop] + self.prior_beta[bd]
+                chunk = max(SAMPLES_PER_CHUNK // len(observed), 1)
+                for i in range(0, len(leads), chunk):
+                    draws = rng.beta(alpha, beta, (len(leads[i:i + chunk]), len(observed)))
+                    best[i:i + chunk] = draws.max(axis=1)
+                    best_code[i:i + chunk] = observed[draws.argmax(axis=1)]
+
+            num_unseen = len(self.sr_labels) - len(observed)
+            num_explored = min(self.exploration_reps, num_unseen)
+            if num_explored > 0:
+                explored = rng.beta(self.prior_alpha[bd], self.prior_beta[bd],
+                                    (len(leads), num_explored)).max(axis=1)
+                # The r-th sales rep code missing from the (sorted) observed codes
+                unseen = rng.integers(0, num_unseen, len(leads))
+                unseen += np.searchsorted(observed - np.arange(len(observed)), unseen, side='right')
+                explores = explored > best
+                best_code[explores] = unseen[explores]
+            chosen[leads] = best_code
+        return chosen
+
+    def route(self, bd_rep_ids, rng=None):
+        """Sampled sales_rep_id for each lead, given the BD that owns it. Raises KeyError for unknown BDs."""
+        bd_codes = pd.Index(self.bd_labels).get_indexer(pd.Index(bd_rep_ids).astype(str))
+        if (bd_codes < 0).any():
+            raise KeyError(bd_rep_ids[int(np.flatnonzero(bd_codes < 0)[0])])
+        return np.asarray(self.sr_labels, dtype=object)[self.sample_codes(bd_codes, rng)]
+
+    def posterior_means(self):
+        """Posterior mean win probability and decided count per pair with any history."""
+        self._merge()
+        bds = np.repeat(np.arange(len(self.bd_labels)), np.diff(self.indptr))
+        decided = self.wins + self.losses
+        alpha = self.wins + self.prior_alpha[bds]
+        beta = self.losses + self.prior_beta[bds]
+        seen = decided > 0
+        return pd.DataFrame({
+            'bd_rep_id': np.asarray(self.bd_labels, dtype=object)[bds[seen]],
+            'sales_rep_id': np.asarray(self.sr_labels, dtype=object)[self.pair_srs[seen]],
+            'decided': decided[seen],
+            'posterior_win_rate': (alpha / (alpha + beta))[seen]
+        })
+
+    @property
+    def nbytes(self):
+        return (self.indptr.nbytes + self.pair_srs.nbytes + self.wins.nbytes + self.losses.nbytes +
+                self.prior_alpha.nbytes + self.prior_beta.nbytes)
+
+    def save(self, path=STATE_PATH):
+        self._merge()
+        num_bds = len(self.bd_labels)
+        np.savez_compressed(
+            path,
+            bd_labels=np.array(self.bd_labels, dtype=str),
+            sr_labels=np.array(self.sr_labels, dtype=str),
+            indptr=self.indptr,
+            pair_srs=self.pair_srs,
+            wins=self.wins,
+            losses=self.losses,
+            prior_alpha=self.prior_alpha[:num_bds],
+            prior_beta=self.prior_beta[:num_bds],
+            prior_opportunities=self.prior_opportunities,
+            exploration_reps=self.exploration_reps
+        )
+        return path
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path) as saved:
+            router = cls(float(saved['prior_opportunities']), int(saved['exploration_reps']))
+            router.bd_labels = saved['bd_labels'].tolist()
+            router.sr_labels = saved['sr_labels'].tolist()
+            router.bd_codes = {label: code for code, label in enumerate(router.bd_labels)}
+            router.sr_codes = {label: code for code, label in enumerate(router.sr_labels)}
+            router.indptr, router.pair_srs = saved['indptr'], saved['pair_srs']
+            router.wins, router.losses = saved['wins'], saved['losses']
+            router.prior_alpha, router.prior_beta = saved['prior_alpha'], saved['prior_beta']
+        return router
+
+
+def synthetic_router(num_bds, num_sales_reps, pairs_per_bd=100, seed=42):
+    """Router where each BD has random history with pairs_per_bd random sales reps."""
+    rng = np.random.default_rng(seed)
+    router = ThompsonRouter()
+    router.bd_labels = [f'BD_{i:05d}' for i in range(1, num_bds + 1)]
+    router.sr_labels = [f'SR_{i:05d}' for i in range(1, num_sales_reps + 1)]
+    router.bd_codes = {label: code for code, label in enumerate(router.bd_labels)}
+    router.sr_codes = {label: code for code, label in enumerate(router.sr_labels)}
+    pairs_per_bd = min(pairs_per_bd, num_sales_reps)
+    bds = np.repeat(np.arange(num_bds), pairs_per_bd)
+    srs = np.concatenate([rng.choice(num_sales_reps, pairs_per_bd, replace=False) for _ in range(num_bds)])
+    decided = rng.poisson(4, len(bds))
+    wins = rng.binomial(decided, rng.beta(2, 3, len(bds)))
+    router._store(bds, srs, wins, decided - wins)
+    router.prior_alpha = np.zeros(num_bds, dtype=np.float32)
+    router.prior_beta = np.zeros(num_bds, dtype=np.float32)
+    router._set_prior(np.arange(num_bds), 0.4)
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route leads by Thompson sampling over pair win posteriors')
+    parser.add_argument('--state', default=STATE_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('init', help='seed posteriors from pair_metrics')
+
+    route_parser = commands.add_parser('route', help='sample routes for a batch of leads from one BD')
+    route_parser.add_argument('bd_rep_id')
+    route_parser.add_argument('--leads', type=int, default=100)
+    route_parser.add_argument('--seed', type=int, default=None)
+
+    record_parser = commands.add_parser('record', help='record a closed opportunity')
+    record_parser.add_argument('bd_rep_id')
+    record_parser.add_argument('sales_rep_id')
+    record_parser.add_argument('outcome', choices=['won', 'lost'])
+
+    bench_parser = commands.add_parser('benchmark', help='time updates and batch sampling on synthetic posteriors')
+    bench_parser.add_argument('--bds', type=int, default=1000)
+    bench_parser.add_argument('--reps', type=int, default=2000)
+    bench_parser.add_argument('--pairs-per-bd', type=int, default=100, help='sales reps each BD has history with')
+    bench_parser.add_argument('--leads', type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        print("Loading pair metrics...")
+        router = ThompsonRouter.from_pair_metrics(storage.read_table('pair_metrics'))
+        print(f"Seeded {len(router.bd_labels):,} BDs x {len(router.sr_labels):,} sales reps "
+              f"({router.nbytes / 1e6:.2f} MB)")
+        print(f"Saved to {router.save(args.state)}")
+    elif args.command == 'route':
+        router = ThompsonRouter.load(args.state)
+        try:
+            routes = router.route([args.bd_rep_id] * args.leads, np.random.default_rng(args.seed))
+        except KeyError:
+            sys.exit(f"unknown bd_rep_id {args.bd_rep_id}")
+        shares = pd.Series(routes).value_counts(normalize=True)
+        for rep, share in shares.items():
+            print(f"{rep}  {share * 100:5.1f}%")
+    elif args.command == 'record':
+        router = ThompsonRouter.load(args.state)
+        router.record(args.bd_rep_id, args.sales_rep_id, args.outcome == 'won')
+        print(f"Saved to {router.save(args.state)}")
+    else:
+        print(f"Building synthetic posteriors for {args.bds:,} BDs x {args.reps:,} sales reps...")
+        router = synthetic_router(args.bds, args.reps, args.pairs_per_bd)
+        print(f"Posterior state: {router.nbytes / 1e6:.1f} MB for {len(router.pair_srs):,} observed pairs "
+              f"({args.bds * args.reps * 8 / 1e6:,.0f} MB as dense int32 matrices)")
+
+        rng = np.random.default_rng(0)
+        bds = rng.choice(router.bd_labels, 100_000).tolist()
+        srs = rng.choice(router.sr_labels, 100_000).tolist()
+        won = (rng.random(100_000) < 0.4).tolist()
+        started = time.perf_counter()
+        for bd, sr, outcome in zip(bds, srs, won):
+            router.record(bd, sr, outcome)
+        elapsed = time.perf_counter() - started
+        print(f"record: {elapsed / len(bds) * 1e6:.2f} us per closed opportunity")
+
+        leads = rng.choice(router.bd_labels, args.leads)
+        started = time.perf_counter()
+        router.route(leads, rng)
+        elapsed = time.perf_counter() - started
+        print(f"route: {args.leads:,} leads in {elapsed:.2f}s ({elapsed / args.leads * 1e6:.1f} us per lead)")
+
+
+if __name__ == '__main__':
+    main()
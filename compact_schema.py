@@ -0,0 +1,298 @@
+"""
+Compact Schema
+Integer-coded, packed in-memory layout for opportunities and analysis tables
+
+Loaded from CSV, every rep ID, opportunity ID, outcome, stage and date is a
+Python string object, and every number is 64 bits wide. The compact layout keeps
+the same rows in far fewer bytes:
+
+    opportunity_id          int32 number; the prefix and zero padding are metadata
+    rep IDs, labels         categoricals (int8/int16 codes into one sorted dictionary)
+    created/closed dates    int32 day offsets from an origin day kept in metadata
+    deal_value              int32 cents (float32 cannot hold every cent above $167,772)
+    counters                smallest integer type that fits
+    derived metrics         float32
+    strength/concern flags  one uint8 bitmask; the totals are its bit counts
+    percentile thresholds   stored once in metadata instead of on every row
+
+Metadata lives in DataFrame.attrs['compact'], and the expand functions restore the
+original columns. Only float32 metrics are rounded (about 7 significant digits).
+
+    python compact_schema.py                    # memory report for the current data
+    python compact_schema.py --rows 2000000     # report for a generated dataset of this size
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_generation
+import storage
+
+# Configuration
+LABEL_COLUMNS = ['bd_rep_id', 'sales_rep_id', 'outcome', 'current_stage', 'performance_classification']
+DATE_COLUMNS = ['created_date', 'closed_date']
+THRESHOLD_COLUMNS = ['percentile_75th', 'percentile_50th', 'percentile_25th', 'percentile_10th']
+STRENGTH_COLUMNS = ['strength_high_win_rate', 'strength_low_early_death',
+                    'strength_low_stale', 'strength_high_deal_size']
+CONCERN_COLUMNS = ['concern_low_win_rate', 'concern_high_early_death',
+                   'concern_high_stale', 'concern_low_deal_size']
+# Bit i of the flags column is FLAG_COLUMNS[i]: strengths in the low nibble, concerns in the high one
+FLAG_COLUMNS = STRENGTH_COLUMNS + CONCERN_COLUMNS
+MISSING = np.iinfo(np.int32).min
+REPORT_TABLES = ['pair_metrics', 'performance_scores']
+
+
+def _smallest_int(values):
+    return pd.to_numeric(values, downcast='integer')
+
+
+def _day_numbers(dates):
+    # Days since 1970-01-01, MISSING where there is no date
+    days = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[D]')
+    return np.where(np.isnat(days), MISSING, days.astype(np.int64))
+
+
+def _cents(values):
+    """int32 cents when every value is a whole number of cents that fits, else None."""
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    cents = np.round(values[present] * 100)
+    if len(cents) and (np.abs(cents).max() > np.iinfo(np.int32).max or
+                       not np.array_equal(cents / 100, values[present])):
+        return None
+    result = np.full(len(values), MISSING, dtype=np.int32)
+    result[present] = cents
+    return result
+
+
+def compact_opportunities(df):
+    """Opportunities in the compact layout, with the metadata to expand them again."""
+    df = storage.as_frame(df)
+    meta = {'columns': list(df.columns)}
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'opportunity_id':
+            encoded = storage.encode_ids(values)
+            if encoded is None:
+                columns[col] = values.astype('category')
+            else:
+                meta['id_prefix'], meta['id_width'], columns[col] = encoded
+        elif col in LABEL_COLUMNS:
+            columns[col] = values.astype('category')
+        elif col in DATE_COLUMNS:
+            columns[col.replace('_date', '_day')] = _day_numbers(values)
+        elif col == 'deal_value':
+            cents = _cents(values)
+            if cents is None:
+                columns[col] = values.to_numpy(dtype=np.float64)
+            else:
+                columns['deal_value_cents'] = cents
+        elif pd.api.types.is_integer_dtype(values):
+            columns[col] = _smallest_int(values)
+        else:
+            columns[col] = values
+
+    # Day numbers become int32 offsets from the earliest date
+    day_columns = [col.replace('_date', '_day') for col in DATE_COLUMNS if col in df.columns]
+    present = [columns[col][columns[col] != MISSING] for col in day_columns]
+    origin = int(min((days.min() for days in present if len(days)), default=0))
+    for col in day_columns:
+        days = columns[col]
+        columns[col] = np.where(days == MISSING, MISSING, days - origin).astype(np.int32)
+    meta['day_origin'] = origin
+
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.attrs['compact'] = meta
+    return compact
+
+
+def expand_opportunities(compact):
+    """The original opportunities layout: string IDs, 'YYYY-MM-DD' dates, float deal values."""
+    meta = compact.attrs['compact']
+    columns = {}
+    for col in meta['columns']:
+        if col == 'opportunity_id' and 'id_prefix' in meta:
+            columns[col] = storage.format_ids(meta['id_prefix'], meta['id_width'], compact[col].to_numpy())
+        elif col in DATE_COLUMNS:
+            offsets = compact[col.replace('_date', '_day')].to_numpy()
+            dates = np.datetime_as_string(
+                (offsets.astype(np.int64) + meta['day_origin']).astype('datetime64[D]')).astype(object)
+            dates[offsets == MISSING] = np.nan
+            columns[col] = dates
+        elif col == 'deal_value' and 'deal_value_cents' in compact.columns:
+            cents = compact['deal_value_cents'].to_numpy()
+            columns[col] = np.where(cents == MISSING, np.nan, cents / 100)
+        elif col in LABEL_COLUMNS:
+            columns[col] = compact[col].astype(object).to_numpy()
+        elif pd.api.types.is_integer_dtype(compact[col]):
+            columns[col] = compact[col].to_numpy(dtype=np.int64)
+        else:
+            columns[col] = compact[col].to_numpy()
+    return pd.DataFrame(columns, index=compact.index)
+
+
+def compact_table(df):
+    """An analysis table (pair_metrics, performance_scores) in the compact layout."""
+    df = storage.as_frame(df)
+    meta = {'columns': list(df.columns), 'thresholds': {}}
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in THRESHOLD_COLUMNS:
+            # The same global value on every row
+            if values.nunique(dropna=False) <= 1:
+                meta['thresholds'][col] = float(values.iloc[0]) if len(values) else np.nan
+                continue
+            columns[col] = values.to_numpy(dtype=np.float64)
+        elif col in FLAG_COLUMNS or col in ('total_strengths', 'total_concerns'):
+            continue
+        elif col in LABEL_COLUMNS or pd.api.types.is_string_dtype(values):
+            columns[col] = values.astype('category')
+        elif pd.api.types.is_integer_dtype(values):
+            columns[col] = _smallest_int(values)
+        elif pd.api.types.is_float_dtype(values):
+            columns[col] = values.to_numpy(dtype=np.float32)
+        else:
+            columns[col] = values
+
+    flag_columns = [col for col in FLAG_COLUMNS if col in df.columns]
+    if flag_columns:
+        flags = np.zeros(len(df), dtype=np.uint8)
+        for col in flag_columns:
+            flags |= df[col].to_numpy(dtype=bool).astype(np.uint8) << FLAG_COLUMNS.index(col)
+        columns['flags'] = flags
+
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.attrs['compact'] = meta
+    return compact
+
+
+def flag(compact, name):
+    """One strength or concern flag column, unpacked from the bitmask."""
+    return (compact['flags'].to_numpy() >> FLAG_COLUMNS.index(name) & 1).astype(bool)
+
+
+def expand_table(compact):
+    """The original analysis table layout, thresholds and flag columns included."""
+    meta = compact.attrs['compact']
+    columns = {}
+    for col in meta['columns']:
+        if col in meta['thresholds']:
+            columns[col] = np.full(len(compact), meta['thresholds'][col])
+        elif col in FLAG_COLUMNS:
+            columns[col] = flag(compact, col)
+        elif col in ('total_strengths', 'total_concerns'):
+            names = STRENGTH_COLUMNS if col == 'total_strengths' else CONCERN_COLUMNS
+            columns[col] = np.sum([flag(compact, name) for name in names], axis=0, dtype=np.int64)
+        elif col == 'performance_classification':
+            columns[col] = compact[col]
+        elif isinstance(compact[col].dtype, pd.CategoricalDtype):
+            columns[col] = compact[col].astype(object).to_numpy()
+        elif pd.api.types.is_integer_dtype(compact[col]):
+            columns[col] = compact[col].to_numpy(dtype=np.int64)
+        elif pd.api.types.is_float_dtype(compact[col]):
+            columns[col] = compact[col].to_numpy(dtype=np.float64)
+        else:
+            columns[col] = compact[col].to_numpy()
+    return pd.DataFrame(columns, index=compact.index)
+
+
+def memory_bytes(df):
+    """Deep in-memory size: string objects and categorical dictionaries included."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def _compact_column(col, compact):
+    # Where a column of the original layout lives in the compact one (None: metadata only)
+    for name in (col, col.replace('_date', '_day'), 'deal_value_cents' if col == 'deal_value' else None,
+                 'flags' if col in FLAG_COLUMNS + ['total_strengths', 'total_concerns'] else None):
+        if name in compact.columns:
+            return name
+    return None
+
+
+def column_report(original, compact):
+    """Bytes per original column and the compact column holding it (flags share one bitmask)."""
+    before = original.memory_usage(deep=True, index=False)
+    after = compact.memory_usage(deep=True, index=False)
+    rows = []
+    for col in original.columns:
+        target = _compact_column(col, compact)
+        rows.append({'column': col, 'dtype': str(original[col].dtype), 'bytes': int(before[col]),
+                     'compact_column': target or '(metadata)',
+                     'compact_dtype': str(compact[target].dtype) if target else '',
+                     'compact_bytes': int(after[target]) if target else 0})
+    return pd.DataFrame(rows)
+
+
+def memory_report(tables):
+    """One row per table: rows, MB before and after, and the reduction factor.
+
+    tables maps a name to an (original, compact) pair of frames.
+    """
+    rows = []
+    for name, (original, compact) in tables.items():
+        before, after = memory_bytes(original), memory_bytes(compact)
+        rows.append({'table': name, 'rows': len(original), 'original_mb': before / 1e6,
+                     'compact_mb': after / 1e6, 'bytes_per_row': after / max(len(original), 1),
+                     'reduction': before / max(after, 1)})
+    return pd.DataFrame(rows)
+
+
+def _as_loaded(chunk):
+    # A generated chunk in the layout read_opportunities gives for the CSV: strings and floats
+    df = chunk.copy()
+    for col in ['opportunity_id', 'bd_rep_id', 'sales_rep_id', 'outcome', 'current_stage']:
+        df[col] = df[col].astype(object)
+    for col in DATE_COLUMNS:
+        dates = np.datetime_as_string(df[col].to_numpy(dtype='datetime64[D]')).astype(object)
+        dates[df[col].isna().to_numpy()] = np.nan
+        df[col] = dates
+    df['days_in_current_stage'] = df['days_in_current_stage'].astype(np.int64)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact in-memory layout and memory report')
+    parser.add_argument('--rows', type=int, help='report on generated opportunities instead of data/')
+    parser.add_argument('--bd-reps', type=int, default=500)
+    parser.add_argument('--sales-reps', type=int, default=2000)
+    parser.add_argument('--columns', action='store_true', help='also show bytes per column')
+    args = parser.parse_args()
+
+    if args.rows:
+        print(f"Generating {args.rows:,} opportunities...")
+        chemistry = data_generation.chemistry_matrix(args.bd_reps, args.sales_reps)
+        opportunities = _as_loaded(data_generation.generate_chunk(
+            0, 0, args.rows, chemistry, data_generation.rep_ids('BD', args.bd_reps),
+            data_generation.rep_ids('SR', args.sales_reps)))
+        names = []
+    else:
+        print("Loading opportunities data...")
+        opportunities = storage.read_opportunities()
+        names = REPORT_TABLES
+
+    started = time.perf_counter()
+    tables = {'opportunities': (opportunities, compact_opportunities(opportunities))}
+    print(f"Compacted opportunities in {time.perf_counter() - started:.2f}s")
+    for name in names:
+        try:
+            table = storage.read_table(name)
+        except FileNotFoundError:
+            continue
+        tables[name] = (table, compact_table(table))
+
+    print("\nMemory report:")
+    print(memory_report(tables).to_string(index=False, float_format=lambda x: f'{x:,.2f}'))
+    if args.columns:
+        for name, (original, compact) in tables.items():
+            print(f"\n{name}:")
+            print(column_report(original, compact).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
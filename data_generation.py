@@ -3,88 +3,302 @@ Data Generation Script
 Generates simulated BD-Sales opportunity data for analysis
 """
 
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+import storage
+
 # Configuration
-np.random.seed(42)
+SEED = 42
 NUM_OPPORTUNITIES = 2200
 NUM_BD_REPS = 18
 NUM_SALES_REPS = 23
 START_DATE = datetime(2023, 1, 1)
 END_DATE = datetime(2024, 12, 31)
+OUTPUT_PATH = 'data/opportunities.csv'
+SHARD_DIR = 'data/opportunities_shards'
+
+# Batched mode configuration
+CHUNK_SIZE = 1_000_000
+OUTCOMES = ['Closed Won', 'Closed Lost', 'Open']
+STAGES = ['Closed Won', 'Closed Lost', 'Qualification', 'Proposal', 'Negotiation']
+COLUMNS = [
+    'opportunity_id', 'bd_rep_id', 'sales_rep_id', 'created_date', 'closed_date',
+    'outcome', 'current_stage', 'days_in_current_stage', 'deal_value'
+]
+
+
+def rep_ids(prefix, count):
+    return [f'{prefix}_{str(i+1).zfill(3)}' for i in range(count)]
+
+
+def generate_legacy(num_opportunities=NUM_OPPORTUNITIES, num_bd_reps=NUM_BD_REPS,
+                    num_sales_reps=NUM_SALES_REPS, seed=SEED):
+    """Original row-by-row generator (chemistry depends on PYTHONHASHSEED)."""
+    np.random.seed(seed)
+
+    # Generate BD and Sales rep IDs
+    bd_reps = rep_ids('BD', num_bd_reps)
+    sales_reps = rep_ids('SR', num_sales_reps)
+
+    # Generate opportunities
+    opportunities = []
+
+    for i in range(num_opportunities):
+        # Random pairing
+        bd_rep = np.random.choice(bd_reps)
+        sales_rep = np.random.choice(sales_reps)
+
+        # Create chemistry factor for pairing
+        pairing_key = f"{bd_rep}_{sales_rep}"
+        np.random.seed(hash(pairing_key) % 2**32)
+        chemistry = np.random.normal(0, 0.3)
+
+        # Generate dates
+        created_date = START_DATE + timedelta(days=np.random.randint(0, (END_DATE - START_DATE).days))
+
+        # Generate outcome based on chemistry
+        outcome_prob = 0.25 + chemistry
+        outcome_rand = np.random.random()
+
+        if outcome_rand < outcome_prob:
+            outcome = 'Closed Won'
+            current_stage = 'Closed Won'
+            days_in_stage = np.random.randint(1, 30)
+        elif outcome_rand < outcome_prob + 0.30:
+            outcome = 'Closed Lost'
+            current_stage = 'Closed Lost'
+            days_in_stage = np.random.randint(1, 30)
+        else:
+            outcome = 'Open'
+            current_stage = np.random.choice(['Qualification', 'Proposal', 'Negotiation'])
+            days_in_stage = np.random.randint(1, 120)
+
+        # Generate deal value
+        base_value = np.random.lognormal(10.8, 0.6)
+        deal_value = max(5000, min(500000, base_value))
+
+        # Calculate closed date
+        if outcome in ['Closed Won', 'Closed Lost']:
+            days_to_close = np.random.randint(30, 180)
+            closed_date = created_date + timedelta(days=days_to_close)
+        else:
+            closed_date = None
+
+        opportunities.append({
+            'opportunity_id': f'OPP_{str(i+1).zfill(4)}',
+            'bd_rep_id': bd_rep,
+            'sales_rep_id': sales_rep,
+            'created_date': created_date,
+            'closed_date': closed_date,
+            'outcome': outcome,
+            'current_stage': current_stage,
+            'days_in_current_stage': days_in_stage,
+            'deal_value': round(deal_value, 2)
+        })
 
-# Generate BD and Sales rep IDs
-bd_reps = [f'BD_{str(i+1).zfill(3)}' for i in range(NUM_BD_REPS)]
-sales_reps = [f'SR_{str(i+1).zfill(3)}' for i in range(NUM_SALES_REPS)]
+        # Reset seed for next iteration
+        np.random.seed(seed + i)
 
-# Generate opportunities
-opportunities = []
+    return pd.DataFrame(opportunities)
+
+
+def chemistry_matrix(num_bd_reps, num_sales_reps, seed=SEED):
+    """Fixed chemistry factor for every BD x SR pairing, drawn once per run."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    return rng.normal(0, 0.3, size=(num_bd_reps, num_sales_reps))
+
+
+def generate_chunk(chunk_index, start, stop, chemistry, bd_reps, sales_reps, seed=SEED):
+    """Build opportunities start..stop-1 as whole columns.
+
+    Each chunk draws from its own SeedSequence child, so the rows of a chunk
+    depend only on (seed, chunk_index, start, stop) and not on what ran before.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+    n = stop - start
+    num_days = (END_DATE - START_DATE).days
 
-for i in range(NUM_OPPORTUNITIES):
     # Random pairing
-    bd_rep = np.random.choice(bd_reps)
-    sales_rep = np.random.choice(sales_reps)
-    
-    # Create chemistry factor for pairing
-    pairing_key = f"{bd_rep}_{sales_rep}"
-    np.random.seed(hash(pairing_key) % 2**32)
-    chemistry = np.random.normal(0, 0.3)
-    
+    bd_codes = rng.integers(0, len(bd_reps), n)
+    sr_codes = rng.integers(0, len(sales_reps), n)
+
     # Generate dates
-    created_date = START_DATE + timedelta(days=np.random.randint(0, (END_DATE - START_DATE).days))
-    
-    # Generate outcome based on chemistry
-    outcome_prob = 0.25 + chemistry
-    outcome_rand = np.random.random()
-    
-    if outcome_rand < outcome_prob:
-        outcome = 'Closed Won'
-        current_stage = 'Closed Won'
-        days_in_stage = np.random.randint(1, 30)
-    elif outcome_rand < outcome_prob + 0.30:
-        outcome = 'Closed Lost'
-        current_stage = 'Closed Lost'
-        days_in_stage = np.random.randint(1, 30)
-    else:
-        outcome = 'Open'
-        current_stage = np.random.choice(['Qualification', 'Proposal', 'Negotiation'])
-        days_in_stage = np.random.randint(1, 120)
-    
+    created_date = np.datetime64(START_DATE.date(), 'D') + rng.integers(0, num_days, n)
+
+    # Generate outcome based on chemistry (codes index into OUTCOMES)
+    outcome_prob = 0.25 + chemistry[bd_codes, sr_codes]
+    outcome_rand = rng.random(n)
+    outcome_codes = np.where(outcome_rand < outcome_prob, 0,
+                             np.where(outcome_rand < outcome_prob + 0.30, 1, 2))
+    closed = outcome_codes < 2
+
+    # Open deals land in one of the three pipeline stages (codes index into STAGES)
+    stage_codes = np.where(closed, outcome_codes, 2 + rng.integers(0, 3, n))
+    days_in_stage = rng.integers(1, np.where(closed, 30, 120))
+
     # Generate deal value
-    base_value = np.random.lognormal(10.8, 0.6)
-    deal_value = max(5000, min(500000, base_value))
-    
+    deal_value = np.round(np.clip(rng.lognormal(10.8, 0.6, n), 5000, 500000), 2)
+
     # Calculate closed date
-    if outcome in ['Closed Won', 'Closed Lost']:
-        days_to_close = np.random.randint(30, 180)
-        closed_date = created_date + timedelta(days=days_to_close)
-    else:
-        closed_date = None
-    
-    opportunities.append({
-        'opportunity_id': f'OPP_{str(i+1).zfill(4)}',
-        'bd_rep_id': bd_rep,
-        'sales_rep_id': sales_rep,
+    closed_date = np.where(closed, created_date + rng.integers(30, 180, n),
+                           np.datetime64('NaT', 'D'))
+
+    # str.zfill pads like the legacy f-string; np.char.zfill would cut OPP_10000 down to OPP_1000
+    opportunity_ids = ('OPP_' + pd.Series(np.arange(start + 1, stop + 1)).astype(str).str.zfill(4)).to_numpy()
+
+    return pd.DataFrame({
+        'opportunity_id': opportunity_ids,
+        'bd_rep_id': pd.Categorical.from_codes(bd_codes, bd_reps),
+        'sales_rep_id': pd.Categorical.from_codes(sr_codes, sales_reps),
         'created_date': created_date,
         'closed_date': closed_date,
-        'outcome': outcome,
-        'current_stage': current_stage,
+        'outcome': pd.Categorical.from_codes(outcome_codes, OUTCOMES),
+        'current_stage': pd.Categorical.from_codes(stage_codes, STAGES),
         'days_in_current_stage': days_in_stage,
-        'deal_value': round(deal_value, 2)
-    })
-    
-    # Reset seed for next iteration
-    np.random.seed(42 + i)
-
-# Create DataFrame
-df = pd.DataFrame(opportunities)
-
-# Save to CSV
-df.to_csv('data/opportunities.csv', index=False)
-
-print(f"Generated {len(df)} opportunities")
-print(f"BD Reps: {df['bd_rep_id'].nunique()}")
-print(f"Sales Reps: {df['sales_rep_id'].nunique()}")
-print(f"Unique pairings: {df.groupby(['bd_rep_id', 'sales_rep_id']).ngroups}")
\ No newline at end of file
+        'deal_value': deal_value
+    }, columns=COLUMNS)
+
+
+def chunk_bounds(num_opportunities, chunk_size):
+    return [(k, start, min(start + chunk_size, num_opportunities))
+            for k, start in enumerate(range(0, num_opportunities, chunk_size))]
+
+
+def write_chunks(output_path, chunks, chemistry, bd_reps, sales_reps, seed=SEED):
+    for i, (k, start, stop) in enumerate(chunks):
+        chunk = generate_chunk(k, start, stop, chemistry, bd_reps, sales_reps, seed)
+        if storage.STORAGE_FORMAT == 'parquet':
+            # Every chunk becomes its own file(s) inside the month-partitioned dataset
+            storage.write_opportunities(chunk, part=k, path=output_path)
+        else:
+            chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+
+def generate_batched(output_path=OUTPUT_PATH, num_opportunities=NUM_OPPORTUNITIES,
+                     num_bd_reps=NUM_BD_REPS, num_sales_reps=NUM_SALES_REPS,
+                     seed=SEED, chunk_size=CHUNK_SIZE):
+    """Vectorized generator that streams chunk_size rows at a time to output_path."""
+    bd_reps = rep_ids('BD', num_bd_reps)
+    sales_reps = rep_ids('SR', num_sales_reps)
+    chemistry = chemistry_matrix(num_bd_reps, num_sales_reps, seed)
+
+    chunks = chunk_bounds(num_opportunities, chunk_size)
+    storage.reset_opportunities(output_path)
+    write_chunks(output_path, chunks, chemistry, bd_reps, sales_reps, seed)
+
+    return len(chunks)
+
+
+# Per-process generator inputs, set once by the pool initializer
+_shard_context = {}
+
+
+def _init_shard_worker(chemistry, bd_reps, sales_reps, seed):
+    _shard_context.update(chemistry=chemistry, bd_reps=bd_reps, sales_reps=sales_reps, seed=seed)
+
+
+def _write_shard(output_path, chunks):
+    write_chunks(output_path, chunks, **_shard_context)
+    return output_path
+
+
+def generate_sharded(output_dir=SHARD_DIR, num_opportunities=NUM_OPPORTUNITIES,
+                     num_bd_reps=NUM_BD_REPS, num_sales_reps=NUM_SALES_REPS,
+                     seed=SEED, chunk_size=CHUNK_SIZE, workers=None):
+    """Generate across worker processes, one part-NNNNN.csv shard per worker.
+
+    Worker w owns a contiguous range of chunks, and therefore of opportunity_ids.
+    Every chunk draws from its own SeedSequence child, so concatenating the shards
+    in order gives the same rows as generate_batched for any worker count. With
+    Parquet storage all workers write their chunks into the one dataset at output_dir.
+    """
+    workers = workers or os.cpu_count()
+    bd_reps = rep_ids('BD', num_bd_reps)
+    sales_reps = rep_ids('SR', num_sales_reps)
+    chemistry = chemistry_matrix(num_bd_reps, num_sales_reps, seed)
+
+    chunks = chunk_bounds(num_opportunities, chunk_size)
+    workers = max(1, min(workers, len(chunks)))
+    shard_ranges = np.array_split(np.arange(len(chunks)), workers)
+
+    # Drop shards left over from a previous run with more workers
+    storage.reset_opportunities(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    for stale_shard in glob.glob(os.path.join(output_dir, 'part-*.csv')):
+        os.remove(stale_shard)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker,
+                             initargs=(chemistry, bd_reps, sales_reps, seed)) as pool:
+        futures = [
+            pool.submit(_write_shard, os.path.join(output_dir, f'part-{w:05d}.csv'),
+                        [chunks[k] for k in shard])
+            for w, shard in enumerate(shard_ranges)
+        ]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate simulated BD-Sales opportunity data')
+    parser.add_argument('--mode', choices=['legacy', 'batched', 'sharded'], default='legacy',
+                        help='legacy: original row loop; batched: vectorized chunked writer; '
+                             'sharded: batched generation split across worker processes')
+    parser.add_argument('--rows', type=int, default=NUM_OPPORTUNITIES)
+    parser.add_argument('--bd-reps', type=int, default=NUM_BD_REPS)
+    parser.add_argument('--sales-reps', type=int, default=NUM_SALES_REPS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='rows generated and written per chunk (batched/sharded modes)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for sharded mode (default: all cores)')
+    parser.add_argument('--output', default=None,
+                        help=f'output CSV, or shard directory in sharded mode '
+                             f'(default: {OUTPUT_PATH} / {SHARD_DIR})')
+    args = parser.parse_args()
+
+    # With Parquet storage the output directory is replaced; refuse anything but an old dataset up front
+    try:
+        storage.reset_opportunities(args.output)
+    except FileExistsError as exc:
+        parser.error(str(exc))
+
+    if args.mode == 'legacy':
+        df = generate_legacy(args.rows, args.bd_reps, args.sales_reps, args.seed)
+
+        # Save to CSV (or Parquet with PIPELINE_STORAGE=parquet)
+        storage.write_opportunities(df, path=args.output)
+
+        print(f"Generated {len(df)} opportunities")
+        print(f"BD Reps: {df['bd_rep_id'].nunique()}")
+        print(f"Sales Reps: {df['sales_rep_id'].nunique()}")
+        print(f"Unique pairings: {df.groupby(['bd_rep_id', 'sales_rep_id']).ngroups}")
+        return
+
+    started = time.perf_counter()
+    parquet = storage.STORAGE_FORMAT == 'parquet'
+    if args.mode == 'batched':
+        output = args.output or (storage.OPPORTUNITIES_DATASET if parquet else OUTPUT_PATH)
+        num_chunks = generate_batched(output, args.rows, args.bd_reps, args.sales_reps,
+                                      args.seed, args.chunk_size)
+        written = f"{num_chunks} chunks"
+    else:
+        output = args.output or (storage.OPPORTUNITIES_DATASET if parquet else SHARD_DIR)
+        shards = generate_sharded(output, args.rows, args.bd_reps, args.sales_reps,
+                                  args.seed, args.chunk_size, args.workers)
+        written = f"{len(shards)} shards"
+    elapsed = time.perf_counter() - started
+
+    print(f"Generated {args.rows:,} opportunities in {written} ({elapsed:.1f}s)")
+    print(f"BD Reps: {args.bd_reps}")
+    print(f"Sales Reps: {args.sales_reps}")
+    print(f"Saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
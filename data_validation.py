@@ -0,0 +1,293 @@
+"""
+Data Validation
+Chunked, multi-core data-quality checks with a machine-readable report
+
+The opportunities file is cut into newline-aligned byte ranges (one file per
+task for the Parquet dataset), and every worker process parses and checks its own
+ranges, so no single core parses the whole export. Checks run on whole columns:
+
+    duplicate_ids        an opportunity_id already seen earlier in the file
+    invalid_dates        closed_date before created_date
+    unparseable_dates    a date present but not YYYY-MM-DD
+    negative_values      deal_value below zero
+    negative_days        days_in_current_stage below zero
+
+Duplicates within a range are found in the worker. Across ranges, the main
+process keeps a blocked Bloom filter of 64-bit ID hashes (BLOOM_BITS_PER_ID
+bits per ID, one 64-bit word per lookup), so memory stays bounded on any export.
+A Bloom hit may be a false positive. Workers therefore also spill every ID hash to
+a temporary file (8 bytes a row), and hits are confirmed exactly against those
+files instead of rereading the export. The JSON report has the count and the
+first SAMPLE_ROWS offending rows of every check.
+
+    python data_validation.py
+    python data_validation.py --workers 16 --path data/export.csv --output analysis/export_quality.json
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+# Configuration
+REPORT_PATH = 'analysis/data_quality_report.json'
+CHUNK_BYTES = 32 * 2**20
+SAMPLE_ROWS = 5
+BLOOM_BITS_PER_ID = 16
+BLOOM_HASHES = 6
+CHECKS = ['duplicate_ids', 'invalid_dates', 'unparseable_dates', 'negative_values', 'negative_days']
+DATE_FORMAT = '%Y-%m-%d'
+
+# Spreads each ID hash over the bit positions inside its word
+HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+class BloomFilter:
+    """Blocked Bloom filter on 64-bit hashes: each hash sets BLOOM_HASHES bits of a single word."""
+
+    def __init__(self, capacity, bits_per_id=BLOOM_BITS_PER_ID, num_hashes=BLOOM_HASHES):
+        self.words = np.zeros(max(1, int(np.ceil(capacity * bits_per_id / 64))), dtype=np.uint64)
+        self.num_hashes = num_hashes
+
+    def _locate(self, hashes):
+        word = hashes % np.uint64(len(self.words))
+        mixed = hashes * HASH_MIX
+        mask = np.zeros(len(hashes), dtype=np.uint64)
+        for i in range(self.num_hashes):
+            mask |= np.uint64(1) << ((mixed >> np.uint64(58 - 6 * i)) & np.uint64(63))
+        return word.astype(np.int64), mask
+
+    def add(self, hashes):
+        """Insert hashes; returns which of them were (probably) already present."""
+        word, mask = self._locate(np.asarray(hashes, dtype=np.uint64))
+        seen = (self.words[word] & mask) == mask
+        # Hashes sharing a word are OR-ed together first, so one scatter sets every bit
+        order = np.argsort(word, kind='stable')
+        word, mask = word[order], mask[order]
+        starts = np.flatnonzero(np.r_[True, word[1:] != word[:-1]]) if len(word) else np.array([], dtype=np.int64)
+        if len(starts):
+            self.words[word[starts]] |= np.bitwise_or.reduceat(mask, starts)
+        return seen
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+
+def hash_ids(ids):
+    return pd.util.hash_array(np.asarray(ids, dtype=object), categorize=False)
+
+
+def _sample(df, mask, first_row):
+    # The first offending rows as JSON-ready records, with their row number in the file
+    rows = np.flatnonzero(mask)[:SAMPLE_ROWS]
+    samples = df.iloc[rows].astype(object).where(df.iloc[rows].notna(), None)
+    return [dict(row=int(first_row + row), **record) for row, record in
+            zip(rows, samples.to_dict('records'))]
+
+
+def check_frame(df, first_row=0):
+    """Counts and sample rows of every check except cross-chunk duplicates, for one frame."""
+    created_text, closed_text = df['created_date'], df['closed_date']
+    created = pd.to_datetime(created_text, format=DATE_FORMAT, errors='coerce')
+    closed = pd.to_datetime(closed_text, format=DATE_FORMAT, errors='coerce')
+    masks = {
+        'duplicate_ids': df['opportunity_id'].duplicated().to_numpy(),
+        'invalid_dates': (closed < created).to_numpy(),
+        'unparseable_dates': ((created.isna() & created_text.notna()) |
+                              (closed.isna() & closed_text.notna())).to_numpy(),
+        'negative_values': (df['deal_value'] < 0).to_numpy(),
+        'negative_days': (df['days_in_current_stage'] < 0).to_numpy()
+    }
+    counts = {name: int(mask.sum()) for name, mask in masks.items()}
+    samples = {name: _sample(df, mask, first_row) for name, mask in masks.items()}
+    return counts, samples, masks['duplicate_ids']
+
+
+def _csv_ranges(path, chunk_bytes):
+    # Byte ranges that start on a line start, after the header line, and a row count estimate
+    with open(path, 'rb') as f:
+        header = f.readline()
+        bounds = [f.tell()]
+        size = os.path.getsize(path)
+        head = f.read(2**20)
+        estimated_rows = int((size - bounds[0]) / max(len(head), 1) * max(head.count(b'\n'), 1)) + 1
+        while bounds[-1] < size:
+            f.seek(min(bounds[-1] + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            bounds.append(f.tell())
+    names = pd.read_csv(io.BytesIO(header)).columns.tolist()
+    return names, list(zip(bounds[:-1], bounds[1:])), estimated_rows
+
+
+def _parquet_files(path):
+    _, ds, _ = storage._arrow()
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    return dataset.files, sum(fragment.count_rows() for fragment in dataset.get_fragments())
+
+
+def read_range(path, fmt, names, task):
+    """Rows of one task: a Parquet file, or a (start, end) byte range of the CSV."""
+    if fmt == 'parquet':
+        _, _, pq = storage._arrow()
+        return storage.as_frame(pq.read_table(task))
+    start, end = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=names,
+                       dtype={'opportunity_id': object, 'created_date': object, 'closed_date': object})
+
+
+# Per-process source description, set once by the pool initializer
+_validation_context = {}
+
+
+def _init_validation_worker(path, fmt, names, spill_dir):
+    _validation_context.update(path=path, fmt=fmt, names=names, spill_dir=spill_dir)
+
+
+def _spill_path(index):
+    return os.path.join(_validation_context['spill_dir'], f'hashes-{index:06d}.npy')
+
+
+def _check_task(args):
+    """Checks for one task: local counts and samples, plus its unique ID hashes for the Bloom filter."""
+    index, task = args
+    context = _validation_context
+    df = read_range(context['path'], context['fmt'], context['names'], task)
+    counts, samples, duplicated = check_frame(df)
+    hashes = hash_ids(df['opportunity_id'])
+    # Every row's hash is kept on disk (8 bytes a row) in case Bloom hits need confirming
+    np.save(_spill_path(index), hashes)
+    return {'rows': len(df), 'counts': counts, 'samples': samples, 'unique_hashes': hashes[~duplicated],
+            'duplicate_hashes': hashes[duplicated], 'duplicate_rows': np.flatnonzero(duplicated)}
+
+
+def _find_hashes(args):
+    # Rows of one task whose ID hash is one of the suspects
+    index, suspects = args
+    hashes = np.load(_spill_path(index))
+    rows = np.flatnonzero(np.isin(hashes, suspects))
+    return hashes[rows], rows
+
+
+def _confirm_duplicates(pool, num_tasks, suspects, offsets):
+    # Every occurrence of a suspect hash, from the spilled hashes; all but the first are duplicates
+    found = list(pool.map(_find_hashes, [(index, suspects) for index in range(num_tasks)]))
+    hashes = np.concatenate([task_hashes for task_hashes, _ in found])
+    rows = np.concatenate([task_rows + offset for (_, task_rows), offset in zip(found, offsets)])
+    order = np.lexsort((rows, hashes))
+    hashes, rows = hashes[order], rows[order]
+    return rows[np.r_[False, hashes[1:] == hashes[:-1]]]
+
+
+def _sample_rows(path, fmt, names, tasks, offsets, rows):
+    # Full records of a few rows, rereading only the tasks that hold them
+    tasks_of = np.searchsorted(offsets, rows, side='right') - 1
+    samples = []
+    for index in np.unique(tasks_of):
+        df = read_range(path, fmt, names, tasks[index])
+        local = rows[tasks_of == index] - offsets[index]
+        mask = np.zeros(len(df), dtype=bool)
+        mask[local] = True
+        samples += _sample(df, mask, offsets[index])
+    return samples
+
+
+def validate(path=None, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Run every check over the opportunities file and return the report as a dict."""
+    started = time.perf_counter()
+    workers = workers or os.cpu_count()
+    fmt = storage.STORAGE_FORMAT
+    if fmt == 'parquet':
+        path = path or storage.OPPORTUNITIES_DATASET
+        tasks, capacity = _parquet_files(path)
+        names = None
+    else:
+        path = path or storage.OPPORTUNITIES_CSV
+        names, tasks, capacity = _csv_ranges(path, chunk_bytes)
+
+    bloom = BloomFilter(capacity)
+    counts = dict.fromkeys(CHECKS, 0)
+    samples = {name: [] for name in CHECKS}
+    offsets, hits, local_duplicates = [], [], []
+    num_rows = 0
+
+    with tempfile.TemporaryDirectory() as spill_dir, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_validation_worker,
+            initargs=(path, fmt, names, spill_dir)) as pool:
+        # Results arrive in file order, so Bloom hits are always the later occurrence
+        for result in pool.map(_check_task, enumerate(tasks)):
+            offsets.append(num_rows)
+            for name in CHECKS:
+                counts[name] += result['counts'][name]
+                if len(samples[name]) < SAMPLE_ROWS:
+                    samples[name] += [dict(sample, row=sample['row'] + num_rows)
+                                      for sample in result['samples'][name]][:SAMPLE_ROWS - len(samples[name])]
+            seen = bloom.add(result['unique_hashes'])
+            hits.append(result['unique_hashes'][seen])
+            local_duplicates.append((result['duplicate_hashes'], result['duplicate_rows'] + num_rows))
+            num_rows += result['rows']
+
+        hits = np.unique(np.concatenate(hits)) if hits else np.array([], dtype=np.uint64)
+        confirmed = len(hits) > 0
+        if confirmed:
+            # IDs behind a Bloom hit are recounted over the whole file; any other duplicate is within one task
+            repeated = _confirm_duplicates(pool, len(tasks), hits, offsets)
+            local = np.concatenate([rows[~np.isin(hashes, hits)] for hashes, rows in local_duplicates])
+            duplicate_rows = np.sort(np.concatenate([local, repeated]))
+            counts['duplicate_ids'] = len(duplicate_rows)
+            samples['duplicate_ids'] = _sample_rows(path, fmt, names, tasks, np.array(offsets),
+                                                    duplicate_rows[:SAMPLE_ROWS])
+
+    elapsed = time.perf_counter() - started
+    return {
+        'source': path,
+        'format': fmt,
+        'rows': num_rows,
+        'tasks': len(tasks),
+        'workers': workers,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(num_rows / elapsed) if elapsed else None,
+        'total_issues': sum(counts.values()),
+        'checks': {name: {'count': counts[name], 'samples': samples[name]} for name in CHECKS},
+        'duplicate_detection': {
+            'bloom_filter_bytes': bloom.nbytes,
+            'bloom_hits': len(hits),
+            'confirmation_pass': confirmed
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked, multi-core data-quality checks')
+    parser.add_argument('--path', help='opportunities CSV or Parquet dataset (default: the configured storage)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // 2**20, help='CSV bytes per task')
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    print("Validating opportunities data...")
+    report = validate(args.path, args.workers, args.chunk_mb * 2**20)
+    print(f"Checked {report['rows']:,} rows in {report['tasks']} tasks on {report['workers']} workers "
+          f"in {report['elapsed_seconds']:.2f}s ({report['rows_per_second'] or 0:,} rows/s)")
+    for name, check in report['checks'].items():
+        print(f"  {name}: {check['count']:,}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
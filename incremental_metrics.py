@@ -0,0 +1,341 @@
+"""
+Incremental Metrics
+Mergeable pair and BD accumulators for append-only opportunity feeds
+
+The state keeps per-pair and per-BD outcome counters and deal value sums, plus a
+ledger of each opportunity's last contribution so that updates (for example
+Open -> Closed Lost) and retractions subtract exactly what was added. Applying a
+delta touches only the delta rows and the pairs of the BDs they belong to.
+
+    python incremental_metrics.py init                  # build state from full history
+    python incremental_metrics.py apply data/delta.csv  # apply a delta, refresh pair_metrics
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+import aggregation
+import storage
+
+# Configuration
+STATE_PATH = 'analysis/metric_state.npz'
+DELETED_COLUMN = 'is_deleted'
+
+
+def _grown(array, size):
+    """Return array with room for at least size rows (capacity doubles)."""
+    if size <= len(array):
+        return array
+    grown = np.zeros((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _id_arrays(ids):
+    # Opportunity IDs as plain arrays, so loading never unpickles: one typed array when numpy keeps
+    # every ID as it was (all strings, all integers), else their strings plus which were integers
+    typed = np.array(ids)
+    if typed.dtype != object and typed.tolist() == list(ids):
+        return {'opp_ids': typed}
+    return {'opp_ids': np.array([str(opp_id) for opp_id in ids], dtype=str),
+            'opp_id_is_int': np.array([isinstance(opp_id, (int, np.integer)) for opp_id in ids], dtype=bool)}
+
+
+class MetricState:
+    """Accumulators per (BD, SR) pair and per BD, keyed by integer rep codes."""
+
+    def __init__(self):
+        # Rep dictionaries
+        self.bd_labels, self.bd_codes = [], {}
+        self.sr_labels, self.sr_codes = [], {}
+
+        # Pair accumulators
+        self.pair_rows = {}
+        self.num_pairs = 0
+        self.pair_bd = np.zeros(0, dtype=np.int32)
+        self.pair_sr = np.zeros(0, dtype=np.int32)
+        self.pair_states = np.zeros((0, aggregation.NUM_STATES), dtype=np.int64)
+        self.pair_value_sum = np.zeros(0)
+        self.pair_value_count = np.zeros(0, dtype=np.int64)
+
+        # BD accumulators
+        self.bd_states = np.zeros((0, aggregation.NUM_STATES), dtype=np.int64)
+        self.bd_value_sum = np.zeros(0)
+        self.bd_value_count = np.zeros(0, dtype=np.int64)
+
+        # Ledger of each opportunity's current contribution (state -1 = retracted)
+        self.opp_rows = {}
+        self.opp_ids = []
+        self.ledger_pair = np.zeros(0, dtype=np.int64)
+        self.ledger_state = np.zeros(0, dtype=np.int8)
+        self.ledger_value = np.zeros(0)
+
+        self.dirty_bds = set()
+
+    @classmethod
+    def from_opportunities(cls, opportunities):
+        state = cls()
+        state.apply(opportunities)
+        state.dirty_bds.clear()
+        return state
+
+    def _code(self, label, labels, codes):
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(labels)
+            labels.append(label)
+        return code
+
+    def _pairs_for(self, bd_ids, sr_ids):
+        # Dictionary lookups run once per distinct rep and per distinct pair, not per row
+        bd_local, bd_unique = pd.factorize(np.asarray(bd_ids, dtype=object))
+        sr_local, sr_unique = pd.factorize(np.asarray(sr_ids, dtype=object))
+        bd_map = np.array([self._code(bd, self.bd_labels, self.bd_codes) for bd in bd_unique], dtype=np.int64)
+        sr_map = np.array([self._code(sr, self.sr_labels, self.sr_codes) for sr in sr_unique], dtype=np.int64)
+
+        pair_local, pair_unique = pd.factorize(bd_local.astype(np.int64) * len(sr_unique) + sr_local)
+        pair_map = np.empty(len(pair_unique), dtype=np.int64)
+        for i, key in enumerate(pair_unique.tolist()):
+            bd_code, sr_code = int(bd_map[key // len(sr_unique)]), int(sr_map[key % len(sr_unique)])
+            row = self.pair_rows.get((bd_code, sr_code))
+            if row is None:
+                row = self.pair_rows[(bd_code, sr_code)] = self.num_pairs
+                self.num_pairs += 1
+                self.pair_bd = _grown(self.pair_bd, self.num_pairs)
+                self.pair_sr = _grown(self.pair_sr, self.num_pairs)
+                self.pair_bd[row], self.pair_sr[row] = bd_code, sr_code
+            pair_map[i] = row
+        rows = pair_map[pair_local]
+
+        self.pair_states = _grown(self.pair_states, self.num_pairs)
+        self.pair_value_sum = _grown(self.pair_value_sum, self.num_pairs)
+        self.pair_value_count = _grown(self.pair_value_count, self.num_pairs)
+        self.bd_states = _grown(self.bd_states, len(self.bd_labels))
+        self.bd_value_sum = _grown(self.bd_value_sum, len(self.bd_labels))
+        self.bd_value_count = _grown(self.bd_value_count, len(self.bd_labels))
+        return rows
+
+    def _accumulate(self, pairs, states, values, sign):
+        bds = self.pair_bd[pairs].astype(np.int64)
+        has_value = ~np.isnan(values)
+        if len(pairs) > self.num_pairs:
+            # Bulk loads: one dense bincount pass instead of scattered adds
+            num_bds = len(self.bd_labels)
+            self.pair_states[:self.num_pairs] += sign * np.bincount(
+                pairs * aggregation.NUM_STATES + states,
+                minlength=self.num_pairs * aggregation.NUM_STATES).reshape(-1, aggregation.NUM_STATES)
+            self.bd_states[:num_bds] += sign * np.bincount(
+                bds * aggregation.NUM_STATES + states,
+                minlength=num_bds * aggregation.NUM_STATES).reshape(-1, aggregation.NUM_STATES)
+            self.pair_value_sum[:self.num_pairs] += sign * np.bincount(
+                pairs[has_value], weights=values[has_value], minlength=self.num_pairs)
+            self.pair_value_count[:self.num_pairs] += sign * np.bincount(pairs[has_value], minlength=self.num_pairs)
+            self.bd_value_sum[:num_bds] += sign * np.bincount(bds[has_value], weights=values[has_value],
+                                                              minlength=num_bds)
+            self.bd_value_count[:num_bds] += sign * np.bincount(bds[has_value], minlength=num_bds)
+        else:
+            np.add.at(self.pair_states, (pairs, states), sign)
+            np.add.at(self.bd_states, (bds, states), sign)
+            np.add.at(self.pair_value_sum, pairs[has_value], sign * values[has_value])
+            np.add.at(self.pair_value_count, pairs[has_value], sign)
+            np.add.at(self.bd_value_sum, bds[has_value], sign * values[has_value])
+            np.add.at(self.bd_value_count, bds[has_value], sign)
+        self.dirty_bds.update(np.unique(bds).tolist())
+
+    def _retract_rows(self, rows):
+        rows = rows[self.ledger_state[rows] >= 0]
+        self._accumulate(self.ledger_pair[rows], self.ledger_state[rows].astype(np.int64),
+                         self.ledger_value[rows], -1)
+        self.ledger_state[rows] = -1
+
+    def _apply_states(self, ids, bd_ids, sr_ids, states, values):
+        """Insert or replace opportunities given their precomputed outcome states."""
+        pairs = self._pairs_for(bd_ids, sr_ids)
+        rows = np.array([self.opp_rows.get(i, -1) for i in ids], dtype=np.int64)
+        self._retract_rows(rows[rows >= 0])
+
+        # Updates reuse their ledger row; inserts take new rows
+        is_new = rows < 0
+        first_new = len(self.opp_ids)
+        rows[is_new] = np.arange(first_new, first_new + is_new.sum())
+        new_ids = np.asarray(ids, dtype=object)[is_new].tolist()
+        self.opp_rows.update(zip(new_ids, rows[is_new].tolist()))
+        self.opp_ids.extend(new_ids)
+        self.ledger_pair = _grown(self.ledger_pair, len(self.opp_ids))
+        self.ledger_state = _grown(self.ledger_state, len(self.opp_ids))
+        self.ledger_value = _grown(self.ledger_value, len(self.opp_ids))
+
+        self.ledger_pair[rows] = pairs
+        self.ledger_state[rows] = states
+        self.ledger_value[rows] = values
+        self._accumulate(pairs, states, values, 1)
+
+    def apply(self, upserts=None, retractions=()):
+        """Apply a delta of new or changed opportunities and retracted opportunity IDs.
+
+        Upsert rows flagged in an is_deleted column, or missing a rep ID, are
+        treated as retractions.
+        """
+        retractions = list(retractions)
+        if upserts is not None and len(upserts):
+            upserts = upserts.drop_duplicates('opportunity_id', keep='last')
+            removed = upserts['bd_rep_id'].isna() | upserts['sales_rep_id'].isna()
+            if DELETED_COLUMN in upserts.columns:
+                removed |= upserts[DELETED_COLUMN].fillna(False).astype(bool)
+            retractions += upserts.loc[removed, 'opportunity_id'].tolist()
+            upserts = upserts[~removed]
+
+        rows = [self.opp_rows.pop(i) for i in retractions if i in self.opp_rows]
+        if rows:
+            self._retract_rows(np.array(rows, dtype=np.int64))
+
+        if upserts is not None and len(upserts):
+            states = aggregation.opportunity_states(upserts['outcome'], upserts['days_in_current_stage'])
+            self._apply_states(upserts['opportunity_id'].tolist(),
+                               upserts['bd_rep_id'].astype(str).tolist(),
+                               upserts['sales_rep_id'].astype(str).tolist(),
+                               states, upserts['deal_value'].to_numpy(dtype=np.float64))
+        return self
+
+    def upsert(self, opportunity):
+        """Insert or update a single opportunity given as a dict or Series."""
+        return self.apply(pd.DataFrame([dict(opportunity)]))
+
+    def retract(self, opportunity_id):
+        return self.apply(retractions=[opportunity_id])
+
+    def merge(self, other):
+        """Fold in a partial state built from another slice of opportunities.
+
+        Opportunities present in both states take the version from other.
+        """
+        live = np.flatnonzero(other.ledger_state[:len(other.opp_ids)] >= 0)
+        pairs = other.ledger_pair[live]
+        bd_labels = np.asarray(other.bd_labels, dtype=object)
+        sr_labels = np.asarray(other.sr_labels, dtype=object)
+        self._apply_states([other.opp_ids[row] for row in live.tolist()],
+                           bd_labels[other.pair_bd[pairs]].tolist(),
+                           sr_labels[other.pair_sr[pairs]].tolist(),
+                           other.ledger_state[live].astype(np.int64),
+                           other.ledger_value[live])
+        return self
+
+    def counters(self, bd_rep_ids=None):
+        """Pair and BD counter frames, optionally limited to some BDs."""
+        pairs = np.arange(self.num_pairs)
+        bds = np.arange(len(self.bd_labels))
+        if bd_rep_ids is not None:
+            bds = np.array([self.bd_codes[bd] for bd in bd_rep_ids if bd in self.bd_codes], dtype=np.int64)
+            pairs = pairs[np.isin(self.pair_bd[:self.num_pairs], bds)]
+
+        bd_labels = np.asarray(self.bd_labels, dtype=object)
+        sr_labels = np.asarray(self.sr_labels, dtype=object)
+        pair_counters = pd.DataFrame(
+            aggregation.counters_from_states(self.pair_states[pairs], self.pair_value_sum[pairs],
+                                             self.pair_value_count[pairs]),
+            index=pd.MultiIndex.from_arrays([bd_labels[self.pair_bd[pairs]], sr_labels[self.pair_sr[pairs]]],
+                                            names=aggregation.PAIR_KEYS),
+            columns=aggregation.COUNTER_COLUMNS
+        )
+        bd_counters = pd.DataFrame(
+            aggregation.counters_from_states(self.bd_states[bds], self.bd_value_sum[bds],
+                                             self.bd_value_count[bds]),
+            index=pd.Index(bd_labels[bds], name='bd_rep_id'),
+            columns=aggregation.COUNTER_COLUMNS
+        ).sort_index()
+        return pair_counters, bd_counters
+
+    def pair_metrics(self):
+        """The full pair_metrics table."""
+        return aggregation.metrics_from_counters(*self.counters())
+
+    def refresh(self):
+        """Metrics for the BDs touched since the last refresh (only those rows change)."""
+        touched = [self.bd_labels[code] for code in sorted(self.dirty_bds)]
+        self.dirty_bds.clear()
+        return aggregation.metrics_from_counters(*self.counters(touched))
+
+    def save(self, path=STATE_PATH):
+        live = np.flatnonzero(self.ledger_state[:len(self.opp_ids)] >= 0)
+        np.savez_compressed(
+            path,
+            bd_labels=np.array(self.bd_labels, dtype=str),
+            sr_labels=np.array(self.sr_labels, dtype=str),
+            pair_bd=self.pair_bd[:self.num_pairs],
+            pair_sr=self.pair_sr[:self.num_pairs],
+            pair_states=self.pair_states[:self.num_pairs],
+            pair_value_sum=self.pair_value_sum[:self.num_pairs],
+            pair_value_count=self.pair_value_count[:self.num_pairs],
+            bd_states=self.bd_states[:len(self.bd_labels)],
+            bd_value_sum=self.bd_value_sum[:len(self.bd_labels)],
+            bd_value_count=self.bd_value_count[:len(self.bd_labels)],
+            ledger_pair=self.ledger_pair[live],
+            ledger_state=self.ledger_state[live],
+            ledger_value=self.ledger_value[live],
+            **_id_arrays([self.opp_ids[row] for row in live.tolist()])
+        )
+        return path
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        state = cls()
+        with np.load(path) as saved:
+            state.bd_labels = saved['bd_labels'].tolist()
+            state.sr_labels = saved['sr_labels'].tolist()
+            state.bd_codes = {label: code for code, label in enumerate(state.bd_labels)}
+            state.sr_codes = {label: code for code, label in enumerate(state.sr_labels)}
+
+            state.pair_bd, state.pair_sr = saved['pair_bd'], saved['pair_sr']
+            state.num_pairs = len(state.pair_bd)
+            state.pair_rows = dict(zip(zip(state.pair_bd.tolist(), state.pair_sr.tolist()),
+                                       range(state.num_pairs)))
+            state.pair_states = saved['pair_states']
+            state.pair_value_sum = saved['pair_value_sum']
+            state.pair_value_count = saved['pair_value_count']
+            state.bd_states = saved['bd_states']
+            state.bd_value_sum = saved['bd_value_sum']
+            state.bd_value_count = saved['bd_value_count']
+
+            state.opp_ids = saved['opp_ids'].tolist()
+            if 'opp_id_is_int' in saved:
+                state.opp_ids = [int(opp_id) if is_int else opp_id
+                                 for opp_id, is_int in zip(state.opp_ids, saved['opp_id_is_int'].tolist())]
+            state.opp_rows = dict(zip(state.opp_ids, range(len(state.opp_ids))))
+            state.ledger_pair = saved['ledger_pair']
+            state.ledger_state = saved['ledger_state']
+            state.ledger_value = saved['ledger_value']
+        return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain pair metrics incrementally')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('init', help='build the accumulator state from the full opportunity history')
+    apply_parser = subparsers.add_parser('apply', help='apply a delta file of new/changed opportunities')
+    apply_parser.add_argument('delta', help=f'CSV of opportunity rows; rows with {DELETED_COLUMN}=True are retracted')
+    parser.add_argument('--state', default=STATE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        print("Loading opportunities data...")
+        state = MetricState.from_opportunities(storage.read_opportunities())
+        print(f"Built state for {len(state.opp_rows):,} opportunities and {state.num_pairs:,} pairings")
+    else:
+        state = MetricState.load(args.state)
+        delta = pd.read_csv(args.delta)
+
+        started = time.perf_counter()
+        state.apply(delta)
+        refreshed = state.refresh()
+        elapsed = time.perf_counter() - started
+        print(f"Applied {len(delta):,} changes; refreshed {len(refreshed):,} pairings in {elapsed * 1000:.1f} ms")
+
+    print(f"Saved state to {state.save(args.state)}")
+    output_path = storage.write_table(state.pair_metrics(), 'pair_metrics')
+    print(f"Saved to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""
+Lead Assignment
+Assigns a batch of incoming leads to sales reps under per-rep capacity limits
+
+Routing every lead to a BD's top 5 sends most of the volume to the same few
+"universal closers". This module instead maximizes the batch's total expected
+ARR (lead value x win probability) subject to each sales rep's capacity, as a
+transportation problem between lead groups and reps.
+
+Leads of one BD with similar values are interchangeable, so leads are grouped by
+BD and value tier before solving. The transportation problem is solved with an
+auction on those groups: reps carry prices, every group with unplaced leads
+bids for its best rep net of price (raising it by its margin over the
+second-best rep plus epsilon), and a full rep keeps its highest bids. For the
+grouped batch (every lead valued at its group's mean), the final assignment is
+within TOLERANCE of the uncapped ARR of the optimum, and the LP dual from the
+final prices gives an upper bound that is reported as the optimality gap. Both
+apply to the grouped batch only: the expected ARR is then summed from each
+lead's own value, so it can land on either side of that bound. Inside each group
+the highest-value leads get the reps with the highest win probability. If the
+time limit runs out, the leads still unplaced are filled greedily.
+
+    python lead_assignment.py --batch 500 --capacity 30
+    python lead_assignment.py --leads incoming_leads.csv --capacity-file capacities.csv
+    python lead_assignment.py --benchmark --batch 100000 --reps 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import storage
+
+# Configuration
+ASSIGNMENTS_PATH = 'analysis/lead_assignments.csv'
+VALUE_TIERS = 8
+TOLERANCE = 1e-3
+CANDIDATE_REPS = 32
+CAPACITY_HEADROOM = 1.2
+
+
+def win_probabilities(performance):
+    """BD x sales rep win probability matrix with its BD and sales rep labels.
+
+    The pair's win rate is shrunk toward the BD's baseline by the confidence
+    multiplier, so a 1-for-1 pair does not outrank a proven one. Pairs with no
+    decided deals, or no history at all, get the BD's baseline.
+    """
+    df = storage.as_frame(performance)
+    bd_codes, bd_labels = aggregation.factorize(df['bd_rep_id'])
+    sr_codes, sr_labels = aggregation.factorize(df['sales_rep_id'])
+
+    bd_win_rate = np.zeros(len(bd_labels))
+    bd_win_rate[bd_codes] = np.nan_to_num(df['bd_avg_win_rate_pct'].to_numpy(dtype=np.float64)) / 100
+    pair_win_rate = df['win_rate_pct'].to_numpy(dtype=np.float64) / 100
+    confidence = df['confidence_multiplier'].to_numpy(dtype=np.float64)
+    baseline = bd_win_rate[bd_codes]
+
+    matrix = np.repeat(bd_win_rate[:, None], len(sr_labels), axis=1)
+    matrix[bd_codes, sr_codes] = np.where(np.isnan(pair_win_rate), baseline,
+                                          confidence * pair_win_rate + (1 - confidence) * baseline)
+    return matrix, bd_labels, sr_labels
+
+
+def _group_leads(bd_codes, values, value_tiers):
+    """Lead order (by BD, highest value first) plus each group's BD, size and mean value.
+
+    Groups are contiguous runs of that order.
+    """
+    num_leads = len(bd_codes)
+    order = np.lexsort((-values, bd_codes))
+    sorted_bds = bd_codes[order]
+    sorted_values = values[order]
+
+    # Equal-count value tiers within each BD; a BD whose leads all have one value is a single group
+    counts = np.bincount(sorted_bds)
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(num_leads) - starts[sorted_bds]
+    tiers = rank * value_tiers // counts[sorted_bds]
+    has_leads = counts > 0
+    constant = np.zeros(len(counts), dtype=bool)
+    constant[has_leads] = (sorted_values[starts[has_leads]] ==
+                           sorted_values[starts[has_leads] + counts[has_leads] - 1])
+    tiers[constant[sorted_bds]] = 0
+
+    keys = sorted_bds.astype(np.int64) * value_tiers + tiers
+    new_group = np.ones(num_leads, dtype=bool)
+    new_group[1:] = keys[1:] != keys[:-1]
+    group_starts = np.flatnonzero(new_group)
+    group_sizes = np.diff(np.append(group_starts, num_leads))
+    group_values = np.bincount(np.cumsum(new_group) - 1, weights=sorted_values,
+                               minlength=len(group_starts)) / group_sizes
+    return order, sorted_bds[group_starts], group_sizes, group_values
+
+
+def _best_two(groups, candidates, outside, profit, prices):
+    """Best rep, its net profit and the second-best net profit (at least 0) for each group.
+
+    Only each group's candidate reps are priced. Prices never fall, so a rep
+    outside the list nets at most outside[g], its best net when the list was
+    built; once the second-best candidate drops below that, the group's list is
+    rebuilt from a full scan.
+    """
+    rows = np.arange(len(groups))
+    reps = candidates[groups]
+    net = profit[groups[:, None], reps] - prices[reps]
+    best_slots = net.argmax(axis=1)
+    best_reps = reps[rows, best_slots]
+    best = net[rows, best_slots]
+    net[rows, best_slots] = -np.inf
+    second = net.max(axis=1)
+
+    stale = np.flatnonzero(second < outside[groups])
+    if len(stale):
+        num_candidates = candidates.shape[1]
+        full_net = profit[groups[stale]] - prices
+        top = np.argpartition(-full_net, num_candidates, axis=1)
+        stale_rows = np.arange(len(stale))
+        candidates[groups[stale]] = top[:, :num_candidates]
+        outside[groups[stale]] = full_net[stale_rows, top[:, num_candidates]]
+        best_reps[stale] = full_net.argmax(axis=1)
+        best[stale] = full_net[stale_rows, best_reps[stale]]
+        full_net[stale_rows, best_reps[stale]] = -np.inf
+        second[stale] = full_net.max(axis=1)
+    return best_reps, best, np.maximum(second, 0)
+
+
+def _resolve_bids(lots, bids, capacity, prices, num_groups):
+    """Add bids to the held lots; returns the new lots and the units evicted per group.
+
+    Every rep that was bid on keeps its highest-priced units up to capacity, and a
+    rep that is now full has its price raised to the lowest price it holds.
+    Lots at other reps are left untouched.
+    """
+    touched = np.zeros(len(capacity), dtype=bool)
+    touched[bids[1]] = True
+    contested = touched[lots[1]]
+    num_held = int(contested.sum())
+    group, rep, count, price = (np.concatenate([held[contested], bid]) for held, bid in zip(lots, bids))
+
+    # Highest price first within a rep; on ties the incumbent keeps its place
+    order = np.lexsort((np.arange(len(group)) >= num_held, -price, rep))
+    group, rep, count, price = group[order], rep[order], count[order], price[order]
+    taken_before = np.cumsum(count) - count
+    run_start = np.concatenate([[True], rep[1:] != rep[:-1]])
+    taken_before -= taken_before[np.maximum.accumulate(np.where(run_start, np.arange(len(rep)), 0))]
+    kept = np.clip(capacity[rep] - taken_before, 0, count)
+    evicted = np.bincount(group, weights=count - kept, minlength=num_groups).astype(np.int64)
+
+    # Each rep's last kept lot is its cheapest
+    keep = kept > 0
+    group, rep, kept, price = group[keep], rep[keep], kept[keep], price[keep]
+    last = np.concatenate([rep[1:] != rep[:-1], [True]])
+    load = np.bincount(rep, weights=kept, minlength=len(capacity))
+    full = last & (load[rep] >= capacity[rep])
+    prices[rep[full]] = price[full]
+
+    lots = tuple(np.concatenate([held[~contested], new]) for held, new in zip(lots, (group, rep, kept, price)))
+    return lots, evicted
+
+
+def _greedy_fill(profit, group_values, unplaced, capacity, load):
+    """Place leftover leads group by group (highest value first) on their best reps with room left."""
+    room = capacity - load
+    placed = []
+    for g in np.argsort(-group_values, kind='stable'):
+        if unplaced[g] == 0:
+            continue
+        reps = np.flatnonzero((room > 0) & (profit[g] > 0))
+        # Usually the best few reps have enough room; sort all of them only when they do not
+        if len(reps) > CANDIDATE_REPS:
+            top = reps[np.argpartition(-profit[g, reps], CANDIDATE_REPS)[:CANDIDATE_REPS]]
+            if room[top].sum() >= unplaced[g]:
+                reps = top
+        reps = reps[np.argsort(-profit[g, reps], kind='stable')]
+        take = np.minimum(room[reps], np.maximum(unplaced[g] - (np.cumsum(room[reps]) - room[reps]), 0))
+        reps, take = reps[take > 0], take[take > 0]
+        room[reps] -= take
+        unplaced[g] -= take.sum()
+        placed.append((np.full(len(reps), g), reps, take))
+    if not placed:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return tuple(np.concatenate(parts).astype(np.int64) for parts in zip(*placed))
+
+
+def solve(bd_codes, values, win_prob, capacity, value_tiers=VALUE_TIERS, tolerance=TOLERANCE,
+          time_limit=None, method='auction'):
+    """Sales rep code for every lead (-1 = unassigned) and a summary of the solve.
+
+    bd_codes index rows of win_prob, capacity has one entry per column. The
+    auction stops once the guaranteed gap is below tolerance of the uncapped
+    ARR of the grouped batch; with a time_limit (seconds) or method='greedy', leads not yet
+    placed are filled greedily.
+    """
+    started = time.perf_counter()
+    deadline = None if time_limit is None else started + time_limit
+    bd_codes = np.asarray(bd_codes, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    order, group_bds, group_sizes, group_values = _group_leads(bd_codes, values, value_tiers)
+    num_groups, num_reps = len(group_sizes), len(capacity)
+
+    # Expected ARR of one lead of each group with each rep; reps without capacity are never worth it
+    profit = group_values[:, None] * win_prob[group_bds]
+    profit[:, capacity <= 0] = -np.inf
+    best_uncapped = np.maximum(profit.max(axis=1), 0) if num_reps else np.zeros(num_groups)
+
+    # Each group's most profitable reps, rebuilt as prices rise
+    num_candidates = min(CANDIDATE_REPS, num_reps)
+    if num_candidates < num_reps:
+        candidates = np.argpartition(-profit, num_candidates, axis=1)
+        outside = profit[np.arange(num_groups), candidates[:, num_candidates]]
+        candidates = candidates[:, :num_candidates]
+    else:
+        candidates = np.tile(np.arange(num_reps), (num_groups, 1))
+        outside = np.full(num_groups, -np.inf)
+
+    # Auction; epsilon is each lead's largest possible shortfall from the optimum
+    epsilon = max(tolerance * (group_sizes * best_uncapped).sum() / max(len(values), 1), 1e-12)
+    prices = np.zeros(num_reps)
+    lots = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+    unplaced = group_sizes.copy() if method == 'auction' and num_reps else np.zeros_like(group_sizes)
+    rounds, timed_out = 0, False
+    while True:
+        active = np.flatnonzero(unplaced > 0)
+        if not len(active):
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            timed_out = True
+            break
+        rounds += 1
+
+        # Best and second-best option net of price; leaving a lead unassigned is worth 0
+        best_reps, best, second = _best_two(active, candidates, outside, profit, prices)
+
+        # Groups for which no rep is worth its price stay unassigned; prices never fall
+        bidding = best > 0
+        unplaced[active[~bidding]] = 0
+        active, best_reps = active[bidding], best_reps[bidding]
+        bids = (active, best_reps, unplaced[active],
+                prices[best_reps] + best[bidding] - second[bidding] + epsilon)
+        unplaced[active] = 0
+        lots, evicted = _resolve_bids(lots, bids, capacity, prices, num_groups)
+        unplaced += evicted
+
+    group, rep, count = lots[0], lots[1], lots[2]
+    load = np.bincount(rep, weights=count, minlength=num_reps).astype(np.int64)
+    if method != 'auction' or timed_out:
+        # Unplaced counts were zeroed for groups that gave up; refill from what is actually placed
+        unplaced = group_sizes - np.bincount(group, weights=count, minlength=num_groups).astype(np.int64)
+        extra = _greedy_fill(profit, group_values, unplaced, capacity, load)
+        group, rep, count = (np.concatenate(parts) for parts in zip((group, rep, count), extra))
+        if timed_out:
+            # An early stop can leave prices half settled; never do worse than plain greedy
+            greedy = _greedy_fill(profit, group_values, group_sizes.copy(), capacity, np.zeros_like(load))
+            if (greedy[2] * profit[greedy[0], greedy[1]]).sum() > (count * profit[group, rep]).sum():
+                group, rep, count = greedy
+
+    # Within a group, the highest-value leads take the reps with the highest win probability
+    slots = np.lexsort((-win_prob[group_bds[group], rep], group))
+    slot_reps = np.repeat(rep[slots], count[slots])
+    slot_groups = np.repeat(group[slots], count[slots])
+    group_starts = np.concatenate([[0], np.cumsum(group_sizes)[:-1]])
+    filled_starts = np.concatenate([[0], np.cumsum(np.bincount(slot_groups, minlength=num_groups))[:-1]])
+    positions = group_starts[slot_groups] + np.arange(len(slot_groups)) - filled_starts[slot_groups]
+    assigned = np.full(len(values), -1, dtype=np.int64)
+    assigned[order[positions]] = slot_reps
+
+    # Weak LP duality: any non-negative rep prices give an upper bound on the grouped problem.
+    # It bounds grouped_arr (group mean values), not expected_arr (each lead's own value)
+    finite_prices = np.where(capacity > 0, prices, 0)
+    grouped_upper_bound = ((group_sizes * np.maximum((profit - finite_prices).max(axis=1, initial=0), 0)).sum() +
+                           (capacity.clip(0) * finite_prices).sum())
+    grouped_arr = (count * profit[group, rep]).sum()
+    expected = np.where(assigned >= 0, values * win_prob[bd_codes, np.maximum(assigned, 0)], 0)
+    return assigned, {
+        'method': method if not timed_out else 'auction+greedy',
+        'expected_arr': float(expected.sum()),
+        'grouped_arr': float(grouped_arr),
+        'grouped_upper_bound': float(grouped_upper_bound),
+        'gap_pct': (float((grouped_upper_bound - grouped_arr) / grouped_upper_bound * 100)
+                    if grouped_upper_bound > 0 else 0.0),
+        'assigned': int((assigned >= 0).sum()),
+        'groups': num_groups,
+        'rounds': rounds,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def capacity_array(sr_labels, capacity=None, default_capacity=None, num_leads=0):
+    """Per-rep capacity aligned with sr_labels from a {sales_rep_id: limit} mapping.
+
+    Reps not in the mapping get default_capacity, which defaults to an even share
+    of the batch plus CAPACITY_HEADROOM.
+    """
+    if default_capacity is None:
+        default_capacity = int(np.ceil(num_leads / max(len(sr_labels), 1) * CAPACITY_HEADROOM))
+    limits = pd.Series(capacity if capacity is not None else {}, dtype='float64')
+    return pd.Series(sr_labels).map(limits).fillna(default_capacity).to_numpy().astype(np.int64)
+
+
+def assign_leads(leads, performance, capacity=None, default_capacity=None, **options):
+    """Assign each lead (bd_rep_id, optional deal_value) to a sales rep; returns (assignments, summary).
+
+    Leads without a deal_value are valued at their BD's average deal size. Leads
+    whose BD has no scored pairings are left unassigned.
+    """
+    performance = storage.as_frame(performance)
+    win_prob, bd_labels, sr_labels = win_probabilities(performance)
+    bd_deal_size = (performance.groupby('bd_rep_id', observed=True)['bd_avg_deal_size'].first()
+                    .reindex(bd_labels).fillna(0).to_numpy(dtype=np.float64))
+
+    bd_codes = pd.Index(bd_labels).get_indexer(leads['bd_rep_id'].astype(str))
+    known = bd_codes >= 0
+    values = np.where(known, bd_deal_size[np.maximum(bd_codes, 0)], np.nan)
+    if 'deal_value' in leads:
+        lead_values = leads['deal_value'].to_numpy(dtype=np.float64)
+        values = np.where(np.isnan(lead_values), values, lead_values)
+
+    capacities = capacity_array(sr_labels, capacity, default_capacity, int(known.sum()))
+    assigned, summary = solve(bd_codes[known], values[known], win_prob, capacities, **options)
+
+    rows = np.flatnonzero(known)[assigned >= 0]
+    reps = assigned[assigned >= 0]
+    sales_rep_ids = np.full(len(leads), None, dtype=object)
+    sales_rep_ids[rows] = sr_labels[reps]
+    win_rate = np.zeros(len(leads))
+    win_rate[rows] = win_prob[bd_codes[rows], reps]
+    expected_arr = np.zeros(len(leads))
+    expected_arr[rows] = values[rows] * win_rate[rows]
+
+    assignments = leads.copy()
+    assignments['deal_value'] = values
+    assignments['sales_rep_id'] = sales_rep_ids
+    assignments['win_probability'] = win_rate
+    assignments['expected_arr'] = expected_arr
+    summary['reps_at_capacity'] = int((assignments['sales_rep_id'].value_counts()
+                                       .reindex(sr_labels, fill_value=0).to_numpy() >= capacities).sum())
+    return assignments, summary
+
+
+def sample_leads(performance, num_leads, seed=42):
+    """Incoming leads drawn from each BD's share of historical opportunities."""
+    volume = storage.as_frame(performance).groupby('bd_rep_id', observed=True)['total_opps'].sum()
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'lead_id': [f'LEAD_{i:06d}' for i in range(1, num_leads + 1)],
+        'bd_rep_id': rng.choice(volume.index.astype(str), num_leads, p=volume.to_numpy() / volume.sum())
+    })
+
+
+def synthetic_problem(num_leads, num_reps, num_bds=500, seed=42):
+    """Random lead batch and win probabilities shaped like a large sales org."""
+    rng = np.random.default_rng(seed)
+    # A few strong reps that every BD prefers, as in sales_rep_frequency.py
+    rep_strength = rng.beta(2, 5, num_reps)
+    win_prob = np.clip(rep_strength + rng.normal(0, 0.08, (num_bds, num_reps)), 0.01, 0.95)
+    bd_codes = rng.integers(0, num_bds, num_leads)
+    values = rng.lognormal(10, 0.6, num_leads)
+    capacity = np.full(num_reps, int(np.ceil(num_leads / num_reps * CAPACITY_HEADROOM)))
+    return bd_codes, values, win_prob, capacity
+
+
+def print_summary(summary):
+    print(f"Method: {summary['method']} ({summary['rounds']} rounds, {summary['groups']:,} lead groups, "
+          f"{summary['seconds']:.2f}s)")
+    print(f"Assigned {summary['assigned']:,} leads; expected ARR ${summary['expected_arr']:,.0f}")
+    print(f"Grouped batch: ARR ${summary['grouped_arr']:,.0f}, upper bound ${summary['grouped_upper_bound']:,.0f} "
+          f"(at most {summary['gap_pct']:.3f}% below its optimum)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Assign a lead batch to sales reps under capacity limits')
+    parser.add_argument('--leads', help='CSV with bd_rep_id and optional lead_id, deal_value')
+    parser.add_argument('--batch', type=int, default=500, help='leads to sample when --leads is not given')
+    parser.add_argument('--capacity', type=int, default=None,
+                        help=f'leads per sales rep (default: even share + {CAPACITY_HEADROOM - 1:.0%})')
+    parser.add_argument('--capacity-file', help='CSV with sales_rep_id, capacity')
+    parser.add_argument('--time-limit', type=float, default=None, help='seconds before falling back to greedy')
+    parser.add_argument('--greedy', action='store_true', help='skip the optimizer and assign greedily')
+    parser.add_argument('--benchmark', action='store_true', help='solve a synthetic batch instead')
+    parser.add_argument('--reps', type=int, default=2000, help='sales reps in the synthetic batch')
+    args = parser.parse_args()
+    options = {'time_limit': args.time_limit, 'method': 'greedy' if args.greedy else 'auction'}
+
+    if args.benchmark:
+        print(f"Solving a synthetic batch of {args.batch:,} leads x {args.reps:,} reps...")
+        problem = synthetic_problem(args.batch, args.reps)
+        _, summary = solve(*problem, **options)
+        print_summary(summary)
+        _, greedy = solve(*problem, method='greedy')
+        print(f"Greedy: expected ARR ${greedy['expected_arr']:,.0f} in {greedy['seconds']:.2f}s")
+        return
+
+    print("Loading performance scores...")
+    performance = storage.read_table('performance_scores')
+    leads = pd.read_csv(args.leads) if args.leads else sample_leads(performance, args.batch)
+    capacity = None
+    if args.capacity_file:
+        limits = pd.read_csv(args.capacity_file)
+        capacity = dict(zip(limits['sales_rep_id'].astype(str), limits['capacity']))
+
+    print(f"Assigning {len(leads):,} leads...")
+    assignments, summary = assign_leads(leads, performance, capacity, args.capacity, **options)
+    print_summary(summary)
+    print(f"Sales reps at capacity: {summary['reps_at_capacity']}")
+
+    print("Saving results...")
+    assignments.to_csv(ASSIGNMENTS_PATH, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Pair Matrix
+Sparse BD x SR matrices on integer rep codes, for rosters too large to pivot
+
+Most BD-Sales pairs never share an opportunity, so one value per pair is stored
+only for the pairs that exist: CSR by BD (indptr, sales rep codes, values), with
+a column index built on first use for per-rep slices. 2M pairs of float64 take
+about 24 MB, where a dense 5,000 x 20,000 frame takes 800 MB. Dense frames are
+only produced on request, for displays small enough to read.
+
+    from pair_matrix import PairMatrix
+    scores = PairMatrix.from_frame(performance_df, 'final_performance_score')
+    scores.row('BD_001')      # that BD's sales reps and scores
+    scores.column('SR_005')   # that rep's BDs and scores
+
+    python pair_matrix.py final_performance_score --bd BD_001
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import storage
+
+# Configuration
+MAX_DENSE_CELLS = 10_000_000
+
+
+class PairMatrix:
+    """One value per (BD, SR) pair; rows are BDs, columns are sales reps, both sorted by label."""
+
+    def __init__(self, bd_labels, sr_labels, indptr, sr_codes, values):
+        self.bd_labels = np.asarray(bd_labels, dtype=object)
+        self.sr_labels = np.asarray(sr_labels, dtype=object)
+        self.indptr = indptr
+        self.sr_codes = sr_codes
+        self.values = values
+        self._bd_index = pd.Index(self.bd_labels)
+        self._sr_index = pd.Index(self.sr_labels)
+        self._column_index = None
+
+    @classmethod
+    def from_codes(cls, bd_codes, sr_codes, values, bd_labels, sr_labels):
+        """Build from COO triples on codes into bd_labels / sr_labels; each pair may appear once."""
+        bd_codes = np.asarray(bd_codes, dtype=np.int64)
+        sr_codes = np.asarray(sr_codes, dtype=np.int64)
+        order = np.lexsort((sr_codes, bd_codes))
+        bd_codes, sr_codes = bd_codes[order], sr_codes[order]
+        if ((bd_codes[1:] == bd_codes[:-1]) & (sr_codes[1:] == sr_codes[:-1])).any():
+            raise ValueError('duplicate (bd_rep_id, sales_rep_id) pairs')
+
+        indptr = np.zeros(len(bd_labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(bd_codes, minlength=len(bd_labels)), out=indptr[1:])
+        return cls(bd_labels, sr_labels, indptr, sr_codes.astype(np.int32), np.asarray(values)[order])
+
+    @classmethod
+    def from_pairs(cls, bd_rep_ids, sales_rep_ids, values, bd_labels=None, sr_labels=None):
+        """Build from rep ID columns; labels default to the sorted IDs present."""
+        bd_rep_ids = pd.Series(bd_rep_ids).astype(str)
+        sales_rep_ids = pd.Series(sales_rep_ids).astype(str)
+        if bd_labels is None:
+            bd_labels = np.sort(bd_rep_ids.unique())
+        if sr_labels is None:
+            sr_labels = np.sort(sales_rep_ids.unique())
+        bd_codes = pd.Index(bd_labels).get_indexer(bd_rep_ids)
+        sr_codes = pd.Index(sr_labels).get_indexer(sales_rep_ids)
+        if (bd_codes < 0).any() or (sr_codes < 0).any():
+            raise KeyError('rep IDs missing from the given labels')
+        return cls.from_codes(bd_codes, sr_codes, values, bd_labels, sr_labels)
+
+    @classmethod
+    def from_frame(cls, df, column):
+        """One column of a pair table (pair_metrics, performance_scores) as a matrix."""
+        df = storage.as_frame(df)
+        bd_codes, bd_labels = aggregation.factorize(df['bd_rep_id'])
+        sr_codes, sr_labels = aggregation.factorize(df['sales_rep_id'])
+        # Categorical columns can carry reps with no rows left; keep only the ones present
+        bd_present = np.unique(bd_codes)
+        sr_present = np.unique(sr_codes)
+        return cls.from_codes(np.searchsorted(bd_present, bd_codes), np.searchsorted(sr_present, sr_codes),
+                              df[column].to_numpy(), bd_labels[bd_present], sr_labels[sr_present])
+
+    @property
+    def shape(self):
+        return len(self.bd_labels), len(self.sr_labels)
+
+    @property
+    def nnz(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.sr_codes.nbytes + self.values.nbytes
+
+    def _columns(self):
+        # CSC view: positions of the stored values grouped by sales rep
+        if self._column_index is None:
+            positions = np.argsort(self.sr_codes, kind='stable')
+            colptr = np.zeros(len(self.sr_labels) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.sr_codes, minlength=len(self.sr_labels)), out=colptr[1:])
+            rows = np.repeat(np.arange(len(self.bd_labels), dtype=np.int32), np.diff(self.indptr))
+            self._column_index = (colptr, positions, rows[positions])
+        return self._column_index
+
+    def row_arrays(self, bd_rep_id):
+        """(sales rep codes, values) views for one BD, without building a Series."""
+        code = self._bd_index.get_loc(bd_rep_id)
+        start, stop = self.indptr[code], self.indptr[code + 1]
+        return self.sr_codes[start:stop], self.values[start:stop]
+
+    def column_arrays(self, sales_rep_id):
+        """(BD codes, values) for one sales rep, without building a Series."""
+        code = self._sr_index.get_loc(sales_rep_id)
+        colptr, positions, rows = self._columns()
+        start, stop = colptr[code], colptr[code + 1]
+        return rows[start:stop], self.values[positions[start:stop]]
+
+    def row(self, bd_rep_id):
+        """Sales reps paired with one BD and their values."""
+        sr_codes, values = self.row_arrays(bd_rep_id)
+        return pd.Series(values, name=bd_rep_id, index=pd.Index(self.sr_labels[sr_codes], name='sales_rep_id'))
+
+    def column(self, sales_rep_id):
+        """BDs paired with one sales rep and their values."""
+        bd_codes, values = self.column_arrays(sales_rep_id)
+        return pd.Series(values, name=sales_rep_id, index=pd.Index(self.bd_labels[bd_codes], name='bd_rep_id'))
+
+    def get(self, bd_rep_id, sales_rep_id, default=np.nan):
+        code = self._bd_index.get_loc(bd_rep_id)
+        if sales_rep_id not in self._sr_index:
+            return default
+        sr_code = self._sr_index.get_loc(sales_rep_id)
+        start, stop = self.indptr[code], self.indptr[code + 1]
+        i = start + np.searchsorted(self.sr_codes[start:stop], sr_code)
+        return self.values[i] if i < stop and self.sr_codes[i] == sr_code else default
+
+    def subset(self, bd_rep_ids=None, sales_rep_ids=None):
+        """Matrix restricted to some BDs and/or sales reps, in the order given."""
+        bd_labels = self.bd_labels if bd_rep_ids is None else np.asarray(bd_rep_ids, dtype=object)
+        sr_labels = self.sr_labels if sales_rep_ids is None else np.asarray(sales_rep_ids, dtype=object)
+        bd_map = self._bd_index.get_indexer(bd_labels)
+        sr_map = np.full(len(self.sr_labels), -1, dtype=np.int64)
+        sr_codes = self._sr_index.get_indexer(sr_labels)
+        sr_map[sr_codes[sr_codes >= 0]] = np.flatnonzero(sr_codes >= 0)
+
+        # Stored positions of the kept rows, then of the kept columns within them
+        counts = np.where(bd_map >= 0, np.diff(self.indptr)[np.maximum(bd_map, 0)], 0)
+        starts = self.indptr[np.maximum(bd_map, 0)]
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        new_rows = np.repeat(np.arange(len(bd_labels)), counts)
+        new_cols = sr_map[self.sr_codes[positions]]
+        keep = new_cols >= 0
+        return PairMatrix.from_codes(new_rows[keep], new_cols[keep], self.values[positions[keep]],
+                                     bd_labels, sr_labels)
+
+    def to_frame(self, name='value'):
+        """Long format: one row per stored pair."""
+        return pd.DataFrame({
+            'bd_rep_id': np.repeat(self.bd_labels, np.diff(self.indptr)),
+            'sales_rep_id': self.sr_labels[self.sr_codes],
+            name: self.values
+        })
+
+    def to_dense(self, fill_value=np.nan, max_cells=MAX_DENSE_CELLS):
+        """BD x SR DataFrame for display; refuses matrices over max_cells cells."""
+        num_cells = len(self.bd_labels) * len(self.sr_labels)
+        if num_cells > max_cells:
+            raise ValueError(f'{num_cells:,} cells is too many to densify; take a subset() first')
+        dense = np.full(self.shape, fill_value, dtype=np.result_type(self.values.dtype, np.asarray(fill_value)))
+        dense[np.repeat(np.arange(len(self.bd_labels)), np.diff(self.indptr)), self.sr_codes] = self.values
+        return pd.DataFrame(dense, index=pd.Index(self.bd_labels, name='bd_rep_id'),
+                            columns=pd.Index(self.sr_labels, name='sales_rep_id'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect one performance_scores column as a sparse pair matrix')
+    parser.add_argument('column', nargs='?', default='final_performance_score')
+    parser.add_argument('--bd', help='show one BD row')
+    parser.add_argument('--sr', help='show one sales rep column')
+    args = parser.parse_args()
+
+    matrix = PairMatrix.from_frame(storage.read_table('performance_scores'), args.column)
+    num_bds, num_srs = matrix.shape
+    print(f"{args.column}: {num_bds:,} BDs x {num_srs:,} sales reps, {matrix.nnz:,} pairs stored "
+          f"({matrix.nbytes / 1e6:.2f} MB sparse vs {num_bds * num_srs * 8 / 1e6:.2f} MB dense)")
+    if args.bd:
+        print(matrix.row(args.bd).to_string())
+    if args.sr:
+        print(matrix.column(args.sr).to_string())
+
+
+if __name__ == '__main__':
+    main()
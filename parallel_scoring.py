@@ -0,0 +1,126 @@
+"""
+Parallel Scoring
+Multi-core metric calculation and scoring, partitioned by BD rep
+
+Every pair metric, BD baseline, deviation, weighted score and per-BD
+recommendation depends only on the rows of one BD, so opportunities are
+hash-partitioned by bd_rep_id and each partition is processed in its own worker.
+The global percentile thresholds and the classification run once afterwards;
+with --sketch-error each worker also returns a KLL sketch of its scores and the
+thresholds come from the merged sketches.
+
+    python parallel_scoring.py --workers 32
+    python parallel_scoring.py --workers 32 --sketch-error 0.005
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import aggregation
+import performance_scoring
+import quantile_sketch
+import storage
+
+# Partitions per worker; more, smaller partitions even out skewed BD sizes
+PARTITIONS_PER_WORKER = 4
+
+# Per-process inputs, set once by the pool initializer (inherited without copying under fork)
+_partition_context = {}
+
+
+def bd_partitions(bd_rep_ids, num_partitions):
+    """Stable hash partition number for every row, from its bd_rep_id."""
+    codes, labels = aggregation.factorize(pd.Series(bd_rep_ids))
+    label_partition = pd.util.hash_array(np.asarray(labels, dtype=object)) % np.uint64(num_partitions)
+    return label_partition.astype(np.int64)[codes]
+
+
+def _init_partition_worker(opportunities, order, bounds, weights, confidence_threshold, sketch_error):
+    _partition_context.update(opportunities=opportunities, order=order, bounds=bounds,
+                              weights=weights, confidence_threshold=confidence_threshold,
+                              sketch_error=sketch_error)
+
+
+def _score_partition(partition):
+    context = _partition_context
+    start, stop = context['bounds'][partition], context['bounds'][partition + 1]
+    rows = context['opportunities'].iloc[context['order'][start:stop]]
+
+    metrics = aggregation.metrics_from_counters(aggregation.pair_counters(rows))
+    scored = performance_scoring.weighted_scores(metrics, context['weights'], context['confidence_threshold'])
+    recommendations = performance_scoring.build_recommendations(scored)
+    sketch = None
+    if context['sketch_error']:
+        sketch = performance_scoring.score_sketch(scored, context['sketch_error'], seed=partition)
+    return scored, recommendations, sketch
+
+
+def score_parallel(opportunities, workers=None, num_partitions=None,
+                   weights=performance_scoring.EQUAL_WEIGHTS,
+                   confidence_threshold=performance_scoring.CONFIDENCE_THRESHOLD, sketch_error=None):
+    """Return (performance_scores, recommendations) computed across worker processes.
+
+    With sketch_error the thresholds come from per-partition score sketches, merged.
+    """
+    workers = workers or os.cpu_count()
+    num_partitions = num_partitions or workers * PARTITIONS_PER_WORKER
+
+    # Group row positions by partition once; each worker slices its own range
+    partitions = bd_partitions(opportunities['bd_rep_id'], num_partitions)
+    order = np.argsort(partitions, kind='stable')
+    bounds = np.searchsorted(partitions[order], np.arange(num_partitions + 1))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_partition_worker,
+                             initargs=(opportunities, order, bounds, weights, confidence_threshold,
+                                       sketch_error)) as pool:
+        results = [result for result in pool.map(_score_partition, range(num_partitions))
+                   if len(result[0])]
+
+    scored = pd.concat([scored for scored, _, _ in results], ignore_index=True)
+    scored = scored.sort_values(aggregation.PAIR_KEYS, kind='stable', ignore_index=True)
+    recommendations = pd.concat([recs for _, recs, _ in results], ignore_index=True)
+    recommendations = recommendations.sort_values('bd_rep_id', kind='stable', ignore_index=True)
+
+    # The only cross-BD step: global percentile thresholds and classification
+    if sketch_error:
+        sketch = quantile_sketch.merge_all([sketch for _, _, sketch in results])
+        thresholds = performance_scoring.sketch_thresholds(sketch)
+    else:
+        thresholds = performance_scoring.percentile_thresholds(scored)
+    return performance_scoring.classify_pairs(scored, thresholds), recommendations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score BD-Sales pairings across worker processes')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--partitions', type=int, default=None,
+                        help=f'BD hash partitions (default: {PARTITIONS_PER_WORKER} per worker)')
+    parser.add_argument('--sketch-error', type=float, default=None,
+                        help='merge per-partition KLL sketches for the percentile thresholds, with this rank error')
+    args = parser.parse_args()
+
+    print("Loading opportunities data...")
+    opportunities = storage.read_opportunities(columns=['bd_rep_id', 'sales_rep_id', 'outcome',
+                                                        'days_in_current_stage', 'deal_value'])
+
+    print("Calculating metrics and scores by BD partition...")
+    started = time.perf_counter()
+    df, recommendations_df = score_parallel(opportunities, args.workers, args.partitions,
+                                           sketch_error=args.sketch_error)
+    print(f"Scored {len(df):,} pairings in {time.perf_counter() - started:.2f}s")
+
+    # Save results
+    print("Saving results...")
+    storage.write_table(df[aggregation.METRIC_COLUMNS], 'pair_metrics')
+    storage.write_table(df, 'performance_scores')
+    recommendations_df.to_csv(performance_scoring.RECOMMENDATIONS_PATH, index=False)
+
+    print(df['performance_classification'].value_counts())
+
+
+if __name__ == '__main__':
+    main()
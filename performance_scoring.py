@@ -3,11 +3,21 @@ Performance Scoring
 Calculates final performance scores using percentile-based classification
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 
+import aggregation
+import quantile_sketch
+import storage
+
 # Configuration
+RECOMMENDATIONS_PATH = 'analysis/bd_pairing_recommendations.csv'
 CONFIDENCE_THRESHOLD = 7
+MIN_OPPS = 3
+TOP_K = 5
+BEST_QUANTILE = 0.75
+WORST_QUANTILE = 0.25
 EQUAL_WEIGHTS = {
     'win_rate': 0.25,
     'early_death': 0.25,
@@ -15,120 +25,277 @@ EQUAL_WEIGHTS = {
     'deal_size': 0.25
 }
 
-print("Loading pair metrics...")
-df = pd.read_csv('analysis/pair_metrics.csv')
+# Classification labels in the order their conditions are checked
+CLASSIFICATIONS = [
+    'Insufficient Data', 'Low Confidence', 'High Performer', 'Above Average',
+    'Average', 'Below Average', 'At-Risk'
+]
+
+
+def _with_columns(df, columns):
+    """Copy of df with the given arrays added (or replaced) as columns, in order."""
+    new = pd.DataFrame(columns, index=df.index)
+    return pd.concat([df.drop(columns=[col for col in new.columns if col in df.columns]), new], axis=1)
+
+
+def weighted_scores(df, weights=EQUAL_WEIGHTS, confidence_threshold=CONFIDENCE_THRESHOLD):
+    """Weighted metric scores and confidence-adjusted final score per pair."""
+    df = storage.as_frame(df)
+    scores = {}
+
+    # Calculate weighted scores for each metric
+    scores['win_rate_weighted_score'] = df['win_rate_deviation_pct'].to_numpy() * weights['win_rate']
+    scores['early_death_weighted_score'] = -df['early_death_deviation_pct'].to_numpy() * weights['early_death']
+    scores['stale_pipeline_weighted_score'] = -df['stale_rate_deviation_pct'].to_numpy() * weights['stale_pipeline']
+    scores['deal_size_weighted_score'] = df['deal_size_deviation_pct'].to_numpy() * weights['deal_size']
 
-print("Calculating performance scores...")
+    # Calculate total weighted score
+    scores['total_weighted_score'] = (
+        scores['win_rate_weighted_score'] +
+        scores['early_death_weighted_score'] +
+        scores['stale_pipeline_weighted_score'] +
+        scores['deal_size_weighted_score']
+    )
 
-# Calculate weighted scores for each metric
-df['win_rate_weighted_score'] = df['win_rate_deviation_pct'] * EQUAL_WEIGHTS['win_rate']
-df['early_death_weighted_score'] = -df['early_death_deviation_pct'] * EQUAL_WEIGHTS['early_death']
-df['stale_pipeline_weighted_score'] = -df['stale_rate_deviation_pct'] * EQUAL_WEIGHTS['stale_pipeline']
-df['deal_size_weighted_score'] = df['deal_size_deviation_pct'] * EQUAL_WEIGHTS['deal_size']
+    # Apply confidence multiplier
+    scores['confidence_multiplier'] = np.minimum(df['total_opps'].to_numpy() / confidence_threshold, 1.0)
+    scores['final_performance_score'] = scores['total_weighted_score'] * scores['confidence_multiplier']
+    return _with_columns(df, scores)
 
-# Calculate total weighted score
-df['total_weighted_score'] = (
-    df['win_rate_weighted_score'] +
-    df['early_death_weighted_score'] +
-    df['stale_pipeline_weighted_score'] +
-    df['deal_size_weighted_score']
-)
 
-# Apply confidence multiplier
-df['confidence_multiplier'] = df['total_opps'].apply(lambda x: min(x / CONFIDENCE_THRESHOLD, 1.0))
-df['final_performance_score'] = df['total_weighted_score'] * df['confidence_multiplier']
+def percentile_thresholds(df):
+    """10th/25th/50th/75th percentiles of final score over pairs with sufficient data."""
+    # Calculate percentiles for pairs with sufficient data
+    scores = df['final_performance_score'].to_numpy()[df['total_opps'].to_numpy() >= MIN_OPPS]
+    p10, p25, p50, p75 = np.percentile(scores, [10, 25, 50, 75])
+    return p10, p25, p50, p75
 
-print("Applying percentile-based classification...")
 
-# Calculate percentiles for pairs with sufficient data
-df_for_percentiles = df[df['total_opps'] >= 3].copy()
+def score_sketch(df, epsilon=quantile_sketch.DEFAULT_ERROR, seed=0):
+    """Mergeable KLL sketch of final scores over pairs with sufficient data."""
+    scores = df['final_performance_score'].to_numpy()[df['total_opps'].to_numpy() >= MIN_OPPS]
+    return quantile_sketch.KLLSketch.from_values(scores, epsilon, seed)
 
-p10 = np.percentile(df_for_percentiles['final_performance_score'], 10)
-p25 = np.percentile(df_for_percentiles['final_performance_score'], 25)
-p50 = np.percentile(df_for_percentiles['final_performance_score'], 50)
-p75 = np.percentile(df_for_percentiles['final_performance_score'], 75)
 
-print(f"Percentile thresholds: 10th={p10:.2f}, 25th={p25:.2f}, 50th={p50:.2f}, 75th={p75:.2f}")
+def sketch_thresholds(sketch):
+    """percentile_thresholds from a score sketch, within its rank error."""
+    p10, p25, p50, p75 = sketch.quantiles([0.10, 0.25, 0.50, 0.75])
+    return p10, p25, p50, p75
+
 
 # Classify performance
-def classify_performance(row):
-    if row['total_opps'] < 3:
-        return "Insufficient Data"
-    elif row['confidence_multiplier'] < 0.43:
-        return "Low Confidence"
-    elif row['final_performance_score'] >= p75:
-        return "High Performer"
-    elif row['final_performance_score'] >= p50:
-        return "Above Average"
-    elif row['final_performance_score'] >= p25:
-        return "Average"
-    elif row['final_performance_score'] >= p10:
-        return "Below Average"
+def classify_performance(df, thresholds):
+    """Classification label for every pair; the first matching condition wins."""
+    p10, p25, p50, p75 = thresholds
+    score = df['final_performance_score'].to_numpy()
+    conditions = [
+        df['total_opps'].to_numpy() < MIN_OPPS,
+        df['confidence_multiplier'].to_numpy() < 0.43,
+        score >= p75,
+        score >= p50,
+        score >= p25,
+        score >= p10
+    ]
+    codes = np.select(conditions, range(len(conditions)), default=len(conditions))
+    return pd.Categorical.from_codes(codes, categories=CLASSIFICATIONS)
+
+
+def classify_pairs(df, thresholds):
+    """Classification, stored thresholds, and strength/concern flags."""
+    p10, p25, p50, p75 = thresholds
+    columns = {'performance_classification': classify_performance(df, thresholds)}
+
+    # Store percentile thresholds
+    columns['percentile_75th'] = np.full(len(df), p75)
+    columns['percentile_50th'] = np.full(len(df), p50)
+    columns['percentile_25th'] = np.full(len(df), p25)
+    columns['percentile_10th'] = np.full(len(df), p10)
+
+    # Identify strengths and concerns
+    win_rate = df['win_rate_deviation_pct'].to_numpy()
+    early_death = df['early_death_deviation_pct'].to_numpy()
+    stale = df['stale_rate_deviation_pct'].to_numpy()
+    deal_size = df['deal_size_deviation_pct'].to_numpy()
+
+    strengths = {
+        'strength_high_win_rate': win_rate > 20,
+        'strength_low_early_death': early_death < -20,
+        'strength_low_stale': stale < -20,
+        'strength_high_deal_size': deal_size > 20
+    }
+    concerns = {
+        'concern_low_win_rate': win_rate < -20,
+        'concern_high_early_death': early_death > 20,
+        'concern_high_stale': stale > 20,
+        'concern_low_deal_size': deal_size < -20
+    }
+    columns.update(strengths)
+    columns.update(concerns)
+
+    columns['total_strengths'] = np.sum(list(strengths.values()), axis=0)
+    columns['total_concerns'] = np.sum(list(concerns.values()), axis=0)
+    return _with_columns(df, columns)
+
+
+def score_pairs(metrics, weights=EQUAL_WEIGHTS, confidence_threshold=CONFIDENCE_THRESHOLD, sketch_error=None):
+    """Full scoring stage: weighted scores, global percentiles, classification.
+
+    With sketch_error the percentiles come from a KLL sketch with that rank error.
+    """
+    df = weighted_scores(metrics, weights, confidence_threshold)
+    if sketch_error:
+        thresholds = sketch_thresholds(score_sketch(df, sketch_error))
     else:
-        return "At-Risk"
-
-df['performance_classification'] = df.apply(classify_performance, axis=1)
-
-# Store percentile thresholds
-df['percentile_75th'] = p75
-df['percentile_50th'] = p50
-df['percentile_25th'] = p25
-df['percentile_10th'] = p10
-
-# Identify strengths and concerns
-df['strength_high_win_rate'] = df['win_rate_deviation_pct'] > 20
-df['strength_low_early_death'] = df['early_death_deviation_pct'] < -20
-df['strength_low_stale'] = df['stale_rate_deviation_pct'] < -20
-df['strength_high_deal_size'] = df['deal_size_deviation_pct'] > 20
-
-df['concern_low_win_rate'] = df['win_rate_deviation_pct'] < -20
-df['concern_high_early_death'] = df['early_death_deviation_pct'] > 20
-df['concern_high_stale'] = df['stale_rate_deviation_pct'] > 20
-df['concern_low_deal_size'] = df['deal_size_deviation_pct'] < -20
-
-strength_cols = [col for col in df.columns if col.startswith('strength_')]
-concern_cols = [col for col in df.columns if col.startswith('concern_')]
-
-df['total_strengths'] = df[strength_cols].sum(axis=1)
-df['total_concerns'] = df[concern_cols].sum(axis=1)
-
-print("Generating BD recommendations...")
-
-# Generate BD-specific recommendations
-recommendations = []
-
-for bd_id in sorted(df['bd_rep_id'].unique()):
-    bd_pairs = df[df['bd_rep_id'] == bd_id].copy()
-    bd_pairs = bd_pairs[bd_pairs['total_opps'] >= 3]
-    
-    if len(bd_pairs) == 0:
-        continue
-    
-    bd_pairs = bd_pairs.sort_values('final_performance_score', ascending=False)
-    
-    bd_p75 = bd_pairs['final_performance_score'].quantile(0.75)
-    best_pairs = bd_pairs[bd_pairs['final_performance_score'] >= bd_p75].head(5)
-    
-    bd_p25 = bd_pairs['final_performance_score'].quantile(0.25)
-    worst_pairs = bd_pairs[bd_pairs['final_performance_score'] <= bd_p25].tail(5)
-    
-    recommendations.append({
-        'bd_rep_id': bd_id,
-        'total_pairings': len(bd_pairs),
-        'avg_performance_score': bd_pairs['final_performance_score'].mean(),
-        'best_sales_reps': ', '.join(best_pairs['sales_rep_id'].tolist()),
-        'worst_sales_reps': ', '.join(worst_pairs['sales_rep_id'].tolist()),
-        'best_avg_score': best_pairs['final_performance_score'].mean() if len(best_pairs) > 0 else None,
-        'worst_avg_score': worst_pairs['final_performance_score'].mean() if len(worst_pairs) > 0 else None,
-        'num_best': len(best_pairs),
-        'num_worst': len(worst_pairs)
+        thresholds = percentile_thresholds(df)
+    return classify_pairs(df, thresholds)
+
+
+def _grouped_quantile(values, starts, counts, q):
+    """Linear-interpolated quantile of each group of an ascending-sorted array.
+
+    Same interpolation as Series.quantile / np.percentile; groups with no values give NaN.
+    """
+    virtual = (counts - 1) * q
+    previous = np.floor(virtual)
+    at_end = virtual >= counts - 1
+    previous = np.where(at_end, counts - 1, previous).astype(np.int64)
+    following = np.where(at_end, previous, previous + 1)
+    gamma = virtual - np.where(at_end, -1, previous)
+
+    has_values = counts > 0
+    a = np.full(len(counts), np.nan)
+    b = np.full(len(counts), np.nan)
+    a[has_values] = values[(starts + previous)[has_values]]
+    b[has_values] = values[(starts + following)[has_values]]
+    diff = b - a
+    return np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+
+
+def _grouped_sum(values, starts, counts):
+    """Sum of each contiguous group, bit-identical to Series.sum on that group.
+
+    numpy's pairwise summation order depends on the length being summed, so groups
+    of equal size are stacked into rows and reduced together, one pass per size.
+    """
+    sums = np.zeros(len(counts))
+    for size in np.unique(counts[counts > 0]):
+        groups = np.flatnonzero(counts == size)
+        sums[groups] = values[starts[groups, None] + np.arange(size)].sum(axis=1)
+    return sums
+
+
+def _starts(counts):
+    return np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+
+def build_recommendations(df, k=TOP_K, best_quantile=BEST_QUANTILE, worst_quantile=WORST_QUANTILE):
+    """Top/bottom sales reps per BD from scored pairs.
+
+    A BD's best reps are the k highest-scoring pairs at or above its best_quantile
+    score; its worst reps are the k lowest at or below its worst_quantile score
+    (listed highest first). Everything is computed in one sorted pass over all BDs.
+    """
+    df = storage.as_frame(df)
+    df = df[df['total_opps'].to_numpy() >= MIN_OPPS]
+    bd_codes, bd_labels = aggregation.factorize(df['bd_rep_id'])
+    scores = df['final_performance_score'].to_numpy(dtype=np.float64)
+    sales_reps = df['sales_rep_id'].astype(str).to_numpy(dtype=object)
+
+    # Sort by BD, then score descending with missing scores last (stable for ties)
+    order = np.lexsort((np.where(np.isnan(scores), np.inf, -scores), bd_codes))
+    bd_codes, scores, sales_reps = bd_codes[order], scores[order], sales_reps[order]
+
+    num_bds = len(bd_labels)
+    total = np.bincount(bd_codes, minlength=num_bds)
+    starts = _starts(total)
+    scored = ~np.isnan(scores)
+    valid = np.bincount(bd_codes[scored], minlength=num_bds)
+    position = np.arange(len(scores)) - starts[bd_codes]
+
+    # The scored rows of each BD are a prefix of its group; quantiles need them ascending
+    descending = scores[scored]
+    valid_starts = _starts(valid)
+    ascending = descending[(valid_starts + valid - 1)[bd_codes[scored]] - position[scored]]
+    best_cutoff = _grouped_quantile(ascending, valid_starts, valid, best_quantile)
+    worst_cutoff = _grouped_quantile(ascending, valid_starts, valid, worst_quantile)
+
+    # Scores at or above the cutoff form the head of each group, those at or below the tail
+    num_best = np.minimum(np.bincount(bd_codes, weights=scores >= best_cutoff[bd_codes],
+                                      minlength=num_bds).astype(np.int64), k)
+    num_worst = np.minimum(np.bincount(bd_codes, weights=scores <= worst_cutoff[bd_codes],
+                                       minlength=num_bds).astype(np.int64), k)
+    is_best = position < num_best[bd_codes]
+    is_worst = (position >= (valid - num_worst)[bd_codes]) & (position < valid[bd_codes])
+
+    def joined(selected):
+        names = pd.Series(sales_reps[selected]).groupby(bd_codes[selected], sort=True).agg(', '.join)
+        return names.reindex(np.arange(num_bds), fill_value='').to_numpy(dtype=object)
+
+    def mean(values, counts, divisor):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(divisor > 0, _grouped_sum(values, _starts(counts), counts), np.nan) / divisor
+
+    # Missing scores count as zero in the sum but not in the divisor, as Series.mean does
+    recommendations = pd.DataFrame({
+        'bd_rep_id': bd_labels,
+        'total_pairings': total,
+        'avg_performance_score': mean(np.where(scored, scores, 0.0), total, valid),
+        'best_sales_reps': joined(is_best),
+        'worst_sales_reps': joined(is_worst),
+        'best_avg_score': mean(scores[is_best], num_best, num_best),
+        'worst_avg_score': mean(scores[is_worst], num_worst, num_worst),
+        'num_best': num_best,
+        'num_worst': num_worst
     })
+    return recommendations[total > 0].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score BD-Sales pairings and build recommendations')
+    parser.add_argument('--stage', choices=['all', 'scores', 'recommendations'], default='all',
+                        help='scores: write performance_scores only; recommendations: build '
+                             'bd_pairing_recommendations.csv from saved performance_scores')
+    parser.add_argument('--top-k', type=int, default=TOP_K, help='best/worst sales reps listed per BD')
+    parser.add_argument('--best-quantile', type=float, default=BEST_QUANTILE,
+                        help="per-BD score quantile a best rep must reach")
+    parser.add_argument('--worst-quantile', type=float, default=WORST_QUANTILE,
+                        help="per-BD score quantile a worst rep must not exceed")
+    parser.add_argument('--sketch-error', type=float, default=None,
+                        help='take percentile thresholds from a KLL sketch with this rank error (e.g. 0.005)')
+    args = parser.parse_args()
+
+    if args.stage == 'recommendations':
+        print("Loading performance scores...")
+        df = storage.read_table('performance_scores')
+    else:
+        print("Loading pair metrics...")
+        metrics = storage.read_table('pair_metrics')
+
+        print("Calculating performance scores...")
+        df = weighted_scores(metrics)
+
+        print("Applying percentile-based classification...")
+        if args.sketch_error:
+            thresholds = sketch_thresholds(score_sketch(df, args.sketch_error))
+        else:
+            thresholds = percentile_thresholds(df)
+        p10, p25, p50, p75 = thresholds
+        print(f"Percentile thresholds: 10th={p10:.2f}, 25th={p25:.2f}, 50th={p50:.2f}, 75th={p75:.2f}")
+        df = classify_pairs(df, thresholds)
+
+    if args.stage != 'scores':
+        print("Generating BD recommendations...")
+        recommendations_df = build_recommendations(df, args.top_k, args.best_quantile, args.worst_quantile)
+
+    # Save results
+    print("Saving results...")
+    if args.stage != 'recommendations':
+        storage.write_table(df, 'performance_scores')
+    if args.stage != 'scores':
+        recommendations_df.to_csv(RECOMMENDATIONS_PATH, index=False)
 
-recommendations_df = pd.DataFrame(recommendations)
+    print(df['performance_classification'].value_counts())
 
-# Save results
-print("Saving results...")
-df.to_csv('analysis/performance_scores.csv', index=False)
-recommendations_df.to_csv('analysis/bd_pairing_recommendations.csv', index=False)
 
-print(df['performance_classification'].value_counts())
\ No newline at end of file
+if __name__ == '__main__':
+    main()
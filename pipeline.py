@@ -0,0 +1,85 @@
+"""
+Pipeline
+Runs the analysis stages in one process, passing DataFrames between them
+
+    from pipeline import run_pipeline
+    results = run_pipeline(opportunities_df, save=False)
+    results['performance_scores'], results['bd_pairing_recommendations'], results['routing_impact_analysis']
+
+From the command line this replaces steps 2-4 of the README:
+
+    python pipeline.py
+"""
+
+import argparse
+import time
+
+import exploratory_data_analysis
+import metric_calculation
+import performance_scoring
+import routing_impact
+import routing_service
+import routing_snapshots
+import storage
+
+
+def run_pipeline(opportunities=None, weights=performance_scoring.EQUAL_WEIGHTS,
+                 confidence_threshold=performance_scoring.CONFIDENCE_THRESHOLD,
+                 save=False, as_arrow=False):
+    """EDA summary, pair metrics, scores, recommendations and ARR impact for one opportunities table.
+
+    opportunities may be a DataFrame or an Arrow table; by default it is loaded
+    from storage. With save=True the tables are also written where the scripts
+    write them. With as_arrow=True tables are returned as Arrow tables.
+    """
+    if opportunities is None:
+        opportunities = storage.read_opportunities()
+    opportunities = storage.as_frame(opportunities)
+
+    metrics = metric_calculation.compute_pair_metrics(opportunities)
+    scores = performance_scoring.score_pairs(metrics, weights, confidence_threshold)
+    recommendations = performance_scoring.build_recommendations(scores)
+    impact = routing_impact.compute_impact(recommendations, scores)
+
+    results = {
+        'eda_summary': exploratory_data_analysis.summarize(opportunities),
+        'pair_metrics': metrics,
+        'performance_scores': scores,
+        'bd_pairing_recommendations': recommendations,
+        'routing_impact_analysis': impact
+    }
+    if save:
+        save_results(results)
+    if as_arrow:
+        for name in ['pair_metrics', 'performance_scores', 'bd_pairing_recommendations',
+                     'routing_impact_analysis']:
+            results[name] = storage.as_arrow(results[name])
+    return results
+
+
+def save_results(results):
+    storage.write_table(results['pair_metrics'], 'pair_metrics')
+    storage.write_table(results['performance_scores'], 'performance_scores')
+    results['bd_pairing_recommendations'].to_csv(performance_scoring.RECOMMENDATIONS_PATH, index=False)
+    results['routing_impact_analysis'].to_csv(routing_impact.IMPACT_PATH, index=False)
+    routing_snapshots.publish(routing_service.RoutingIndex.from_scores(results['performance_scores']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run metrics, scoring, recommendations and ARR impact in one process')
+    parser.add_argument('--no-save', action='store_true', help='compute only; do not write analysis tables')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_pipeline(save=not args.no_save)
+    elapsed = time.perf_counter() - started
+
+    summary = results['eda_summary']
+    print(f"Opportunities: {summary['total_records']:,} ({summary['data_quality_issues']} data quality issues)")
+    print(f"Scored {len(results['performance_scores']):,} pairings for "
+          f"{len(results['bd_pairing_recommendations']):,} BDs in {elapsed:.2f}s")
+    print(results['performance_scores']['performance_classification'].value_counts())
+
+
+if __name__ == '__main__':
+    main()
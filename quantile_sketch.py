@@ -0,0 +1,179 @@
+"""
+Quantile Sketch
+Mergeable KLL quantile sketch for percentile thresholds over streamed or partitioned scores
+
+A KLL sketch keeps a few levels of sorted samples; an item on level h stands for
+2**h original values. When a level outgrows its capacity it is sorted and every
+other item (from a random offset) moves up a level, so total weight is preserved
+and memory stays O(k log(n / k)). Sketches built on separate chunks or worker
+processes merge level by level into a sketch of the union. The rank error of a
+quantile is about epsilon * n with high probability, where k = KLL_ERROR_CONSTANT / epsilon.
+Small inputs that never compact are answered exactly, as np.percentile would.
+
+    from quantile_sketch import KLLSketch
+    sketch = KLLSketch.for_error(0.005)
+    for chunk in chunks:
+        sketch.update(chunk)
+    p10, p25, p50, p75 = sketch.quantiles([0.10, 0.25, 0.50, 0.75])
+
+    python quantile_sketch.py --error 0.005 --values 10000000
+"""
+
+import argparse
+import time
+from functools import reduce
+
+import numpy as np
+
+# Configuration
+DEFAULT_ERROR = 0.005
+KLL_ERROR_CONSTANT = 2.7
+CAPACITY_DECAY = 2 / 3
+MIN_CAPACITY = 8
+
+
+def k_for_error(epsilon):
+    """Top-level capacity k that keeps rank errors within about epsilon * n."""
+    return int(np.ceil(KLL_ERROR_CONSTANT / epsilon))
+
+
+class KLLSketch:
+    """Levels of sorted samples; level h items carry weight 2**h."""
+
+    def __init__(self, k=None, seed=None):
+        self.k = k or k_for_error(DEFAULT_ERROR)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def for_error(cls, epsilon=DEFAULT_ERROR, seed=None):
+        return cls(k_for_error(epsilon), seed)
+
+    @classmethod
+    def from_values(cls, values, epsilon=DEFAULT_ERROR, seed=None):
+        return cls.for_error(epsilon, seed).update(values)
+
+    @property
+    def epsilon(self):
+        return KLL_ERROR_CONSTANT / self.k
+
+    @property
+    def num_retained(self):
+        return sum(len(items) for items in self.levels)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(MIN_CAPACITY, int(np.ceil(self.k * CAPACITY_DECAY ** depth)))
+
+    def _compress(self):
+        # One upward pass: compaction only ever adds items to higher levels
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind; half of the rest moves up at double weight
+                odd = len(items) % 2
+                promoted = items[odd + self._rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add a batch of values; NaNs are skipped."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold in a sketch built on other values; the smaller k of the two bounds the error."""
+        self.k = min(self.k, other.k)
+        self.levels += [np.empty(0)] * (len(other.levels) - len(self.levels))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Values at the given quantiles in [0, 1], with np.percentile's linear interpolation."""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.n == 1:
+            return np.full(qs.shape, self.min)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level, dtype=np.int64)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+
+        # Each retained item sits at the middle of the ranks it stands for; with unit
+        # weights that is exactly its position, as in np.percentile
+        ranks = (np.cumsum(weights) - (weights + 1) / 2) / (self.n - 1)
+        return np.interp(qs, np.concatenate([[0.0], ranks, [1.0]]),
+                         np.concatenate([[self.min], items, [self.max]]))
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def nbytes(self):
+        return sum(items.nbytes for items in self.levels)
+
+
+def merge_all(sketches):
+    """Merge sketches into the first of them (None if there are none)."""
+    sketches = [sketch for sketch in sketches if sketch is not None]
+    if not sketches:
+        return None
+    return reduce(lambda merged, sketch: merged.merge(sketch), sketches[1:], sketches[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check KLL quantile accuracy and speed on synthetic scores')
+    parser.add_argument('--error', type=float, default=DEFAULT_ERROR, help='target rank error epsilon')
+    parser.add_argument('--values', type=int, default=10_000_000)
+    parser.add_argument('--chunks', type=int, default=16, help='sketch the values in this many parts, then merge')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    values = rng.standard_t(3, args.values) * 25
+    qs = np.array([0.10, 0.25, 0.50, 0.75])
+
+    started = time.perf_counter()
+    sketches = [KLLSketch.from_values(chunk, args.error, seed=args.seed + i)
+                for i, chunk in enumerate(np.array_split(values, args.chunks))]
+    sketch = merge_all(sketches)
+    estimates = sketch.quantiles(qs)
+    elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    exact = np.percentile(values, qs * 100)
+    exact_elapsed = time.perf_counter() - started
+
+    ordered = np.sort(values)
+    rank_errors = np.abs(np.searchsorted(ordered, estimates) / len(values) - qs)
+    print(f"k={sketch.k}, {sketch.num_retained:,} values retained ({sketch.nbytes() / 1e3:.1f} KB) "
+          f"for {sketch.n:,} in {args.chunks} merged parts")
+    print(f"Sketch {elapsed:.2f}s, np.percentile {exact_elapsed:.2f}s")
+    for q, estimate, value, error in zip(qs, estimates, exact, rank_errors):
+        print(f"  p{q * 100:.0f}: sketch {estimate:10.4f}  exact {value:10.4f}  rank error {error:.5f}")
+    print(f"Max rank error {rank_errors.max():.5f} (target {args.error})")
+
+
+if __name__ == '__main__':
+    main()
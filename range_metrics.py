@@ -0,0 +1,227 @@
+"""
+Range Metrics
+Pair metrics for any [start, end] date range from a per-pair cumulative index
+
+Opportunities are bucketed by pair and activity day (closed_date once decided,
+created_date while open, as in window_metrics.py). The index keeps the buckets sorted by
+pair and day, with running totals of every outcome state and the deal value sums.
+Each pair's buckets are contiguous, so the counters of all pairs over [start, end]
+are the totals at two positions per pair subtracted. A position is the pair's first
+bucket plus its buckets before the bound, found for every pair in one counting pass.
+BD baselines for the same range are summed from those pair counters.
+
+    python range_metrics.py build                                   # index the full history
+    python range_metrics.py query --start 2024-01-01 --end 2024-06-30 --score
+    python range_metrics.py query --end 2023-12-31 --output pair_metrics_2023
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import performance_scoring
+import storage
+import window_metrics
+
+# Configuration
+INDEX_PATH = 'analysis/range_index.npz'
+INPUT_COLUMNS = ['bd_rep_id', 'sales_rep_id', 'created_date', 'closed_date',
+                 'outcome', 'days_in_current_stage', 'deal_value']
+
+
+def _day_number(date):
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+class RangeIndex:
+    """(pair, day) buckets in pair order with cumulative state counts and deal value sums."""
+
+    ARRAYS = ['bd_labels', 'sr_labels', 'pair_bd', 'pair_sr', 'pair_ptr', 'bucket_day',
+              'cum_states', 'cum_value_sum', 'cum_value_count']
+
+    def __init__(self, bd_labels, sr_labels, pair_bd, pair_sr, pair_ptr, bucket_day, cum_states,
+                 cum_value_sum, cum_value_count, first_day, num_days):
+        self.bd_labels = np.asarray(bd_labels, dtype=object)
+        self.sr_labels = np.asarray(sr_labels, dtype=object)
+        self.pair_bd = pair_bd
+        self.pair_sr = pair_sr
+        self.pair_ptr = pair_ptr
+        self.bucket_day = bucket_day
+        self.cum_states = cum_states
+        self.cum_value_sum = cum_value_sum
+        self.cum_value_count = cum_value_count
+        self.first_day = first_day
+        self.num_days = num_days
+
+    @classmethod
+    def from_opportunities(cls, opportunities):
+        opportunities = storage.as_frame(opportunities)
+        bd_codes, bd_labels = aggregation.factorize(opportunities['bd_rep_id'])
+        sr_codes, sr_labels = aggregation.factorize(opportunities['sales_rep_id'])
+        states = aggregation.opportunity_states(opportunities['outcome'], opportunities['days_in_current_stage'])
+        values = opportunities['deal_value'].to_numpy(dtype=np.float64)
+        days = window_metrics.activity_days(opportunities['created_date'], opportunities['closed_date'])
+
+        # Rows without a rep ID are dropped, as groupby does
+        valid = (bd_codes >= 0) & (sr_codes >= 0)
+        bd_codes, sr_codes, states, values, days = (
+            bd_codes[valid], sr_codes[valid], states[valid], values[valid], days[valid])
+
+        first_day = int(days.min()) if len(days) else 0
+        num_days = int(days.max()) - first_day + 1 if len(days) else 1
+        pairs, pair_keys = pd.factorize(bd_codes.astype(np.int64) * len(sr_labels) + sr_codes, sort=True)
+        pair_keys = np.asarray(pair_keys, dtype=np.int64)
+
+        # One row per (pair, day) bucket, in key order
+        keys, buckets = np.unique(pairs.astype(np.int64) * num_days + (days - first_day), return_inverse=True)
+        buckets = buckets.ravel()
+        state_counts = np.bincount(buckets * aggregation.NUM_STATES + states,
+                                   minlength=len(keys) * aggregation.NUM_STATES).reshape(-1, aggregation.NUM_STATES)
+        has_value = ~np.isnan(values)
+        value_sum = np.bincount(buckets[has_value], weights=values[has_value], minlength=len(keys))
+        value_count = np.bincount(buckets[has_value], minlength=len(keys))
+        pair_ptr = np.zeros(len(pair_keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // num_days, minlength=len(pair_keys)), out=pair_ptr[1:])
+
+        cum_states = np.zeros((len(keys) + 1, aggregation.NUM_STATES), dtype=np.int64)
+        np.cumsum(state_counts, axis=0, out=cum_states[1:])
+        cum_value_sum = np.zeros(len(keys) + 1)
+        np.cumsum(value_sum, out=cum_value_sum[1:])
+        cum_value_count = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(value_count, out=cum_value_count[1:])
+
+        return cls(bd_labels, sr_labels, (pair_keys // len(sr_labels)).astype(np.int32),
+                   (pair_keys % len(sr_labels)).astype(np.int32), pair_ptr, (keys % num_days).astype(np.int32),
+                   cum_states, cum_value_sum, cum_value_count, first_day, num_days)
+
+    @property
+    def num_pairs(self):
+        return len(self.pair_bd)
+
+    @property
+    def date_range(self):
+        return (window_metrics.day_label(self.first_day),
+                window_metrics.day_label(self.first_day + self.num_days - 1))
+
+    def _position(self, day):
+        # Per pair, the first bucket on or after day: its first bucket plus its buckets before day
+        if day <= 0:
+            return self.pair_ptr[:-1]
+        if day >= self.num_days:
+            return self.pair_ptr[1:]
+        before = np.zeros(len(self.bucket_day) + 1, dtype=np.int64)
+        np.cumsum(self.bucket_day < day, out=before[1:])
+        return self.pair_ptr[:-1] + before[self.pair_ptr[1:]] - before[self.pair_ptr[:-1]]
+
+    def _positions(self, start, end):
+        # Bucket positions bounding [start, end] for every pair
+        start = 0 if start is None else _day_number(start) - self.first_day
+        end = self.num_days - 1 if end is None else _day_number(end) - self.first_day
+        if end < start:
+            return self.pair_ptr[:-1], self.pair_ptr[:-1]
+        return self._position(start), self._position(end + 1)
+
+    def range_counters(self, start=None, end=None):
+        """(state counts, deal value sums, deal value counts) per pair, for activity days in [start, end]."""
+        lo, hi = self._positions(start, end)
+        # np.take gathers whole rows much faster than fancy indexing on the 2-D array
+        return (np.take(self.cum_states, hi, axis=0) - np.take(self.cum_states, lo, axis=0),
+                np.take(self.cum_value_sum, hi) - np.take(self.cum_value_sum, lo),
+                np.take(self.cum_value_count, hi) - np.take(self.cum_value_count, lo))
+
+    def counters(self, start=None, end=None):
+        """Pair and BD counter frames over [start, end]; either bound may be omitted."""
+        states, value_sum, value_count = self.range_counters(start, end)
+        pairs = np.flatnonzero(states.sum(axis=1) > 0)
+        pair_counters = pd.DataFrame(
+            aggregation.counters_from_states(states[pairs], value_sum[pairs], value_count[pairs]),
+            index=pd.MultiIndex.from_arrays([self.bd_labels[self.pair_bd[pairs]],
+                                             self.sr_labels[self.pair_sr[pairs]]],
+                                            names=aggregation.PAIR_KEYS),
+            columns=aggregation.COUNTER_COLUMNS
+        )
+
+        # BD baselines over the same range are sums of the pair counters
+        num_bds = len(self.bd_labels)
+        bd_states = np.stack([np.bincount(self.pair_bd, weights=states[:, s], minlength=num_bds)
+                              for s in range(aggregation.NUM_STATES)], axis=1).astype(np.int64)
+        bd_counters = pd.DataFrame(
+            aggregation.counters_from_states(
+                bd_states, np.bincount(self.pair_bd, weights=value_sum, minlength=num_bds),
+                np.bincount(self.pair_bd, weights=value_count, minlength=num_bds).astype(np.int64)),
+            index=pd.Index(self.bd_labels, name='bd_rep_id'),
+            columns=aggregation.COUNTER_COLUMNS
+        )
+        return pair_counters, bd_counters
+
+    def pair_metrics(self, start=None, end=None):
+        """pair_metrics layout for opportunities with activity days in [start, end]."""
+        return aggregation.metrics_from_counters(*self.counters(start, end))
+
+    def as_of(self, date):
+        """pair_metrics over the whole history up to and including date."""
+        return self.pair_metrics(end=date)
+
+    def save(self, path=INDEX_PATH):
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays['bd_labels'] = np.array(self.bd_labels, dtype=str)
+        arrays['sr_labels'] = np.array(self.sr_labels, dtype=str)
+        np.savez(path, first_day=self.first_day, num_days=self.num_days, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as saved:
+            arrays = [saved[name] for name in cls.ARRAYS]
+            return cls(*arrays, int(saved['first_day']), int(saved['num_days']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pair metrics for arbitrary date ranges')
+    parser.add_argument('--index', default=INDEX_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', help='index the full opportunity history')
+    query_parser = commands.add_parser('query', help='pair metrics for activity days in [start, end]')
+    query_parser.add_argument('--start', help='first day (default: start of history)')
+    query_parser.add_argument('--end', help='last day (default: end of history)')
+    query_parser.add_argument('--score', action='store_true', help='also score and classify the pairings')
+    query_parser.add_argument('--output', help='save the result as this analysis table')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        print("Loading opportunities data...")
+        opportunities = storage.read_opportunities(columns=INPUT_COLUMNS)
+        started = time.perf_counter()
+        index = RangeIndex.from_opportunities(opportunities)
+        print(f"Indexed {index.num_pairs:,} pairings over {index.num_days:,} days "
+              f"({len(index.bucket_day):,} day buckets) in {time.perf_counter() - started:.2f}s")
+        print(f"Saved to {index.save(args.index)}")
+        return
+
+    index = RangeIndex.load(args.index)
+    first, last = index.date_range
+    print(f"Index covers {first} to {last}")
+
+    started = time.perf_counter()
+    result = index.pair_metrics(args.start, args.end)
+    if args.score:
+        # Percentile thresholds need at least one pairing with MIN_OPPS opportunities
+        if not (result['total_opps'] >= performance_scoring.MIN_OPPS).any():
+            sys.exit(f"{args.start or first} to {args.end or last}: {len(result):,} pairings, none with at least "
+                     f"{performance_scoring.MIN_OPPS} opportunities; nothing to score")
+        result = performance_scoring.score_pairs(result)
+    elapsed = time.perf_counter() - started
+    print(f"{args.start or first} to {args.end or last}: {len(result):,} pairings, "
+          f"{result['total_opps'].sum():,} opportunities in {elapsed * 1000:.1f} ms")
+    if args.score:
+        print(result['performance_classification'].value_counts().to_string())
+    if args.output:
+        print(f"Saved to {storage.write_table(result, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
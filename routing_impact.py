@@ -0,0 +1,125 @@
+"""
+Routing Impact Analysis
+Expected ARR impact of routing each BD's leads to its recommended sales reps
+
+Works from per-BD aggregates of performance_scores only: the BD's average deal
+size is already stored there (bd_avg_deal_size), so no opportunity rows are read
+or joined. Recommended reps are matched to pairs through integer pair keys.
+
+    python routing_impact.py
+"""
+
+import numpy as np
+import pandas as pd
+
+import performance_scoring
+import storage
+
+# Configuration
+IMPACT_PATH = 'analysis/routing_impact_analysis.csv'
+IMPACT_COLUMNS = [
+    'bd_rep_id', 'current_avg_score', 'optimized_score', 'worst_case_score', 'improvement_points',
+    'total_swing', 'total_opps', 'current_arr', 'optimized_arr', 'arr_improvement'
+]
+
+
+def _listed_pairs(recommendations, column):
+    """(bd position, sales_rep_id) for every rep named in a comma-separated recommendations column."""
+    reps = recommendations[column].fillna('').astype(str).str.split(',')
+    reps.index = np.arange(len(recommendations))
+    reps = reps.explode().str.strip()
+    reps = reps[reps != '']
+    return reps.index.to_numpy(), reps.to_numpy(dtype=object)
+
+
+def compute_impact(recommendations, performance):
+    """Per-BD current, best-case and worst-case scores and ARR, one row per recommended BD."""
+    performance = storage.as_frame(performance)
+    performance = performance[performance['total_opps'].to_numpy() >= performance_scoring.MIN_OPPS]
+    bd_ids = recommendations['bd_rep_id'].astype(str).to_numpy(dtype=object)
+    num_bds = len(bd_ids)
+
+    bd_codes = pd.Index(bd_ids).get_indexer(performance['bd_rep_id'].astype(str))
+    in_recs = bd_codes >= 0
+    bd_codes = bd_codes[in_recs]
+    performance = performance[in_recs]
+
+    best_bds, best_reps = _listed_pairs(recommendations, 'best_sales_reps')
+    worst_bds, worst_reps = _listed_pairs(recommendations, 'worst_sales_reps')
+
+    # One integer key per (BD, sales rep); listed reps are found with a set lookup instead of a merge
+    sr_codes, sr_labels = pd.factorize(np.concatenate([
+        performance['sales_rep_id'].astype(str).to_numpy(dtype=object), best_reps, worst_reps
+    ]))
+    num_srs = len(sr_labels)
+    pair_keys = bd_codes.astype(np.int64) * num_srs + sr_codes[:len(performance)]
+    best_keys = best_bds * num_srs + sr_codes[len(performance):len(performance) + len(best_reps)]
+    worst_keys = worst_bds * num_srs + sr_codes[len(performance) + len(best_reps):]
+    is_best = np.isin(pair_keys, best_keys)
+    is_worst = np.isin(pair_keys, worst_keys)
+
+    score = performance['final_performance_score'].to_numpy(dtype=np.float64)
+    win_rate = performance['win_rate_pct'].to_numpy(dtype=np.float64) / 100
+
+    def grouped_mean(values, mask=None):
+        codes = bd_codes if mask is None else bd_codes[mask]
+        values = values if mask is None else values[mask]
+        counts = np.bincount(codes, minlength=num_bds)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.bincount(codes, weights=values, minlength=num_bds) / counts, counts
+
+    # Current state metrics
+    current_avg_score, num_pairings = grouped_mean(score)
+    current_win_rate, _ = grouped_mean(win_rate)
+    current_avg_deal = np.full(num_bds, np.nan)
+    current_avg_deal[bd_codes] = performance['bd_avg_deal_size'].to_numpy(dtype=np.float64)
+    total_opps = np.bincount(bd_codes, weights=performance['total_opps'].to_numpy(),
+                             minlength=num_bds).astype(np.int64)
+
+    # Best and worst pairings; a BD whose listed reps are not found falls back to its current state
+    best_avg_score, num_best = grouped_mean(score, is_best)
+    best_win_rate, _ = grouped_mean(win_rate, is_best)
+    worst_avg_score, num_worst = grouped_mean(score, is_worst)
+    best_avg_score = np.where(num_best > 0, best_avg_score, current_avg_score)
+    best_win_rate = np.where(num_best > 0, best_win_rate, current_win_rate)
+    worst_avg_score = np.where(num_worst > 0, worst_avg_score, current_avg_score)
+
+    # Current ARR (current win rate x avg deal x opportunities) vs routing to the best reps
+    current_arr = current_win_rate * current_avg_deal * total_opps
+    optimized_arr = best_win_rate * current_avg_deal * total_opps
+
+    impact_df = pd.DataFrame({
+        'bd_rep_id': bd_ids,
+        'current_avg_score': current_avg_score,
+        'optimized_score': best_avg_score,
+        'worst_case_score': worst_avg_score,
+        'improvement_points': best_avg_score - current_avg_score,
+        'total_swing': best_avg_score - worst_avg_score,
+        'total_opps': total_opps,
+        'current_arr': current_arr,
+        'optimized_arr': optimized_arr,
+        'arr_improvement': optimized_arr - current_arr
+    }, columns=IMPACT_COLUMNS)
+    return impact_df[num_pairings > 0].reset_index(drop=True)
+
+
+def main():
+    print("Loading recommendations and performance scores...")
+    recommendations = pd.read_csv(performance_scoring.RECOMMENDATIONS_PATH)
+    performance = storage.read_table('performance_scores')
+
+    print("Calculating routing impact...")
+    impact_df = compute_impact(recommendations, performance)
+
+    print("Saving results...")
+    impact_df.to_csv(IMPACT_PATH, index=False)
+
+    total_current_arr = impact_df['current_arr'].sum()
+    total_arr_improvement = impact_df['arr_improvement'].sum()
+    print(f"Current ARR: ${total_current_arr:,.0f}")
+    print(f"Expected ARR lift: ${total_arr_improvement:,.0f} "
+          f"({total_arr_improvement / total_current_arr * 100:.1f}%) across {len(impact_df)} BDs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+Routing Service
+Answers "which sales reps should get this BD's lead" from a precomputed index
+
+The index is built once from performance_scores. Each BD owns a contiguous slice
+of sales rep codes and scores, sorted best first, so a lookup is one binary
+search over the BD ids and one slice. It can be used in-process or over a local HTTP endpoint:
+
+    from routing_service import load_index
+    index = load_index()
+    index.route('BD_001', k=3)   # [('SR_018', 49.2), ('SR_001', 44.1), ...]
+
+    python routing_service.py route BD_001 --k 3
+    python routing_service.py serve --port 8765   # GET /route?bd_rep_id=BD_001&k=3
+    python routing_service.py serve --snapshots   # follow versions from routing_snapshots.py
+    python routing_service.py benchmark --bds 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import performance_scoring
+import storage
+
+# Configuration
+HOST = '127.0.0.1'
+PORT = 8765
+INDEX_COLUMNS = ['bd_rep_id', 'sales_rep_id', 'total_opps', 'final_performance_score']
+
+
+class RoutingIndex:
+    """Sales reps ranked by final_performance_score for every BD, in CSR layout.
+
+    bd_labels is sorted; bd_labels[i]'s candidates are sr_codes[offsets[i]:offsets[i + 1]]
+    (indices into sr_labels) with matching scores, highest score first. Only pairs
+    with at least MIN_OPPS opportunities and a score are ranked, as in the
+    recommendations. Labels are fixed-width strings and lookups binary-search them,
+    so an index saved with save() can be memory-mapped and used without rebuilding.
+    """
+
+    ARRAYS = ['bd_labels', 'sr_labels', 'offsets', 'sr_codes', 'scores']
+
+    def __init__(self, bd_labels, sr_labels, offsets, sr_codes, scores):
+        self.bd_labels = bd_labels
+        self.sr_labels = sr_labels
+        self.offsets = offsets
+        self.sr_codes = sr_codes
+        self.scores = scores
+        # Longer keys cannot match, and searching with them would copy bd_labels to a wider dtype
+        self._max_id_length = bd_labels.dtype.itemsize // np.dtype('U1').itemsize
+
+    @classmethod
+    def from_scores(cls, performance):
+        df = storage.as_frame(performance)
+        df = df[(df['total_opps'].to_numpy() >= performance_scoring.MIN_OPPS) &
+                df['final_performance_score'].notna().to_numpy()]
+        bd_codes, bd_labels = aggregation.factorize(df['bd_rep_id'])
+        sr_codes, sr_labels = aggregation.factorize(df['sales_rep_id'])
+        scores = df['final_performance_score'].to_numpy(dtype=np.float64)
+
+        # Group by BD, best score first; ties keep sales rep order
+        order = np.lexsort((sr_codes, -scores, bd_codes))
+        offsets = np.zeros(len(bd_labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(bd_codes, minlength=len(bd_labels)), out=offsets[1:])
+        return cls(np.array(bd_labels.tolist(), dtype=str), np.array(sr_labels.tolist(), dtype=str),
+                   offsets, sr_codes[order].astype(np.int32), scores[order])
+
+    def save(self, path):
+        """Write one .npy file per array into the directory path."""
+        os.makedirs(path, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Open a saved index; with mmap_mode='r' nothing is read until it is looked up."""
+        # Plain ndarray views of the maps; slicing a np.memmap subclass doubles lookup time
+        return cls(*[np.asarray(np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode))
+                     for name in cls.ARRAYS])
+
+    def __len__(self):
+        return len(self.bd_labels)
+
+    def __contains__(self, bd_rep_id):
+        try:
+            self._position(bd_rep_id)
+        except KeyError:
+            return False
+        return True
+
+    def _position(self, bd_rep_id):
+        if len(bd_rep_id) <= self._max_id_length:
+            i = int(self.bd_labels.searchsorted(bd_rep_id))
+            if i < len(self.bd_labels) and self.bd_labels[i] == bd_rep_id:
+                return i
+        raise KeyError(bd_rep_id)
+
+    def route(self, bd_rep_id, k=performance_scoring.TOP_K):
+        """Top k (sales_rep_id, score) pairs for a BD, best first. Raises KeyError for unknown BDs."""
+        i = self._position(bd_rep_id)
+        start = int(self.offsets[i])
+        stop = min(int(self.offsets[i + 1]), start + k)
+        return list(zip(self.sr_labels[self.sr_codes[start:stop]].tolist(),
+                        self.scores[start:stop].tolist()))
+
+
+def load_index():
+    return RoutingIndex.from_scores(storage.read_table('performance_scores', columns=INDEX_COLUMNS))
+
+
+# HTTP endpoint
+class RoutingHandler(BaseHTTPRequestHandler):
+    index = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path != '/route' or 'bd_rep_id' not in params:
+            return self._reply(404, {'error': 'use /route?bd_rep_id=<id>&k=<n>'})
+        bd_rep_id = params['bd_rep_id'][0]
+        try:
+            k = int(params.get('k', [performance_scoring.TOP_K])[0])
+            reps = self.index.route(bd_rep_id, k)
+        except ValueError:
+            return self._reply(400, {'error': 'k must be an integer'})
+        except KeyError:
+            return self._reply(404, {'error': f'unknown bd_rep_id {bd_rep_id}'})
+        self._reply(200, {'bd_rep_id': bd_rep_id,
+                          'sales_reps': [{'sales_rep_id': rep, 'score': score} for rep, score in reps]})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(index, host=HOST, port=PORT):
+    """HTTP server bound to (host, port); call serve_forever() or run it in a thread."""
+    handler = type('IndexedRoutingHandler', (RoutingHandler,), {'index': index})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+# Load test
+def synthetic_scores(num_bds, num_sales_reps=200, seed=42):
+    """Scores for every BD x sales rep pair, shaped like performance_scores."""
+    rng = np.random.default_rng(seed)
+    bd_ids = np.array([f'BD_{i:05d}' for i in range(1, num_bds + 1)], dtype=object)
+    sr_ids = np.array([f'SR_{i:04d}' for i in range(1, num_sales_reps + 1)], dtype=object)
+    num_pairs = num_bds * num_sales_reps
+    return pd.DataFrame({
+        'bd_rep_id': pd.Categorical(np.repeat(bd_ids, num_sales_reps)),
+        'sales_rep_id': pd.Categorical(np.tile(sr_ids, num_bds)),
+        'total_opps': rng.integers(1, 30, num_pairs),
+        'final_performance_score': rng.normal(0, 30, num_pairs)
+    })
+
+
+def latency_report(latencies_ns):
+    latencies_us = np.asarray(latencies_ns) / 1000
+    return {
+        'queries': len(latencies_us),
+        'p50_us': float(np.percentile(latencies_us, 50)),
+        'p99_us': float(np.percentile(latencies_us, 99)),
+        'max_us': float(latencies_us.max())
+    }
+
+
+def benchmark(index, num_queries=100_000, k=performance_scoring.TOP_K, seed=0):
+    """Per-call in-process latency for random BDs."""
+    bds = np.random.default_rng(seed).choice(index.bd_labels, num_queries).tolist()
+    latencies = np.empty(num_queries, dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i, bd in enumerate(bds):
+        started = clock()
+        index.route(bd, k)
+        latencies[i] = clock() - started
+    return latency_report(latencies)
+
+
+def benchmark_http(index, num_queries=5_000, k=performance_scoring.TOP_K, seed=0):
+    """Round-trip latency through a local HTTP server on a keep-alive connection."""
+    from http.client import HTTPConnection
+
+    server = make_server(index, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection = HTTPConnection(*server.server_address)
+    bds = np.random.default_rng(seed).choice(index.bd_labels, num_queries).tolist()
+    latencies = np.empty(num_queries, dtype=np.int64)
+    try:
+        for i, bd in enumerate(bds):
+            started = time.perf_counter_ns()
+            connection.request('GET', f'/route?bd_rep_id={bd}&k={k}')
+            connection.getresponse().read()
+            latencies[i] = time.perf_counter_ns() - started
+    finally:
+        connection.close()
+        server.shutdown()
+        server.server_close()
+    return latency_report(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route leads to sales reps from the scored pairings')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    route_parser = commands.add_parser('route', help='print the top sales reps for one BD')
+    route_parser.add_argument('bd_rep_id')
+    route_parser.add_argument('--k', type=int, default=performance_scoring.TOP_K)
+
+    serve_parser = commands.add_parser('serve', help='serve GET /route?bd_rep_id=...&k=... locally')
+    serve_parser.add_argument('--host', default=HOST)
+    serve_parser.add_argument('--port', type=int, default=PORT)
+    serve_parser.add_argument('--snapshots', action='store_true',
+                              help='serve the published routing snapshot and follow new versions')
+
+    bench_parser = commands.add_parser('benchmark', help='report p50/p99 lookup latency')
+    bench_parser.add_argument('--bds', type=int, default=None,
+                              help='benchmark a synthetic index with this many BDs instead of performance_scores')
+    bench_parser.add_argument('--queries', type=int, default=100_000)
+    bench_parser.add_argument('--k', type=int, default=performance_scoring.TOP_K)
+    bench_parser.add_argument('--http', action='store_true', help='also measure the HTTP endpoint')
+    args = parser.parse_args()
+
+    if args.command == 'serve' and args.snapshots:
+        import routing_snapshots
+
+        index = routing_snapshots.SnapshotReader()
+        index.start_refreshing()
+        print(f"Serving routing snapshot v{index.version:06d}; new versions are picked up as they are published")
+    elif args.command == 'benchmark' and args.bds:
+        print(f"Building synthetic index for {args.bds:,} BDs...")
+        started = time.perf_counter()
+        index = RoutingIndex.from_scores(synthetic_scores(args.bds))
+    else:
+        print("Loading routing index...")
+        started = time.perf_counter()
+        index = load_index()
+    if args.command != 'serve' or not args.snapshots:
+        print(f"Indexed {len(index.scores):,} pairings for {len(index):,} BDs in {time.perf_counter() - started:.2f}s")
+
+    if args.command == 'route':
+        try:
+            reps = index.route(args.bd_rep_id, args.k)
+        except KeyError:
+            sys.exit(f"unknown bd_rep_id {args.bd_rep_id}")
+        for rank, (rep, score) in enumerate(reps, 1):
+            print(f"{rank}. {rep}  {score:.2f}")
+    elif args.command == 'serve':
+        server = make_server(index, args.host, args.port)
+        print(f"Serving http://{args.host}:{args.port}/route?bd_rep_id=<id>&k=<n>")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+    else:
+        report = benchmark(index, args.queries, args.k)
+        print(f"In-process: {report['queries']:,} lookups, p50={report['p50_us']:.1f}us "
+              f"p99={report['p99_us']:.1f}us max={report['max_us']:.1f}us")
+        if args.http:
+            report = benchmark_http(index, min(args.queries, 5_000), args.k)
+            print(f"HTTP: {report['queries']:,} requests, p50={report['p50_us']:.1f}us "
+                  f"p99={report['p99_us']:.1f}us max={report['max_us']:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
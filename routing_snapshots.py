@@ -0,0 +1,229 @@
+"""
+Routing Snapshots
+Versioned, immutable routing tables that readers swap to without pausing lookups
+
+publish() writes a RoutingIndex to a new version directory (arrays as .npy plus
+meta.json), fsyncs it, renames it into place and then atomically replaces the
+CURRENT pointer file. A version is never modified after it is renamed in, so a
+reader that has mapped it can keep answering from it while newer versions appear.
+
+SnapshotReader memory-maps the version named by CURRENT, which costs the same for
+any table size. refresh() opens the new version first and then swaps a single
+attribute; every lookup reads that attribute once, so it runs entirely against
+one version and never waits on a lock.
+
+    python routing_snapshots.py publish
+    python routing_snapshots.py route BD_001 --k 3
+    python routing_snapshots.py list
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import performance_scoring
+import routing_service
+import storage
+
+# Configuration
+SNAPSHOT_DIR = 'analysis/routing_snapshots'
+POINTER_NAME = 'CURRENT'
+META_NAME = 'meta.json'
+KEEP_VERSIONS = 5
+REFRESH_INTERVAL = 1.0
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _version_name(version):
+    return f'v{version:06d}'
+
+
+def list_versions(root=SNAPSHOT_DIR):
+    """Published version numbers, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(root)
+                  if name.startswith('v') and name[1:].isdigit())
+
+
+def current_version(root=SNAPSHOT_DIR):
+    """Version named by the CURRENT pointer, or None before the first publish."""
+    try:
+        with open(os.path.join(root, POINTER_NAME)) as f:
+            return int(f.read().strip()[1:])
+    except FileNotFoundError:
+        return None
+
+
+def publish(index, root=SNAPSHOT_DIR, keep=KEEP_VERSIONS):
+    """Write index as the next version, point CURRENT at it and prune old versions; returns the version."""
+    if keep < 1:
+        raise ValueError(f"keep must be at least 1 (the version being published), got {keep}")
+    os.makedirs(root, exist_ok=True)
+
+    # Build the version in a private directory so readers never see it half written
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+    os.chmod(staging, 0o755)
+    index.save(staging)
+    with open(os.path.join(staging, META_NAME), 'w') as f:
+        json.dump({'published_at': time.time(), 'num_bds': len(index),
+                   'num_pairings': len(index.scores)}, f)
+    for name in os.listdir(staging):
+        _fsync(os.path.join(staging, name))
+    _fsync(staging)
+
+    # Rename into the next free version; a concurrent publisher taking it moves us on by one
+    version = (list_versions(root) or [0])[-1] + 1
+    while True:
+        try:
+            os.rename(staging, os.path.join(root, _version_name(version)))
+            break
+        except OSError:
+            if not os.path.exists(os.path.join(root, _version_name(version))):
+                raise
+            version += 1
+
+    # Swap the pointer with a single atomic replace
+    pointer_tmp = os.path.join(root, f'.{POINTER_NAME}.{version}')
+    with open(pointer_tmp, 'w') as f:
+        f.write(_version_name(version))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(root, POINTER_NAME))
+    _fsync(root)
+
+    # Readers still mapping a removed version keep their open files until they swap
+    versions = list_versions(root)
+    for old in versions[:max(len(versions) - keep, 0)]:
+        shutil.rmtree(os.path.join(root, _version_name(old)), ignore_errors=True)
+    return version
+
+
+def load_snapshot(root=SNAPSHOT_DIR, version=None):
+    """Memory-mapped RoutingIndex for a version (default: CURRENT)."""
+    version = current_version(root) if version is None else version
+    if version is None:
+        raise FileNotFoundError(f'no routing snapshot published under {root}')
+    return routing_service.RoutingIndex.load(os.path.join(root, _version_name(version)))
+
+
+class SnapshotReader:
+    """Routes from the current snapshot and moves to newer ones without blocking lookups."""
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        if not self.refresh():
+            raise FileNotFoundError(f'no routing snapshot published under {root}')
+
+    @property
+    def version(self):
+        return self._snapshot[0]
+
+    @property
+    def index(self):
+        return self._snapshot[1]
+
+    def refresh(self):
+        """Switch to the version named by CURRENT if it changed; returns True on a switch."""
+        with self._refresh_lock:
+            version = current_version(self.root)
+            if version is None or (self._snapshot and version == self.version):
+                return False
+            try:
+                index = load_snapshot(self.root, version)
+            except FileNotFoundError:
+                # Pruned between reading CURRENT and opening it; a newer version is already published
+                return False
+            # One reference assignment: lookups see either the old (version, index) or the new one
+            self._snapshot = (version, index)
+            return True
+
+    def route(self, bd_rep_id, k=performance_scoring.TOP_K):
+        _, index = self._snapshot
+        return index.route(bd_rep_id, k)
+
+    def route_versioned(self, bd_rep_id, k=performance_scoring.TOP_K):
+        """(version, reps), both from the same snapshot."""
+        version, index = self._snapshot
+        return version, index.route(bd_rep_id, k)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, bd_rep_id):
+        return bd_rep_id in self.index
+
+    def start_refreshing(self, interval=REFRESH_INTERVAL):
+        """Poll CURRENT from a daemon thread every interval seconds."""
+        def poll():
+            while not self._stop.wait(interval):
+                self.refresh()
+        thread = threading.Thread(target=poll, daemon=True)
+        thread.start()
+        return thread
+
+    def stop_refreshing(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish and read versioned routing table snapshots')
+    parser.add_argument('--root', default=SNAPSHOT_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    publish_parser = commands.add_parser('publish', help='snapshot the routing index from performance_scores')
+    publish_parser.add_argument('--keep', type=int, default=KEEP_VERSIONS, help='versions to retain')
+
+    route_parser = commands.add_parser('route', help='print the top sales reps for one BD from CURRENT')
+    route_parser.add_argument('bd_rep_id')
+    route_parser.add_argument('--k', type=int, default=performance_scoring.TOP_K)
+
+    commands.add_parser('list', help='show published versions')
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        if args.keep < 1:
+            publish_parser.error('--keep must be at least 1')
+        print("Building routing index...")
+        index = routing_service.RoutingIndex.from_scores(
+            storage.read_table('performance_scores', columns=routing_service.INDEX_COLUMNS))
+        version = publish(index, args.root, args.keep)
+        print(f"Published {_version_name(version)} ({len(index.scores):,} pairings for {len(index):,} BDs)")
+    elif args.command == 'route':
+        started = time.perf_counter()
+        reader = SnapshotReader(args.root)
+        print(f"Opened {_version_name(reader.version)} in {(time.perf_counter() - started) * 1000:.1f}ms")
+        try:
+            reps = reader.route(args.bd_rep_id, args.k)
+        except KeyError:
+            sys.exit(f"unknown bd_rep_id {args.bd_rep_id}")
+        for rank, (rep, score) in enumerate(reps, 1):
+            print(f"{rank}. {rep}  {score:.2f}")
+    else:
+        current = current_version(args.root)
+        for version in list_versions(args.root):
+            with open(os.path.join(args.root, _version_name(version), META_NAME)) as f:
+                meta = json.load(f)
+            marker = '*' if version == current else ' '
+            published = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta['published_at']))
+            print(f"{marker} {_version_name(version)}  {published}  "
+                  f"{meta['num_pairings']:,} pairings, {meta['num_bds']:,} BDs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""
+Stage Runner
+Content-hash cached DAG of pipeline stages, from data generation to charts
+
+Each stage declares the files it reads and writes. A stage's fingerprint hashes
+its command, the contents of its inputs, and the source of its script plus every
+local module the script imports. Stages whose fingerprint matches the last
+successful run (and whose outputs still exist) are skipped; stages whose inputs
+are ready run concurrently.
+
+    python stage_runner.py                 # bring everything up to date
+    python stage_runner.py charts          # only the chart stages and what they need
+    python stage_runner.py --regenerate    # also rerun data generation
+    python stage_runner.py --list
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Configuration
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(ROOT, '.stage_cache.json')
+MAX_JOBS = os.cpu_count() or 1
+
+# Mirrors storage.py, which is not imported here to keep no-op runs free of the pandas import
+STORAGE_FORMAT = os.environ.get('PIPELINE_STORAGE', 'csv')
+TABLE_EXT = 'parquet' if STORAGE_FORMAT == 'parquet' else 'csv'
+OPPORTUNITIES = 'data/opportunities' if STORAGE_FORMAT == 'parquet' else 'data/opportunities.csv'
+PAIR_METRICS = f'analysis/pair_metrics.{TABLE_EXT}'
+PERFORMANCE_SCORES = f'analysis/performance_scores.{TABLE_EXT}'
+RECOMMENDATIONS = 'analysis/bd_pairing_recommendations.csv'
+ROUTING_IMPACT = 'analysis/routing_impact_analysis.csv'
+ROUTING_SNAPSHOT = 'analysis/routing_snapshots/CURRENT'
+CHART_DIR = 'visualizations/output'
+
+
+class Stage:
+    def __init__(self, name, command, inputs=(), outputs=(), source=False):
+        self.name = name
+        self.command = list(command)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        # Source stages create data from nothing; they only rerun when asked or when outputs are missing
+        self.source = source
+
+    @property
+    def script(self):
+        return self.command[0]
+
+
+def chart(name, output, inputs):
+    return Stage(name, [f'visualizations/{name}.py'], inputs, [f'{CHART_DIR}/{output}'])
+
+
+STAGES = [
+    Stage('generation', ['data_generation.py'], outputs=[OPPORTUNITIES], source=True),
+    Stage('eda', ['exploratory_data_analysis.py'], inputs=[OPPORTUNITIES]),
+    Stage('metrics', ['metric_calculation.py'], inputs=[OPPORTUNITIES], outputs=[PAIR_METRICS]),
+    Stage('scoring', ['performance_scoring.py', '--stage', 'scores'],
+          inputs=[PAIR_METRICS], outputs=[PERFORMANCE_SCORES]),
+    Stage('recommendations', ['performance_scoring.py', '--stage', 'recommendations'],
+          inputs=[PERFORMANCE_SCORES], outputs=[RECOMMENDATIONS]),
+    Stage('impact', ['routing_impact.py'], inputs=[RECOMMENDATIONS, PERFORMANCE_SCORES],
+          outputs=[ROUTING_IMPACT]),
+    Stage('routing_snapshot', ['routing_snapshots.py', 'publish'], inputs=[PERFORMANCE_SCORES],
+          outputs=[ROUTING_SNAPSHOT]),
+    chart('final_score_distribution', '01_final_score_distribution.png', [PERFORMANCE_SCORES]),
+    chart('opportunity_distribution', '02_opportunity_distribution.png', [PERFORMANCE_SCORES]),
+    chart('top_bottom_pairs', '03_top_bottom_pairs.png', [PERFORMANCE_SCORES]),
+    chart('performance_heatmap', '04_performance_heatmap.png', [PERFORMANCE_SCORES]),
+    chart('metric_contributions', '05_metric_contributions.png', [PERFORMANCE_SCORES]),
+    chart('confidence_vs_performance', '06_confidence_vs_performance.png', [PERFORMANCE_SCORES]),
+    chart('bd_summary', '07_bd_summary.png', [PERFORMANCE_SCORES]),
+    chart('classification_summary', '08_classification_summary.png', [PERFORMANCE_SCORES]),
+    chart('bd_pairing_recommendations', '09_bd_pairing_recommendations.png', [RECOMMENDATIONS]),
+    chart('sales_rep_frequency', '10_sales_rep_frequency.png', [RECOMMENDATIONS]),
+    chart('routing_decision_matrix', '11_routing_decision_matrix.png', [RECOMMENDATIONS]),
+    chart('routing_impact_analysis', '12_routing_impact_analysis.png', [RECOMMENDATIONS, PERFORMANCE_SCORES]),
+]
+
+GROUPS = {
+    'charts': [stage.name for stage in STAGES if stage.script.startswith('visualizations/')],
+    'analysis': ['eda', 'metrics', 'scoring', 'recommendations', 'impact', 'routing_snapshot'],
+}
+
+
+class Fingerprinter:
+    """Content hashes, with a (size, mtime) shortcut for files seen unchanged before."""
+
+    def __init__(self, file_cache):
+        self.file_cache = file_cache
+
+    def file_digest(self, path):
+        full_path = os.path.join(ROOT, path)
+        if os.path.isdir(full_path):
+            digest = hashlib.sha256()
+            for directory, dirnames, filenames in os.walk(full_path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    file_path = os.path.relpath(os.path.join(directory, filename), ROOT)
+                    digest.update(file_path.encode())
+                    digest.update(self.file_digest(file_path).encode())
+            return digest.hexdigest()
+        if not os.path.exists(full_path):
+            return 'missing'
+
+        stat = os.stat(full_path)
+        cached = self.file_cache.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(full_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.file_cache[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def code_files(self, script):
+        """The script plus every repo-root module it imports, transitively."""
+        seen, pending = set(), [script]
+        while pending:
+            path = pending.pop()
+            if path in seen or not os.path.exists(os.path.join(ROOT, path)):
+                continue
+            seen.add(path)
+            with open(os.path.join(ROOT, path), 'rb') as f:
+                tree = ast.parse(f.read())
+            for node in ast.walk(tree):
+                names = []
+                if isinstance(node, ast.Import):
+                    names = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    names = [node.module]
+                pending.extend(f"{name.split('.')[0]}.py" for name in names)
+        return sorted(seen)
+
+    def stage(self, stage):
+        digest = hashlib.sha256(json.dumps([stage.command, STORAGE_FORMAT]).encode())
+        for path in self.code_files(stage.script) + stage.inputs:
+            digest.update(path.encode())
+            digest.update(self.file_digest(path).encode())
+        return digest.hexdigest()
+
+
+def load_cache():
+    if os.path.exists(CACHE_PATH):
+        with open(CACHE_PATH) as f:
+            return json.load(f)
+    return {'stages': {}, 'files': {}}
+
+
+def save_cache(cache):
+    tmp_path = CACHE_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def dependencies(stages):
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    return {stage.name: {producers[path] for path in stage.inputs if path in producers}
+            for stage in stages}
+
+
+def select(targets, deps):
+    """Requested stages plus everything upstream of them."""
+    selected, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(deps[name])
+    return selected
+
+
+def run_stage(stage):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable] + stage.command, cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    return result.returncode, result.stdout, time.perf_counter() - started
+
+
+def run(targets=None, regenerate=False, jobs=MAX_JOBS, force=False):
+    """Bring the target stages up to date; returns the names of stages that failed."""
+    stages = {stage.name: stage for stage in STAGES}
+    deps = dependencies(STAGES)
+    selected = select(targets or list(stages), deps)
+
+    cache = load_cache()
+    fingerprints = Fingerprinter(cache['files'])
+    done, failed, running = set(), set(), {}
+
+    def is_current(stage):
+        outputs_exist = all(os.path.exists(os.path.join(ROOT, path)) for path in stage.outputs)
+        if stage.source:
+            return outputs_exist and not regenerate
+        return (not force and outputs_exist and
+                cache['stages'].get(stage.name) == fingerprints.stage(stage))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(done) + len(failed) < len(selected):
+            # Launch every stage whose upstream stages have all finished
+            for name in sorted(selected - done - failed - set(running.values())):
+                if deps[name] & failed:
+                    failed.add(name)
+                    print(f"[skip] {name}: upstream stage failed")
+                elif deps[name] <= done:
+                    stage = stages[name]
+                    if is_current(stage):
+                        done.add(name)
+                        print(f"[cached] {name}")
+                    else:
+                        running[pool.submit(run_stage, stage)] = name
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                returncode, output, elapsed = future.result()
+                if returncode == 0:
+                    done.add(name)
+                    cache['stages'][name] = fingerprints.stage(stages[name])
+                    print(f"[ran] {name} ({elapsed:.1f}s)")
+                else:
+                    failed.add(name)
+                    cache['stages'].pop(name, None)
+                    print(f"[failed] {name} (exit {returncode})\n{output}")
+            save_cache(cache)
+
+    save_cache(cache)
+    return sorted(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run pipeline stages whose inputs or code changed')
+    parser.add_argument('targets', nargs='*',
+                        help=f"stage names or groups ({', '.join(GROUPS)}); default: all stages")
+    parser.add_argument('--regenerate', action='store_true', help='rerun data generation')
+    parser.add_argument('--force', action='store_true', help='ignore cached fingerprints')
+    parser.add_argument('--jobs', type=int, default=MAX_JOBS, help='stages run concurrently')
+    parser.add_argument('--list', action='store_true', help='show stages and their inputs/outputs')
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            print(f"{stage.name}: {', '.join(stage.inputs) or '-'} -> {', '.join(stage.outputs) or '-'}")
+        return
+
+    names = {stage.name for stage in STAGES}
+    targets = []
+    for target in args.targets:
+        if target not in names and target not in GROUPS:
+            parser.error(f"unknown stage {target!r}")
+        targets.extend(GROUPS.get(target, [target]))
+    if args.regenerate and targets:
+        targets.append('generation')
+
+    started = time.perf_counter()
+    failed = run(targets or None, args.regenerate, args.jobs, args.force)
+    print(f"Finished in {time.perf_counter() - started:.2f}s")
+    if failed:
+        sys.exit(f"Failed stages: {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""
+Columnar Storage
+Typed, compressed Parquet storage for opportunities and analysis tables
+
+Set PIPELINE_STORAGE=parquet to make every stage read and write Parquet instead
+of CSV. Opportunities are partitioned by created_date month (created_month=YYYY-MM),
+so date-range reads only open the matching files. Opportunity IDs of the form
+prefix + zero-padded number are stored as int32 numbers, with the prefix and
+padding in each file's schema metadata, and turned back into strings on read.
+CSV remains the export format:
+
+    python storage.py convert   # CSV -> Parquet
+    python storage.py export    # Parquet -> CSV
+"""
+
+import json
+import os
+import re
+import sys
+import shutil
+import numpy as np
+import pandas as pd
+
+# Configuration
+STORAGE_FORMAT = os.environ.get('PIPELINE_STORAGE', 'csv')
+COMPRESSION = 'zstd'
+OPPORTUNITIES_CSV = 'data/opportunities.csv'
+OPPORTUNITIES_DATASET = 'data/opportunities'
+ANALYSIS_DIR = 'analysis'
+COLUMNAR_TABLES = ['pair_metrics', 'performance_scores']
+
+CATEGORICAL_COLUMNS = ['bd_rep_id', 'sales_rep_id', 'outcome', 'current_stage',
+                       'performance_classification']
+DATE_COLUMNS = ['created_date', 'closed_date']
+PARTITION_COLUMN = 'created_month'
+ID_COLUMN = 'opportunity_id'
+ID_FORMAT_KEY = b'opportunity_id_format'
+ROWS_PER_GROUP = 1_000_000
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Parquet storage requires pyarrow (pip install -r requirements.txt)") from exc
+    return pa, ds, pq
+
+
+def encode_ids(ids):
+    """(prefix, width, int32 numbers) when every ID is prefix + zero-padded number, else None."""
+    ids = pd.Series(ids).astype(object)
+    if ids.isna().any() or not len(ids) or pd.api.types.infer_dtype(ids, skipna=False) != 'string':
+        return None
+    prefix = re.match(r'\D*', ids.iloc[0]).group()
+    digits = ids.str.slice(len(prefix))
+    if not ids.str.startswith(prefix).all() or not digits.str.fullmatch(r'\d+').all():
+        return None
+    numbers = digits.astype(np.int64).to_numpy()
+    if numbers.max() > np.iinfo(np.int32).max:
+        return None
+    width = int(digits.str.len().min())
+    # Padding has to be reproducible, or the IDs would not round-trip
+    if not (format_ids(prefix, width, numbers) == ids.to_numpy()).all():
+        return None
+    return prefix, width, numbers.astype(np.int32)
+
+
+def format_ids(prefix, width, numbers):
+    # pandas str.zfill, since np.char.zfill keeps the input's itemsize and cuts longer numbers
+    return (prefix + pd.Series(np.asarray(numbers)).astype(str).str.zfill(width)).to_numpy(dtype=object)
+
+
+def _id_format(schema):
+    """How a file stores opportunity_id: {'prefix', 'width', 'min_width'}, or None for plain strings."""
+    encoded = (schema.metadata or {}).get(ID_FORMAT_KEY)
+    return json.loads(encoded) if encoded else None
+
+
+def _shared_id_format(formats):
+    # One format that decodes every file: same prefix, and a padding width all of them accept.
+    # Returns None when every file holds plain strings and False when the files cannot share one
+    if all(fmt is None for fmt in formats):
+        return None
+    if any(fmt is None for fmt in formats) or len({fmt['prefix'] for fmt in formats}) > 1:
+        return False
+    width = min(fmt['width'] for fmt in formats)
+    if width < max(fmt['min_width'] for fmt in formats):
+        return False
+    return {'prefix': formats[0]['prefix'], 'width': width, 'min_width': width}
+
+
+def _decode_ids(table, id_format):
+    """Table with opportunity_id numbers turned back into prefixed, zero-padded strings."""
+    if id_format is None or ID_COLUMN not in table.column_names:
+        return table
+    pa, _, _ = _arrow()
+    import pyarrow.compute as pc
+    i = table.column_names.index(ID_COLUMN)
+    digits = pc.utf8_lpad(pc.cast(table.column(i), pa.string()), id_format['width'], padding='0')
+    ids = pc.binary_join_element_wise(id_format['prefix'], digits, '')
+    metadata = {key: value for key, value in (table.schema.metadata or {}).items() if key != ID_FORMAT_KEY}
+    return table.set_column(i, ID_COLUMN, ids).replace_schema_metadata(metadata)
+
+
+def _to_typed_table(df):
+    """Categorical labels, date32 day numbers, int32 opportunity IDs and compact integers."""
+    pa, _, _ = _arrow()
+    df = df.copy()
+    id_format = None
+    if ID_COLUMN in df.columns:
+        encoded = encode_ids(df[ID_COLUMN])
+        if encoded is not None:
+            prefix, width, df[ID_COLUMN] = encoded
+            # Any width from the padded length (1 if nothing is padded) up to the shortest number decodes
+            padded = int(df[ID_COLUMN].min()) < 10 ** (width - 1)
+            id_format = {'prefix': prefix, 'width': width, 'min_width': width if padded else 1}
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    if 'days_in_current_stage' in df.columns:
+        df['days_in_current_stage'] = df['days_in_current_stage'].astype('int32')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for col in DATE_COLUMNS:
+        if col in table.column_names:
+            i = table.column_names.index(col)
+            table = table.set_column(i, col, table.column(col).cast(pa.date32()))
+    if id_format is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               ID_FORMAT_KEY: json.dumps(id_format).encode()})
+    return table
+
+
+def _write_options(table):
+    """Parquet writer options: zstd, delta-encoded integer IDs and byte-split deal values."""
+    pa, _, _ = _arrow()
+    encoding = {}
+    if ID_COLUMN in table.column_names and pa.types.is_integer(table.schema.field(ID_COLUMN).type):
+        encoding[ID_COLUMN] = 'DELTA_BINARY_PACKED'
+    if 'deal_value' in table.column_names and pa.types.is_floating(table.schema.field('deal_value').type):
+        encoding['deal_value'] = 'BYTE_STREAM_SPLIT'
+    # Unique IDs and random amounts gain nothing from a dictionary, which Parquet tries first
+    return {'compression': COMPRESSION, 'column_encoding': encoding,
+            'use_dictionary': [col for col in table.column_names if col not in encoding]}
+
+
+def _to_pandas(table):
+    # Opportunity IDs are unique, so deduplicating the strings only costs time (most of a 10M-row read)
+    return table.to_pandas(date_as_object=False, deduplicate_objects=False)
+
+
+def _to_frame(table, id_format=None):
+    # Files decode with their own ID format unless the caller found one shared by a whole dataset
+    table = _decode_ids(table, id_format or _id_format(table.schema))
+    df = _to_pandas(table)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype != 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+
+def as_frame(data):
+    """Accept a DataFrame or an Arrow table and return a DataFrame."""
+    if isinstance(data, pd.DataFrame):
+        return data
+    return _to_frame(data)
+
+
+def as_arrow(df):
+    """Typed Arrow table (categorical rep IDs, date32 dates) for in-process hand-offs."""
+    return _to_typed_table(df)
+
+
+def write_opportunities(df, part=None, path=None):
+    """Write opportunities in the configured format.
+
+    With part=None the whole table is replaced; with part=k the rows are added to
+    the dataset as extra files, which lets chunked generators append.
+    """
+    if STORAGE_FORMAT != 'parquet':
+        path = path or OPPORTUNITIES_CSV
+        if part is None or part == 0:
+            df.to_csv(path, index=False)
+        else:
+            df.to_csv(path, mode='a', header=False, index=False)
+        return path
+
+    _, _, pq = _arrow()
+    path = path or OPPORTUNITIES_DATASET
+    if part is None:
+        reset_opportunities(path)
+
+    df = df.copy()
+    df[PARTITION_COLUMN] = pd.to_datetime(df['created_date']).dt.strftime('%Y-%m')
+    # Rows are buffered per month so each file gets a few large row groups rather than one
+    # small group per input batch, which made reads spend their time on row group overhead
+    table = _to_typed_table(df)
+    pq.write_to_dataset(
+        table, path,
+        partition_cols=[PARTITION_COLUMN],
+        **_write_options(table),
+        basename_template=f'part-{part or 0:05d}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+        min_rows_per_group=ROWS_PER_GROUP,
+        max_rows_per_group=ROWS_PER_GROUP
+    )
+    return path
+
+
+def reset_opportunities(path=None):
+    """Remove an existing Parquet dataset before a chunked writer starts appending.
+
+    Only a directory holding nothing but created_month=* partitions is removed; any
+    other existing directory raises FileExistsError instead of being deleted.
+    """
+    path = path or OPPORTUNITIES_DATASET
+    if STORAGE_FORMAT != 'parquet' or not os.path.isdir(path):
+        return
+    entries = os.listdir(path)
+    if not all(entry.startswith(f'{PARTITION_COLUMN}=') and os.path.isdir(os.path.join(path, entry))
+               for entry in entries):
+        raise FileExistsError(f"{path} exists and is not an opportunities dataset "
+                              f"(only {PARTITION_COLUMN}=* partitions); refusing to delete it")
+    shutil.rmtree(path)
+
+
+def _scan_opportunities(path, columns=None, start_date=None, end_date=None, batch_size=None):
+    """Yield (Arrow table, ID format) pieces of the dataset; one piece unless batch_size is given.
+
+    Files are scanned as one dataset when a single ID format decodes all of them, and
+    one at a time otherwise.
+    """
+    pa, ds, _ = _arrow()
+    dataset = ds.dataset(path or OPPORTUNITIES_DATASET, format='parquet', partitioning='hive')
+    columns = list(columns) if columns is not None else [name for name in dataset.schema.names
+                                                            if name != PARTITION_COLUMN]
+
+    # Month bounds prune whole partitions before any row-level filtering
+    month_filter, day_filter = None, None
+    if start_date is not None:
+        start = pd.Timestamp(start_date)
+        month_filter = ds.field(PARTITION_COLUMN) >= start.strftime('%Y-%m')
+        day_filter = ds.field('created_date') >= pa.scalar(start.date(), pa.date32())
+    if end_date is not None:
+        end = pd.Timestamp(end_date)
+        month_end = ds.field(PARTITION_COLUMN) <= end.strftime('%Y-%m')
+        day_end = ds.field('created_date') <= pa.scalar(end.date(), pa.date32())
+        month_filter = month_end if month_filter is None else month_filter & month_end
+        day_filter = day_end if day_filter is None else day_filter & day_end
+
+    fragments = list(dataset.get_fragments(filter=month_filter))
+    id_format = None
+    if ID_COLUMN in columns:
+        id_format = _shared_id_format([_id_format(fragment.physical_schema) for fragment in fragments])
+    if id_format is not False:
+        row_filter = None if month_filter is None else month_filter & day_filter
+        sources = [(dataset, row_filter, id_format)]
+    else:
+        sources = [(fragment, day_filter, _id_format(fragment.physical_schema)) for fragment in fragments]
+
+    for source, row_filter, source_format in sources:
+        if batch_size is None:
+            yield source.to_table(columns=columns, filter=row_filter), source_format
+            continue
+        for batch in source.to_batches(columns=columns, filter=row_filter, batch_size=batch_size):
+            if batch.num_rows:
+                yield pa.Table.from_batches([batch]), source_format
+
+
+def read_opportunities(start_date=None, end_date=None, columns=None, path=None):
+    """Load opportunities, optionally restricted to created_date in [start_date, end_date]."""
+    if STORAGE_FORMAT != 'parquet':
+        df = pd.read_csv(path or OPPORTUNITIES_CSV)
+        if start_date is not None:
+            df = df[df['created_date'] >= str(pd.Timestamp(start_date).date())]
+        if end_date is not None:
+            df = df[df['created_date'] <= str(pd.Timestamp(end_date).date())]
+        if columns is not None:
+            df = df[list(columns)]
+        return df.reset_index(drop=True)
+
+    pa, _, _ = _arrow()
+    tables = [_decode_ids(table, id_format)
+              for table, id_format in _scan_opportunities(path, columns, start_date, end_date)]
+    if len(tables) == 1:
+        return _to_frame(tables[0])
+    # Files read one by one may hold their string IDs as string or large_string
+    if ID_COLUMN in tables[0].column_names:
+        tables = [table.set_column(table.column_names.index(ID_COLUMN), ID_COLUMN,
+                                   table.column(ID_COLUMN).cast(pa.large_string())) for table in tables]
+    return _to_frame(pa.concat_tables(tables))
+
+
+def iter_opportunities(chunk_size, columns=None, path=None):
+    """Yield opportunities as DataFrames of at most chunk_size rows."""
+    if STORAGE_FORMAT != 'parquet':
+        yield from pd.read_csv(path or OPPORTUNITIES_CSV, usecols=columns, chunksize=chunk_size)
+        return
+
+    for table, id_format in _scan_opportunities(path, columns, batch_size=chunk_size):
+        yield _to_pandas(_decode_ids(table, id_format))
+
+
+def table_path(name, fmt=None):
+    return os.path.join(ANALYSIS_DIR, f"{name}.{'parquet' if (fmt or STORAGE_FORMAT) == 'parquet' else 'csv'}")
+
+
+def write_table(df, name):
+    """Save an analysis table such as pair_metrics or performance_scores."""
+    path = table_path(name)
+    if STORAGE_FORMAT == 'parquet':
+        _, _, pq = _arrow()
+        table = _to_typed_table(df)
+        pq.write_table(table, path, **_write_options(table))
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def read_table(name, columns=None):
+    path = table_path(name)
+    if STORAGE_FORMAT == 'parquet':
+        _, _, pq = _arrow()
+        return _to_frame(pq.read_table(path, columns=columns))
+    return pd.read_csv(path, usecols=columns)
+
+
+def convert_to_parquet():
+    global STORAGE_FORMAT
+    opportunities = pd.read_csv(OPPORTUNITIES_CSV)
+    tables = {name: pd.read_csv(table_path(name, 'csv')) for name in COLUMNAR_TABLES
+              if os.path.exists(table_path(name, 'csv'))}
+
+    STORAGE_FORMAT = 'parquet'
+    print(f"Saved {write_opportunities(opportunities)}")
+    for name, df in tables.items():
+        print(f"Saved {write_table(df, name)}")
+
+
+def export_csv():
+    global STORAGE_FORMAT
+    STORAGE_FORMAT = 'parquet'
+    opportunities = read_opportunities()
+    tables = {name: read_table(name) for name in COLUMNAR_TABLES
+              if os.path.exists(table_path(name))}
+
+    STORAGE_FORMAT = 'csv'
+
+    # Partitioning groups rows by month; restore opportunity_id order (OPP_9999 < OPP_10000)
+    id_order = opportunities['opportunity_id'].astype(str)
+    opportunities = opportunities.iloc[np.lexsort((id_order.values, id_order.str.len().values))]
+    print(f"Saved {write_opportunities(opportunities)}")
+    for name, df in tables.items():
+        print(f"Saved {write_table(df, name)}")
+
+
+if __name__ == '__main__':
+    commands = {'convert': convert_to_parquet, 'export': export_csv}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        sys.exit(f"usage: python storage.py [{'|'.join(commands)}]")
+    commands[sys.argv[1]]()
@@ -0,0 +1,235 @@
+"""
+Threshold Sweep
+Sensitivity of pair classifications to the early-death, stale, confidence and minimum-opportunity cutoffs
+
+One pass over the opportunities builds, per pair, a histogram of
+days_in_current_stage for lost deals (binned at the candidate early-death
+cutoffs) and for open deals (binned at the candidate stale cutoffs), plus the
+cutoff-independent counters. Cumulative sums over those bins give the early-death
+and stale counts for every candidate cutoff at once. Every combination of
+cutoffs is then scored and classified exactly as metric_calculation and
+performance_scoring would, and compared with the classification at the defaults.
+
+    python threshold_sweep.py
+    python threshold_sweep.py --early-death 7 14 21 --stale 60 90 120 --confidence 5 7 10 --min-opps 2 3 5
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import performance_scoring
+import storage
+import weight_sweep
+
+# Configuration
+SWEEP_PATH = 'analysis/threshold_sweep.csv'
+EARLY_DEATH_GRID = [7, 10, 14, 21, 30, 45, 60]
+STALE_GRID = [30, 45, 60, 90, 120, 180, 270, 365]
+CONFIDENCE_GRID = [3, 5, 7, 10, 15]
+MIN_OPPS_GRID = [1, 2, 3, 5, 10]
+INPUT_COLUMNS = ['bd_rep_id', 'sales_rep_id', 'outcome', 'days_in_current_stage', 'deal_value']
+CLASS_COLUMNS = [label.lower().replace(' ', '_').replace('-', '_')
+                 for label in performance_scoring.CLASSIFICATIONS]
+
+
+def _deviation(rate, bd_rate):
+    # (rate - baseline) / baseline.replace(0, 1) * 100, NaN -> 0, as metrics_from_counters computes it
+    with np.errstate(invalid='ignore', divide='ignore'):
+        deviation = (rate - bd_rate) / np.where(bd_rate == 0, 1, bd_rate) * 100
+    return np.nan_to_num(deviation, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+
+def _rate(numerator, denominator):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return numerator / denominator * 100
+
+
+class StageHistogram:
+    """Per-pair counters plus cumulative day histograms of lost and open deals at the candidate cutoffs."""
+
+    def __init__(self, opportunities, early_death_grid=EARLY_DEATH_GRID, stale_grid=STALE_GRID):
+        opportunities = storage.as_frame(opportunities)
+        self.early_death_grid = np.sort(np.asarray(early_death_grid))
+        self.stale_grid = np.sort(np.asarray(stale_grid))
+
+        bd_codes, bd_labels = aggregation.factorize(opportunities['bd_rep_id'])
+        sr_codes, sr_labels = aggregation.factorize(opportunities['sales_rep_id'])
+        outcome = opportunities['outcome']
+        is_open = (outcome == 'Open').to_numpy()
+        is_won = (outcome == 'Closed Won').to_numpy()
+        is_lost = (outcome == 'Closed Lost').to_numpy()
+        days = np.asarray(opportunities['days_in_current_stage'])
+        values = opportunities['deal_value'].to_numpy(dtype=np.float64)
+
+        # Rows without a rep ID are dropped, as groupby does
+        valid = (bd_codes >= 0) & (sr_codes >= 0)
+        pairs, pair_keys = pd.factorize(bd_codes[valid].astype(np.int64) * len(sr_labels) + sr_codes[valid],
+                                        sort=True)
+        num_pairs = len(pair_keys)
+        is_open, is_won, is_lost, days, values = (
+            is_open[valid], is_won[valid], is_lost[valid], days[valid], values[valid])
+        self.pair_bd = (np.asarray(pair_keys) // len(sr_labels)).astype(np.int64)
+        self.bd_labels = bd_labels
+        self.bd_ids = bd_labels[self.pair_bd]
+        self.sr_ids = sr_labels[np.asarray(pair_keys) % len(sr_labels)]
+
+        self.total_opps = np.bincount(pairs, minlength=num_pairs)
+        self.total_won = np.bincount(pairs[is_won], minlength=num_pairs)
+        self.total_lost = np.bincount(pairs[is_lost], minlength=num_pairs)
+        self.total_open = np.bincount(pairs[is_open], minlength=num_pairs)
+        has_value = ~np.isnan(values)
+        self.value_sum = np.bincount(pairs[has_value], weights=values[has_value], minlength=num_pairs)
+        self.value_count = np.bincount(pairs[has_value], minlength=num_pairs)
+
+        # Bin i holds days in (grid[i-1], grid[i]]; the cumulative count at i is days <= grid[i]
+        self.lost_at_most = self._cumulative(pairs[is_lost], days[is_lost], self.early_death_grid, num_pairs)
+        self.open_at_most = self._cumulative(pairs[is_open], days[is_open], self.stale_grid, num_pairs)
+
+    @staticmethod
+    def _cumulative(pairs, days, grid, num_pairs):
+        bins = np.searchsorted(grid, days, side='left')
+        histogram = np.bincount(pairs * (len(grid) + 1) + bins,
+                                minlength=num_pairs * (len(grid) + 1)).reshape(num_pairs, len(grid) + 1)
+        return np.cumsum(histogram, axis=1)[:, :len(grid)]
+
+    def __len__(self):
+        return len(self.total_opps)
+
+    def _bd_totals(self, values):
+        # BD sums of a pair column (or of each column of a pairs x grid block), gathered back to the pairs
+        num_bds = len(self.bd_labels)
+        if values.ndim == 1:
+            return np.bincount(self.pair_bd, weights=values, minlength=num_bds)[self.pair_bd]
+        return np.stack([np.bincount(self.pair_bd, weights=column, minlength=num_bds)
+                         for column in values.T], axis=1)[self.pair_bd]
+
+    def deviations(self):
+        """Deviation columns as metrics_from_counters defines them: win rate, early death
+        (pairs x early-death grid), stale (pairs x stale grid) and deal size."""
+        decided = self.total_won + self.total_lost
+        stale = self.total_open[:, None] - self.open_at_most
+        win_rate = np.nan_to_num(_rate(self.total_won, decided), nan=0.0)
+        early_death_rate = np.nan_to_num(_rate(self.lost_at_most, self.total_lost[:, None]), nan=0.0)
+        stale_rate = np.nan_to_num(_rate(stale, self.total_opps[:, None]), nan=0.0)
+
+        # BD baselines are sums of the pair counters
+        bd_win_rate = _rate(self._bd_totals(self.total_won), self._bd_totals(decided))
+        bd_early_death_rate = _rate(self._bd_totals(self.lost_at_most), self._bd_totals(self.total_lost)[:, None])
+        bd_stale_rate = _rate(self._bd_totals(stale), self._bd_totals(self.total_opps)[:, None])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            deal_size = self.value_sum / self.value_count
+            bd_deal_size = self._bd_totals(self.value_sum) / self._bd_totals(self.value_count)
+            deal_size_deviation = np.nan_to_num((deal_size - bd_deal_size) / bd_deal_size * 100, nan=0.0,
+                                                posinf=np.inf, neginf=-np.inf)
+        return (_deviation(win_rate, bd_win_rate),
+                _deviation(early_death_rate, bd_early_death_rate),
+                _deviation(stale_rate, bd_stale_rate),
+                deal_size_deviation)
+
+
+def _classify(scores, total_opps, confidence, min_opps):
+    # performance_scoring.classify_performance for a cutoffs x pairs block of scores
+    eligible = total_opps >= min_opps
+    codes = np.full(scores.shape, len(performance_scoring.CLASSIFICATIONS) - 1, dtype=np.int8)
+    if eligible.any():
+        for threshold in weight_sweep.row_percentiles(scores[:, eligible]).T:
+            codes -= scores >= threshold[:, None]
+    codes[:, confidence < weight_sweep.LOW_CONFIDENCE] = 1
+    codes[:, ~eligible] = 0
+    return codes
+
+
+def sweep(histogram, confidence_grid=CONFIDENCE_GRID, min_opps_grid=MIN_OPPS_GRID,
+          weights=performance_scoring.EQUAL_WEIGHTS):
+    """One row per (early death, stale, confidence, min opps) cutoff combination."""
+    win, early_death, stale, deal_size = histogram.deviations()
+    early_death, stale = early_death.T, stale.T
+    baseline = classify(histogram, weights=weights)
+    num_classes = len(CLASS_COLUMNS)
+    offsets = np.arange(len(histogram.early_death_grid))[:, None] * num_classes
+
+    rows = []
+    for (s, stale_days), confidence_threshold, min_opps in itertools.product(
+            enumerate(histogram.stale_grid), confidence_grid, min_opps_grid):
+        # Same summation order as weighted_scores; each row of the block is one early-death cutoff
+        total = (win * weights['win_rate'] + -early_death * weights['early_death'] +
+                 -stale[s] * weights['stale_pipeline'] + deal_size * weights['deal_size'])
+        confidence = np.minimum(histogram.total_opps / confidence_threshold, 1.0)
+        codes = _classify(total * confidence, histogram.total_opps, confidence, min_opps)
+
+        counts = np.bincount((codes + offsets).ravel(), minlength=offsets.size * num_classes)
+        counts = counts.reshape(-1, num_classes)
+        reclassified = (codes != baseline).mean(axis=1) * 100
+        for e, early_death_days in enumerate(histogram.early_death_grid):
+            row = {'early_death_days': early_death_days, 'stale_days': stale_days,
+                   'confidence_threshold': confidence_threshold, 'min_opps': min_opps,
+                   'reclassified_pct': reclassified[e]}
+            row.update(zip(CLASS_COLUMNS, counts[e]))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def classify(histogram, early_death_days=aggregation.EARLY_DEATH_DAYS, stale_days=aggregation.STALE_DAYS,
+             confidence_threshold=performance_scoring.CONFIDENCE_THRESHOLD,
+             min_opps=performance_scoring.MIN_OPPS, weights=performance_scoring.EQUAL_WEIGHTS):
+    """Classification codes (indexes into CLASSIFICATIONS) of every pair at one set of cutoffs."""
+    e = np.flatnonzero(histogram.early_death_grid == early_death_days)
+    s = np.flatnonzero(histogram.stale_grid == stale_days)
+    if not len(e) or not len(s):
+        raise ValueError('the cutoffs must be on the histogram grids')
+    win, early_death, stale, deal_size = histogram.deviations()
+    total = (win * weights['win_rate'] + -early_death[:, e[0]] * weights['early_death'] +
+             -stale[:, s[0]] * weights['stale_pipeline'] + deal_size * weights['deal_size'])
+    confidence = np.minimum(histogram.total_opps / confidence_threshold, 1.0)
+    return _classify((total * confidence)[None], histogram.total_opps, confidence, min_opps)[0]
+
+
+def one_at_a_time(results):
+    """Rows where all but one cutoff sit at their defaults."""
+    defaults = {'early_death_days': aggregation.EARLY_DEATH_DAYS, 'stale_days': aggregation.STALE_DAYS,
+                'confidence_threshold': performance_scoring.CONFIDENCE_THRESHOLD,
+                'min_opps': performance_scoring.MIN_OPPS}
+    at_default = pd.DataFrame({column: results[column] == value for column, value in defaults.items()})
+    varied = at_default.sum(axis=1) >= len(defaults) - 1
+    return results[varied]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classification sensitivity to the metric and scoring cutoffs')
+    parser.add_argument('--early-death', type=int, nargs='+', default=EARLY_DEATH_GRID, help='early-death days')
+    parser.add_argument('--stale', type=int, nargs='+', default=STALE_GRID, help='stale-pipeline days')
+    parser.add_argument('--confidence', type=float, nargs='+', default=CONFIDENCE_GRID,
+                        help='confidence thresholds (opportunities for full confidence)')
+    parser.add_argument('--min-opps', type=int, nargs='+', default=MIN_OPPS_GRID,
+                        help='minimum opportunities to classify a pair')
+    args = parser.parse_args()
+
+    # The defaults are always swept so every row can be compared against them
+    early_death_grid = sorted(set(args.early_death) | {aggregation.EARLY_DEATH_DAYS})
+    stale_grid = sorted(set(args.stale) | {aggregation.STALE_DAYS})
+
+    print("Loading opportunities data...")
+    opportunities = storage.read_opportunities(columns=INPUT_COLUMNS)
+
+    started = time.perf_counter()
+    histogram = StageHistogram(opportunities, early_death_grid, stale_grid)
+    results = sweep(histogram, args.confidence, args.min_opps)
+    elapsed = time.perf_counter() - started
+    print(f"Swept {len(results):,} cutoff combinations over {len(histogram):,} pairings in {elapsed:.2f}s")
+
+    results.to_csv(SWEEP_PATH, index=False)
+    print(f"Saved to {SWEEP_PATH}")
+    columns = ['early_death_days', 'stale_days', 'confidence_threshold', 'min_opps', 'reclassified_pct',
+               'high_performer', 'at_risk']
+    print("\nOne cutoff at a time (others at their defaults):")
+    print(one_at_a_time(results)[columns].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
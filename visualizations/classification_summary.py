@@ -3,16 +3,13 @@ Classification Summary Visualization
 Shows distribution of performance classifications
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
 
-sns.set_style("whitegrid")
-plt.rcParams['figure.dpi'] = 300
-plt.rcParams['font.family'] = 'sans-serif'
-
-os.makedirs('visualizations/output', exist_ok=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
 
 COLORS = {
     'High Performer': '#00C853',
@@ -24,52 +21,62 @@ COLORS = {
     'Insufficient Data': '#BDBDBD'
 }
 
-df = pd.read_csv('analysis/performance_scores.csv')
 
-classification_counts = df['performance_classification'].value_counts()
+def render(df):
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.dpi'] = 300
+    plt.rcParams['font.family'] = 'sans-serif'
+
+    os.makedirs('visualizations/output', exist_ok=True)
+
+    classification_counts = df['performance_classification'].astype(str).value_counts()
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 9), facecolor='white')
+
+    for ax in [ax1, ax2]:
+        ax.set_facecolor('#FAFAFA')
 
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 9), facecolor='white')
+    colors = [COLORS.get(cat, '#9E9E9E') for cat in classification_counts.index]
 
-for ax in [ax1, ax2]:
-    ax.set_facecolor('#FAFAFA')
+    wedges, texts, autotexts = ax1.pie(classification_counts.values, 
+                                         labels=classification_counts.index,
+                                         autopct='%1.1f%%',
+                                         colors=colors,
+                                         startangle=90,
+                                         textprops={'fontsize': 11, 'fontweight': '600'},
+                                         wedgeprops={'edgecolor': 'white', 'linewidth': 2})
 
-colors = [COLORS.get(cat, '#9E9E9E') for cat in classification_counts.index]
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('700')
 
-wedges, texts, autotexts = ax1.pie(classification_counts.values, 
-                                     labels=classification_counts.index,
-                                     autopct='%1.1f%%',
-                                     colors=colors,
-                                     startangle=90,
-                                     textprops={'fontsize': 11, 'fontweight': '600'},
-                                     wedgeprops={'edgecolor': 'white', 'linewidth': 2})
+    ax1.set_title('Performance Classification Distribution\n(Pie Chart)', 
+                  fontsize=16, fontweight='700', color='#212121', pad=20)
 
-for autotext in autotexts:
-    autotext.set_color('white')
-    autotext.set_fontweight('700')
+    bars = ax2.barh(classification_counts.index, classification_counts.values,
+                    color=colors, edgecolor='white', linewidth=2, alpha=0.9)
 
-ax1.set_title('Performance Classification Distribution\n(Pie Chart)', 
-              fontsize=16, fontweight='700', color='#212121', pad=20)
+    ax2.set_xlabel('Number of Pairings', fontsize=14, fontweight='600', color='#212121')
+    ax2.set_ylabel('Classification', fontsize=14, fontweight='600', color='#212121')
+    ax2.set_title('Performance Classification Distribution\n(Bar Chart)', 
+                  fontsize=16, fontweight='700', color='#212121', pad=20)
+    ax2.grid(True, alpha=0.2, axis='x', color='#9E9E9E')
 
-bars = ax2.barh(classification_counts.index, classification_counts.values,
-                color=colors, edgecolor='white', linewidth=2, alpha=0.9)
+    for i, (cat, count) in enumerate(classification_counts.items()):
+        pct = (count / classification_counts.sum()) * 100
+        ax2.text(count + 2, i, f'{count} ({pct:.1f}%)', 
+                va='center', fontsize=11, fontweight='600', color='#212121')
 
-ax2.set_xlabel('Number of Pairings', fontsize=14, fontweight='600', color='#212121')
-ax2.set_ylabel('Classification', fontsize=14, fontweight='600', color='#212121')
-ax2.set_title('Performance Classification Distribution\n(Bar Chart)', 
-              fontsize=16, fontweight='700', color='#212121', pad=20)
-ax2.grid(True, alpha=0.2, axis='x', color='#9E9E9E')
+    ax2.spines['top'].set_visible(False)
+    ax2.spines['right'].set_visible(False)
+    ax2.spines['left'].set_color('#BDBDBD')
+    ax2.spines['bottom'].set_color('#BDBDBD')
 
-for i, (cat, count) in enumerate(classification_counts.items()):
-    pct = (count / classification_counts.sum()) * 100
-    ax2.text(count + 2, i, f'{count} ({pct:.1f}%)', 
-            va='center', fontsize=11, fontweight='600', color='#212121')
+    plt.tight_layout()
+    plt.savefig('visualizations/output/08_classification_summary.png', 
+                dpi=300, bbox_inches='tight', facecolor='white')
+    plt.close()
 
-ax2.spines['top'].set_visible(False)
-ax2.spines['right'].set_visible(False)
-ax2.spines['left'].set_color('#BDBDBD')
-ax2.spines['bottom'].set_color('#BDBDBD')
 
-plt.tight_layout()
-plt.savefig('visualizations/output/08_classification_summary.png', 
-            dpi=300, bbox_inches='tight', facecolor='white')
-plt.close()
\ No newline at end of file
+if __name__ == '__main__':
+    render(storage.read_table('performance_scores'))
@@ -0,0 +1,114 @@
+"""
+Chart Rendering Engine
+Loads the analysis tables once and renders every chart in a shared-data process pool
+
+Each chart script exposes render(...) taking the tables it draws from, so a chart
+can be rendered on its own with render_chart(name). render_all() reads every
+table a single time in the parent, imports pandas, matplotlib, seaborn and the
+chart modules once, and then forks the workers. The workers inherit the tables
+copy-on-write instead of re-reading them, so the suite takes about as long as
+its slowest chart.
+
+    python visualizations/render_charts.py
+    python visualizations/render_charts.py bd_summary performance_heatmap
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import performance_scoring
+import storage
+
+# Chart modules and the tables passed to their render(), in argument order
+CHARTS = {
+    'final_score_distribution': ['performance_scores'],
+    'opportunity_distribution': ['performance_scores'],
+    'top_bottom_pairs': ['performance_scores'],
+    'performance_heatmap': ['performance_scores'],
+    'metric_contributions': ['performance_scores'],
+    'confidence_vs_performance': ['performance_scores'],
+    'bd_summary': ['performance_scores'],
+    'classification_summary': ['performance_scores'],
+    'bd_pairing_recommendations': ['recommendations'],
+    'sales_rep_frequency': ['recommendations'],
+    'routing_decision_matrix': ['recommendations'],
+    'routing_impact_analysis': ['recommendations', 'performance_scores']
+}
+
+# Tables loaded by the parent before forking; workers read them from here
+_chart_data = {}
+
+
+def load_tables(names):
+    loaders = {
+        'performance_scores': lambda: storage.read_table('performance_scores'),
+        'recommendations': lambda: pd.read_csv(performance_scoring.RECOMMENDATIONS_PATH)
+    }
+    return {name: loaders[name]() for name in names}
+
+
+def render_chart(name, tables=None):
+    """Render one chart, loading its tables first unless they are passed in."""
+    if tables is None:
+        tables = load_tables(CHARTS[name])
+    module = importlib.import_module(name)
+    module.render(*[tables[table] for table in CHARTS[name]])
+
+
+def _render_shared(name):
+    started = time.perf_counter()
+    render_chart(name, _chart_data)
+    return name, time.perf_counter() - started
+
+
+def render_all(names=None, workers=None):
+    """Render the given charts (default: all) from a single load of their tables."""
+    names = list(names or CHARTS)
+    needed = [table for table in ['performance_scores', 'recommendations']
+              if any(table in CHARTS[name] for name in names)]
+
+    print(f"Loading {', '.join(needed)}...")
+    _chart_data.clear()
+    _chart_data.update(load_tables(needed))
+    for name in names:
+        importlib.import_module(name)
+
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('fork')) as pool:
+            results = list(pool.map(_render_shared, names))
+    else:
+        results = [_render_shared(name) for name in names]
+
+    for i, (name, elapsed) in enumerate(results, 1):
+        print(f"[{i}/{len(names)}] Rendered {name} ({elapsed:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render charts from one load of the analysis tables')
+    parser.add_argument('charts', nargs='*', help='charts to render (default: all)')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: all cores)')
+    args = parser.parse_args()
+    for name in args.charts:
+        if name not in CHARTS:
+            parser.error(f"unknown chart {name!r}; choose from {', '.join(CHARTS)}")
+
+    started = time.perf_counter()
+    render_all(args.charts, args.workers)
+    print(f"Rendered {len(args.charts or CHARTS)} charts in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
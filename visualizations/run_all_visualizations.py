@@ -1,27 +1,15 @@
 """
 Master Script to Generate All Visualizations
-Runs all visualization scripts in sequence
+Loads the analysis tables once and renders every chart in parallel worker processes
 """
 
-import subprocess
+import os
+import sys
 
-scripts = [
-    'final_score_distribution.py',
-    'opportunity_distribution.py',
-    'top_bottom_pairs.py',
-    'performance_heatmap.py',
-    'metric_contributions.py',
-    'confidence_vs_performance.py',
-    'bd_summary.py',
-    'classification_summary.py',
-    'bd_pairing_recommendations.py',
-    'routing_decision_matrix.py',
-    'routing_impact_analysis.py'
-]
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import render_charts
 
-for i, script in enumerate(scripts, 1):
-    print(f"[{i}/{len(scripts)}] Running {script}...")
-    subprocess.run(['python', f'visualizations/{script}'], check=True)
+render_charts.render_all()
 
-print(f"\nAll {len(scripts)} visualizations complete")
-print(f"Saved to: visualizations/output/")
\ No newline at end of file
+print(f"\nAll {len(render_charts.CHARTS)} visualizations complete")
+print(f"Saved to: visualizations/output/")
@@ -0,0 +1,223 @@
+"""
+Weight Sweep
+Scores thousands of metric weightings at once and reports how much each one moves the results
+
+The four signed deviation columns (win rate, -early death, -stale rate, deal size)
+are stacked into a pairs x 4 matrix once. A block of weight vectors then scores
+every pair under every weighting with one matrix product, times the confidence
+multiplier. For each weighting the sweep reports:
+
+    classification_stability   share of score-classified pairs whose class matches the baseline weights
+    top_k_overlap              mean share of each BD's baseline top-k reps still in its top k
+    top_k_unchanged_bds        share of BDs whose top-k set is unchanged
+
+Only pairs with enough opportunities to be ranked are scored, already ordered by
+BD, in float32: numpy sorts float32 rows several times faster than float64 ones and
+the blocks take half the memory. Percentile thresholds and classes follow
+performance_scoring (one row sort per weighting); per-BD top-k cutoffs come from
+one sort per group size, as _grouped_sum batches groups.
+
+    python weight_sweep.py --samples 10000          # random weightings on the simplex
+    python weight_sweep.py --grid-step 0.05         # every weighting in steps of 0.05
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import performance_scoring
+import storage
+
+# Configuration
+SWEEP_PATH = 'analysis/weight_sweep.csv'
+WEIGHT_KEYS = list(performance_scoring.EQUAL_WEIGHTS)
+DEVIATION_COLUMNS = ['win_rate_deviation_pct', 'early_death_deviation_pct',
+                     'stale_rate_deviation_pct', 'deal_size_deviation_pct']
+DEVIATION_SIGNS = np.array([1.0, -1.0, -1.0, 1.0])
+LOW_CONFIDENCE = 0.43
+SCORE_CELLS_PER_BLOCK = 16_000_000
+SCORE_DTYPE = np.float32
+PERCENTILES = [10, 25, 50, 75]
+
+
+def grid_weights(step):
+    """Every weighting with components in multiples of step that sum to 1."""
+    units = int(round(1 / step))
+    combos = [c for c in itertools.product(range(units + 1), repeat=len(WEIGHT_KEYS) - 1) if sum(c) <= units]
+    grid = np.array([c + (units - sum(c),) for c in combos], dtype=np.float64)
+    return grid / units
+
+
+def sample_weights(num_samples, seed=0):
+    """Weightings drawn uniformly from the simplex."""
+    return np.random.default_rng(seed).dirichlet(np.ones(len(WEIGHT_KEYS)), num_samples)
+
+
+def _weight_matrix(weights):
+    if isinstance(weights, dict):
+        weights = [weights]
+    if len(weights) and isinstance(weights[0], dict):
+        weights = [[w[key] for key in WEIGHT_KEYS] for w in weights]
+    return np.atleast_2d(np.asarray(weights, dtype=np.float64))
+
+
+def row_percentiles(scores, percentiles=PERCENTILES):
+    """np.percentile(scores, percentiles, axis=1).T, from one row sort (faster than its partition here)."""
+    ranked = np.sort(scores, axis=1)
+    virtual = (ranked.shape[1] - 1) * np.asarray(percentiles) / 100
+    below = np.floor(virtual).astype(np.int64)
+    above = np.minimum(below + 1, ranked.shape[1] - 1)
+    a, b, t = ranked[:, below], ranked[:, above], virtual - below
+    return np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+
+
+class WeightSweep:
+    """Pair deviations and the baseline's classes and top-k sets, ready to score weight blocks."""
+
+    def __init__(self, metrics, baseline=performance_scoring.EQUAL_WEIGHTS, k=performance_scoring.TOP_K,
+                 confidence_threshold=performance_scoring.CONFIDENCE_THRESHOLD):
+        metrics = storage.as_frame(metrics)
+        self.k = k
+        total_opps = metrics['total_opps'].to_numpy()
+        confidence = np.minimum(total_opps / confidence_threshold, 1.0)
+
+        # Pairs below MIN_OPPS never get a score class or a recommendation, whatever the weights.
+        # The rest are laid out by BD, with BDs of equal size next to each other
+        bd_codes, self.bd_labels = aggregation.factorize(metrics['bd_rep_id'])
+        eligible_rows = np.flatnonzero(total_opps >= performance_scoring.MIN_OPPS)
+        self.group_sizes = np.bincount(bd_codes[eligible_rows], minlength=len(self.bd_labels))
+        eligible_bds = bd_codes[eligible_rows]
+        self.order = eligible_rows[np.lexsort((eligible_bds, self.group_sizes[eligible_bds]))]
+        self.group_bd = bd_codes[self.order]
+        self.group_starts = np.zeros(len(self.bd_labels), dtype=np.int64)
+        self.group_starts[self.group_bd[::-1]] = np.arange(len(self.order))[::-1]
+        self.has_group = self.group_sizes > 0
+
+        self.deviations = (metrics[DEVIATION_COLUMNS].to_numpy(dtype=np.float64)[self.order] *
+                           DEVIATION_SIGNS * confidence[self.order, None]).astype(SCORE_DTYPE)
+
+        # Low-confidence pairs keep their class under every weighting
+        self.classified = confidence[self.order] >= LOW_CONFIDENCE
+
+        baseline_scores = self.scores(_weight_matrix(baseline))
+        self.baseline_passed = self._thresholds_passed(baseline_scores)[0]
+        self.members, self.member_bd = self._top_members(baseline_scores[0])
+        self.member_counts = np.bincount(self.member_bd, minlength=len(self.bd_labels))[self.has_group]
+        self.member_starts = np.concatenate(([0], np.cumsum(self.member_counts)[:-1])).astype(np.int64)
+
+    def scores(self, weights):
+        """final_performance_score of the eligible pairs (in self.order) per weighting: weightings x pairs."""
+        return weights.astype(SCORE_DTYPE) @ self.deviations.T
+
+    def _thresholds_passed(self, scores):
+        # Class code 6 - passed: 4 thresholds passed is High Performer, none is At-Risk
+        passed = np.zeros(scores.shape, dtype=np.int8)
+        for threshold in row_percentiles(scores).T:
+            passed += scores >= threshold[:, None]
+        return passed
+
+    def _top_members(self, ordered_scores):
+        # Positions (within self.order) of each BD's top k by baseline score, highest first, stable for ties.
+        # Members come out sorted by BD code
+        rank_order = np.lexsort((-ordered_scores, self.group_bd))
+        code_starts = np.concatenate(([0], np.cumsum(self.group_sizes)[:-1]))
+        position = np.arange(len(rank_order)) - code_starts[self.group_bd[rank_order]]
+        members = rank_order[position < self.k]
+        return members, self.group_bd[members]
+
+    def _kth_largest(self, ordered_scores):
+        # The k-th largest score of every BD per weighting; BDs of one size are a contiguous block
+        cutoffs = np.full((len(ordered_scores), len(self.bd_labels)), -np.inf, dtype=ordered_scores.dtype)
+        for size in np.unique(self.group_sizes[self.group_sizes > self.k]):
+            groups = np.flatnonzero(self.group_sizes == size)
+            start = self.group_starts[groups[0]]
+            block = ordered_scores[:, start:start + len(groups) * size].reshape(len(ordered_scores), -1, size)
+            cutoffs[:, groups] = np.sort(block, axis=2)[:, :, size - self.k]
+        return cutoffs
+
+    def evaluate(self, weights, per_bd=False):
+        """Stability and top-k overlap for a block of weightings (weightings x 4)."""
+        scores = self.scores(weights)
+        same_class = (self._thresholds_passed(scores) == self.baseline_passed) & self.classified
+        stability = same_class.sum(axis=1) / self.classified.sum()
+
+        kept = scores[:, self.members] >= self._kth_largest(scores)[:, self.member_bd]
+        # Members are sorted by BD, so each BD's kept count is one segment sum
+        overlap = np.add.reduceat(kept.astype(np.int16), self.member_starts, axis=1) / self.member_counts
+
+        summary = {
+            'classification_stability': stability,
+            'top_k_overlap': overlap.mean(axis=1),
+            'top_k_unchanged_bds': (overlap == 1).mean(axis=1)
+        }
+        return (summary, overlap) if per_bd else summary
+
+    def run(self, weights, per_bd=False, workers=1):
+        """Sweep all weightings in blocks; returns the summary frame (and BD x weighting overlaps)."""
+        weights = _weight_matrix(weights)
+        size = max(1, SCORE_CELLS_PER_BLOCK // max(len(self.deviations), 1))
+        blocks = [weights[start:start + size] for start in range(0, len(weights), size)]
+        if workers > 1 and len(blocks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                     initargs=(self, per_bd)) as pool:
+                results = list(pool.map(_evaluate_block, blocks))
+        else:
+            results = [self.evaluate(block, per_bd) for block in blocks]
+
+        summaries = [pd.DataFrame(result[0] if per_bd else result) for result in results]
+        sweep = pd.concat([pd.DataFrame(weights, columns=[f'w_{key}' for key in WEIGHT_KEYS]),
+                           pd.concat(summaries, ignore_index=True)], axis=1)
+        if not per_bd:
+            return sweep
+        bd_overlap = pd.DataFrame(np.concatenate([result[1] for result in results]).T,
+                                  index=pd.Index(self.bd_labels[self.has_group], name='bd_rep_id'))
+        return sweep, bd_overlap
+
+
+# Per-process sweep, set once by the pool initializer (inherited without copying under fork)
+_sweep_context = {}
+
+
+def _init_sweep_worker(sweep, per_bd):
+    _sweep_context.update(sweep=sweep, per_bd=per_bd)
+
+
+def _evaluate_block(weights):
+    return _sweep_context['sweep'].evaluate(weights, _sweep_context['per_bd'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score many metric weightings against the equal-weight baseline')
+    choice = parser.add_mutually_exclusive_group()
+    choice.add_argument('--samples', type=int, default=10_000, help='random weightings on the simplex')
+    choice.add_argument('--grid-step', type=float, help='sweep a full grid in steps of this size instead')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top-k', type=int, default=performance_scoring.TOP_K)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes for weight blocks')
+    args = parser.parse_args()
+
+    print("Loading pair metrics...")
+    metrics = storage.read_table('pair_metrics')
+    weights = grid_weights(args.grid_step) if args.grid_step else sample_weights(args.samples, args.seed)
+
+    started = time.perf_counter()
+    sweep = WeightSweep(metrics, k=args.top_k).run(weights, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"Scored {len(weights):,} weightings over {len(metrics):,} pairings in {elapsed:.2f}s")
+
+    sweep.to_csv(SWEEP_PATH, index=False)
+    print(f"Saved to {SWEEP_PATH}")
+    print("\nMost stable weightings:")
+    print(sweep.sort_values('classification_stability', ascending=False).head(5).to_string(index=False))
+    print("\nLeast stable weightings:")
+    print(sweep.sort_values('classification_stability').head(5).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""
+Window Metrics
+Pair metrics over trailing windows (last 90, 180, 365 days) that slide forward a day at a time
+
+Each opportunity counts on one activity day: its closed_date once decided, its
+created_date while still open. Contributions are kept in per-day buckets, and
+every window keeps running pair counters. Moving a window forward adds the buckets
+of the days entering it and subtracts the buckets of the days leaving it, so one
+step costs O(opportunities on those days) and never rescans the history. Buckets
+older than the longest window are dropped.
+
+    python window_metrics.py                          # pair_metrics_90d/180d/365d as of the last day
+    python window_metrics.py --as-of 2024-06-30 --windows 30 90
+    python window_metrics.py --replay 365             # slide a day at a time over the last year
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import incremental_metrics
+import storage
+
+# Configuration
+WINDOWS = [90, 180, 365]
+INPUT_COLUMNS = ['opportunity_id', 'bd_rep_id', 'sales_rep_id', 'created_date', 'closed_date',
+                 'outcome', 'days_in_current_stage', 'deal_value']
+
+
+def _grown(array, size):
+    """Return array with room for at least size rows (capacity doubles)."""
+    if size <= len(array):
+        return array
+    grown = np.zeros((max(size, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def activity_days(created_date, closed_date):
+    """Day numbers (days since 1970-01-01) an opportunity counts on: closed_date, else created_date."""
+    created = pd.to_datetime(pd.Series(created_date))
+    closed = pd.to_datetime(pd.Series(closed_date))
+    return closed.fillna(created).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def day_label(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+class WindowCounters:
+    """Running pair counters for one trailing window of length days."""
+
+    def __init__(self, length):
+        self.length = length
+        self.states = np.zeros((0, aggregation.NUM_STATES), dtype=np.int64)
+        self.value_sum = np.zeros(0)
+        self.value_count = np.zeros(0, dtype=np.int64)
+
+    def reserve(self, num_pairs):
+        self.states = _grown(self.states, num_pairs)
+        self.value_sum = _grown(self.value_sum, num_pairs)
+        self.value_count = _grown(self.value_count, num_pairs)
+
+    def clear(self):
+        self.states[:] = 0
+        self.value_sum[:] = 0
+        self.value_count[:] = 0
+
+    def add(self, pairs, states, values, sign):
+        has_value = ~np.isnan(values)
+        np.add.at(self.states, (pairs, states), sign)
+        np.add.at(self.value_sum, pairs[has_value], sign * values[has_value])
+        np.add.at(self.value_count, pairs[has_value], sign)
+
+
+class WindowedMetrics:
+    """Per-day buckets of pair contributions and one set of running counters per window."""
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = {length: WindowCounters(length) for length in sorted(set(windows))}
+        self.longest = max(self.windows)
+        self.end_day = None
+
+        # Rep and pair dictionaries
+        self.bd_labels, self.bd_codes = [], {}
+        self.sr_labels, self.sr_codes = [], {}
+        self.pair_rows = {}
+        self.num_pairs = 0
+        self.pair_bd = np.zeros(0, dtype=np.int32)
+        self.pair_sr = np.zeros(0, dtype=np.int32)
+
+        # day -> list of (pairs, states, values, sign) contributions
+        self.buckets = {}
+
+        # Ledger of each opportunity's current contribution (state -1 = retracted)
+        self.opp_rows = {}
+        self.opp_ids = []
+        self.ledger_pair = np.zeros(0, dtype=np.int64)
+        self.ledger_state = np.zeros(0, dtype=np.int8)
+        self.ledger_value = np.zeros(0)
+        self.ledger_day = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_opportunities(cls, opportunities, windows=WINDOWS, end_day=None):
+        """Windows over an opportunity history, ending on end_day (default: the last activity day)."""
+        metrics = cls(windows)
+        metrics.apply(storage.as_frame(opportunities))
+        if end_day is None:
+            live = metrics.ledger_state[:len(metrics.opp_ids)] >= 0
+            end_day = metrics.ledger_day[:len(metrics.opp_ids)][live].max() if live.any() else 0
+        metrics.advance(end_day)
+        return metrics
+
+    def _code(self, label, labels, codes):
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(labels)
+            labels.append(label)
+        return code
+
+    def _pairs_for(self, bd_ids, sr_ids):
+        # Dictionary lookups run once per distinct pair, not per row
+        keys, unique = pd.factorize(pd.MultiIndex.from_arrays([np.asarray(bd_ids, dtype=object),
+                                                               np.asarray(sr_ids, dtype=object)]))
+        pair_map = np.empty(len(unique), dtype=np.int64)
+        for i, (bd, sr) in enumerate(unique):
+            bd_code = self._code(bd, self.bd_labels, self.bd_codes)
+            sr_code = self._code(sr, self.sr_labels, self.sr_codes)
+            row = self.pair_rows.get((bd_code, sr_code))
+            if row is None:
+                row = self.pair_rows[(bd_code, sr_code)] = self.num_pairs
+                self.num_pairs += 1
+                self.pair_bd = _grown(self.pair_bd, self.num_pairs)
+                self.pair_sr = _grown(self.pair_sr, self.num_pairs)
+                self.pair_bd[row], self.pair_sr[row] = bd_code, sr_code
+            pair_map[i] = row
+        for counters in self.windows.values():
+            counters.reserve(self.num_pairs)
+        return pair_map[keys]
+
+    def _add(self, pairs, states, values, days, sign):
+        # Windows already covering a day take the change now; later days wait for advance()
+        if self.end_day is not None:
+            for length, counters in self.windows.items():
+                inside = (days > self.end_day - length) & (days <= self.end_day)
+                counters.add(pairs[inside], states[inside], values[inside], sign)
+            kept = days > self.end_day - self.longest
+            pairs, states, values, days = pairs[kept], states[kept], values[kept], days[kept]
+
+        order = np.argsort(days, kind='stable')
+        pairs, states, values, days = pairs[order], states[order], values[order], days[order]
+        unique_days, starts = np.unique(days, return_index=True)
+        bounds = np.append(starts, len(days))
+        for day, start, stop in zip(unique_days.tolist(), bounds[:-1].tolist(), bounds[1:].tolist()):
+            self.buckets.setdefault(day, []).append(
+                (pairs[start:stop], states[start:stop], values[start:stop], sign))
+
+    def _retract_rows(self, rows):
+        rows = rows[self.ledger_state[rows] >= 0]
+        self._add(self.ledger_pair[rows], self.ledger_state[rows].astype(np.int64),
+                  self.ledger_value[rows], self.ledger_day[rows], -1)
+        self.ledger_state[rows] = -1
+
+    def apply(self, upserts=None, retractions=()):
+        """Apply new or changed opportunities and retracted opportunity IDs, as MetricState.apply does.
+
+        A changed opportunity leaves the bucket of its old activity day and joins
+        the bucket of its new one (for example created_date -> closed_date).
+        """
+        retractions = list(retractions)
+        if upserts is not None and len(upserts):
+            upserts = upserts.drop_duplicates('opportunity_id', keep='last')
+            removed = upserts['bd_rep_id'].isna() | upserts['sales_rep_id'].isna()
+            if incremental_metrics.DELETED_COLUMN in upserts.columns:
+                removed |= upserts[incremental_metrics.DELETED_COLUMN].fillna(False).astype(bool)
+            retractions += upserts.loc[removed, 'opportunity_id'].tolist()
+            upserts = upserts[~removed]
+
+        rows = [self.opp_rows.pop(i) for i in retractions if i in self.opp_rows]
+        if rows:
+            self._retract_rows(np.array(rows, dtype=np.int64))
+        if upserts is None or not len(upserts):
+            return self
+
+        ids = upserts['opportunity_id'].tolist()
+        pairs = self._pairs_for(upserts['bd_rep_id'].astype(str), upserts['sales_rep_id'].astype(str))
+        states = aggregation.opportunity_states(upserts['outcome'], upserts['days_in_current_stage'])
+        values = upserts['deal_value'].to_numpy(dtype=np.float64)
+        days = activity_days(upserts['created_date'], upserts['closed_date'])
+
+        rows = np.array([self.opp_rows.get(i, -1) for i in ids], dtype=np.int64)
+        self._retract_rows(rows[rows >= 0])
+
+        # Updates reuse their ledger row; inserts take new rows
+        is_new = rows < 0
+        first_new = len(self.opp_ids)
+        rows[is_new] = np.arange(first_new, first_new + is_new.sum())
+        new_ids = np.asarray(ids, dtype=object)[is_new].tolist()
+        self.opp_rows.update(zip(new_ids, rows[is_new].tolist()))
+        self.opp_ids.extend(new_ids)
+        self.ledger_pair = _grown(self.ledger_pair, len(self.opp_ids))
+        self.ledger_state = _grown(self.ledger_state, len(self.opp_ids))
+        self.ledger_value = _grown(self.ledger_value, len(self.opp_ids))
+        self.ledger_day = _grown(self.ledger_day, len(self.opp_ids))
+
+        self.ledger_pair[rows] = pairs
+        self.ledger_state[rows] = states
+        self.ledger_value[rows] = values
+        self.ledger_day[rows] = days
+        self._add(pairs, states, values, days, 1)
+        return self
+
+    def _add_bucket(self, counters, day, sign):
+        for pairs, states, values, bucket_sign in self.buckets.get(day, ()):
+            counters.add(pairs, states, values, sign * bucket_sign)
+
+    def advance(self, end_day):
+        """Slide every window so that it ends on end_day (a day number or date)."""
+        if not isinstance(end_day, (int, np.integer)):
+            end_day = int(np.datetime64(pd.Timestamp(end_day).date(), 'D').astype(np.int64))
+        end_day = int(end_day)
+        if self.end_day is not None and end_day < self.end_day:
+            raise ValueError(f'windows only move forward (at {day_label(self.end_day)})')
+
+        for length, counters in self.windows.items():
+            if self.end_day is None or end_day - self.end_day >= length:
+                # Jumps past a whole window rebuild it from the buckets it now covers
+                counters.clear()
+                entering = range(end_day - length + 1, end_day + 1)
+                leaving = range(0)
+            else:
+                entering = range(self.end_day + 1, end_day + 1)
+                leaving = range(self.end_day - length + 1, end_day - length + 1)
+            for day in entering:
+                self._add_bucket(counters, day, 1)
+            for day in leaving:
+                self._add_bucket(counters, day, -1)
+
+        self.end_day = end_day
+        for day in [day for day in self.buckets if day <= end_day - self.longest]:
+            del self.buckets[day]
+        return self
+
+    def step(self, days=1):
+        return self.advance(self.end_day + days)
+
+    def counters(self, length):
+        """Pair counter frame for the pairs with activity in one window."""
+        counters = self.windows[length]
+        pairs = np.flatnonzero(counters.states[:self.num_pairs].sum(axis=1) > 0)
+        bd_labels = np.asarray(self.bd_labels, dtype=object)
+        sr_labels = np.asarray(self.sr_labels, dtype=object)
+        return pd.DataFrame(
+            aggregation.counters_from_states(counters.states[pairs], counters.value_sum[pairs],
+                                             counters.value_count[pairs]),
+            index=pd.MultiIndex.from_arrays([bd_labels[self.pair_bd[pairs]], sr_labels[self.pair_sr[pairs]]],
+                                            names=aggregation.PAIR_KEYS),
+            columns=aggregation.COUNTER_COLUMNS
+        )
+
+    def pair_metrics(self, length):
+        """pair_metrics layout for one window; BD baselines cover the same window."""
+        return aggregation.metrics_from_counters(self.counters(length))
+
+
+def table_name(length):
+    return f'pair_metrics_{length}d'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Calculate BD-Sales pairing metrics over trailing windows')
+    parser.add_argument('--windows', type=int, nargs='+', default=WINDOWS, help='window lengths in days')
+    parser.add_argument('--as-of', help='last day inside the windows (default: last activity day)')
+    parser.add_argument('--replay', type=int, default=0,
+                        help='start this many days before --as-of and slide forward one day at a time')
+    args = parser.parse_args()
+
+    print("Loading opportunities data...")
+    opportunities = storage.read_opportunities(columns=INPUT_COLUMNS)
+    end_day = activity_days(opportunities['created_date'], opportunities['closed_date']).max()
+    if args.as_of:
+        end_day = int(np.datetime64(pd.Timestamp(args.as_of).date(), 'D').astype(np.int64))
+
+    started = time.perf_counter()
+    metrics = WindowedMetrics.from_opportunities(opportunities, args.windows, end_day - args.replay)
+    print(f"Built day buckets for {len(metrics.opp_ids):,} opportunities in {time.perf_counter() - started:.2f}s")
+
+    if args.replay:
+        started = time.perf_counter()
+        for _ in range(args.replay):
+            metrics.step()
+        elapsed = time.perf_counter() - started
+        print(f"Slid {len(metrics.windows)} windows forward {args.replay} days: "
+              f"{elapsed / args.replay * 1000:.2f} ms per day")
+
+    print(f"Windows ending {day_label(metrics.end_day)}:")
+    for length in metrics.windows:
+        metrics_df = metrics.pair_metrics(length)
+        output_path = storage.write_table(metrics_df, table_name(length))
+        print(f"  {length:>4} days: {len(metrics_df):,} pairings, "
+              f"{metrics_df['total_opps'].sum():,} opportunities -> {output_path}")
+
+
+if __name__ == '__main__':
+    main()